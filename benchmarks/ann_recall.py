@@ -0,0 +1,103 @@
+"""
+Recall and query throughput of the IVF index against exact search.
+
+Embeds synthetic clustered vectors spread over several layers, builds an IVFIndex and
+compares the approximate top-k of random query nodes with the exact top-k of an
+EmbeddingStore, for a range of `n_probe` values, with and without a layer filter.
+
+    python benchmarks/ann_recall.py --num_nodes 200000 --dims 128 --output recall.json
+"""
+import argparse
+import json
+import time
+import numpy as np
+from henhoe2vec.ann_index import IVFIndex
+from henhoe2vec.embedding_store import EmbeddingStore
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark the recall of IVFIndex.")
+    parser.add_argument("--num_nodes", type=int, default=100000)
+    parser.add_argument("--dims", type=int, default=64)
+    parser.add_argument("--num_layers", type=int, default=4)
+    parser.add_argument("--num_clusters", type=int, default=200)
+    parser.add_argument("--num_lists", type=int, default=None)
+    parser.add_argument("--num_queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--n_probe", type=int, nargs="+", default=[1, 4, 16, 64])
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", type=str, default=None)
+    return parser.parse_args()
+
+
+def synthetic_embeddings(num_nodes, dims, num_layers, num_clusters, seed):
+    """
+    Clustered vectors, as learned embeddings of communities are, with random layers.
+    """
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((num_clusters, dims)).astype(np.float32)
+    vectors = centers[rng.integers(num_clusters, size=num_nodes)]
+    vectors += 0.5 * rng.standard_normal((num_nodes, dims)).astype(np.float32)
+    layers = rng.integers(num_layers, size=num_nodes)
+    nodes = [(f"n{i}", f"l{layer}") for i, layer in enumerate(layers.tolist())]
+    return nodes, vectors
+
+
+def recall(approximate, exact):
+    hits = [
+        len(np.intersect1d(a[a >= 0], e[e >= 0])) / max(1, (e >= 0).sum())
+        for a, e in zip(approximate, exact)
+    ]
+    return float(np.mean(hits))
+
+
+def main():
+    args = parse_args()
+    nodes, vectors = synthetic_embeddings(
+        args.num_nodes, args.dims, args.num_layers, args.num_clusters, args.seed
+    )
+
+    start = time.perf_counter()
+    index = IVFIndex.build(vectors, nodes, args.num_lists, seed=args.seed)
+    build_seconds = time.perf_counter() - start
+    store = EmbeddingStore(vectors, nodes, index=index)
+
+    rng = np.random.default_rng(args.seed + 1)
+    query_rows = rng.choice(args.num_nodes, args.num_queries, replace=False)
+    queries = vectors[query_rows]
+
+    results = []
+    for layer in [None, "l0"]:
+        start = time.perf_counter()
+        exact, _ = store.top_k(queries, args.k, layer, exclude=query_rows)
+        exact_seconds = time.perf_counter() - start
+        for n_probe in args.n_probe:
+            start = time.perf_counter()
+            approximate, _ = store.top_k(
+                queries, args.k, layer, exclude=query_rows, n_probe=n_probe
+            )
+            seconds = time.perf_counter() - start
+            results.append(
+                {
+                    "layer": layer,
+                    "n_probe": n_probe,
+                    f"recall@{args.k}": recall(approximate, exact),
+                    "queries_per_second": args.num_queries / seconds,
+                    "exact_queries_per_second": args.num_queries / exact_seconds,
+                }
+            )
+            print(json.dumps(results[-1]))
+
+    report = {
+        "params": vars(args),
+        "num_lists": index.num_lists,
+        "build_seconds": build_seconds,
+        "results": results,
+    }
+    if args.output is not None:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""
+Seeded generators of synthetic multilayer networks for the benchmarks.
+
+Every layer holds a replica of the same `num_nodes` nodes. The intra-layer edges of a
+layer are drawn from an Erdős–Rényi ("er") or a power-law ("powerlaw", Chung-Lu with
+expected degrees following a power law) model. Inter-layer coupling edges connect
+replicas of the same node in two different layers.
+"""
+import numpy as np
+import pandas as pd
+
+MODELS = ["er", "powerlaw"]
+
+
+def multilayer_edgelist(
+    num_nodes,
+    num_layers=2,
+    avg_degree=8,
+    model="er",
+    coupling=0.1,
+    exponent=2.5,
+    seed=0,
+):
+    """
+    Generate the edge list of a synthetic undirected multilayer network.
+
+    Parameters
+    ----------
+    num_nodes : int
+        Number of nodes per layer.
+    num_layers : int
+        Number of layers. Default is 2.
+    avg_degree : float
+        Expected average intra-layer degree. Default is 8.
+    model : str
+        Model of the intra-layer edges, "er" or "powerlaw". Default is "er".
+    coupling : float
+        Number of inter-layer edges per node and pair of adjacent layers (layer i and
+        i + 1). Default is 0.1.
+    exponent : float
+        Exponent of the degree distribution in the "powerlaw" model. Default is 2.5.
+    seed : int
+        Seed of the generator. Default is 0.
+
+    Returns
+    -------
+    pd.DataFrame
+        Edge list with the columns 'source', 'source_layer', 'target', 'target_layer'
+        and 'weight', without self-loops or duplicate edges.
+    """
+    if model not in MODELS:
+        raise ValueError(f"[ERROR] Unknown model {model}, expected one of {MODELS}.")
+    rng = np.random.default_rng(seed)
+    num_edges = int(num_nodes * avg_degree / 2)
+
+    if model == "powerlaw":
+        # Chung-Lu: endpoints are drawn proportionally to power-law node weights
+        node_weights = np.arange(1, num_nodes + 1) ** (-1 / (exponent - 1))
+        node_probs = node_weights / node_weights.sum()
+
+    frames = []
+    for layer in range(num_layers):
+        if model == "er":
+            src = rng.integers(num_nodes, size=num_edges)
+            dst = rng.integers(num_nodes, size=num_edges)
+        else:
+            # Different hubs in every layer
+            permutation = rng.permutation(num_nodes)
+            src = permutation[rng.choice(num_nodes, num_edges, p=node_probs)]
+            dst = permutation[rng.choice(num_nodes, num_edges, p=node_probs)]
+        src, dst = _simple_edges(src, dst)
+        frames.append((src, layer, dst, layer))
+
+    # Inter-layer coupling between replicas of the same node
+    num_coupling = int(coupling * num_nodes)
+    for layer in range(num_layers - 1):
+        coupled = np.unique(rng.integers(num_nodes, size=num_coupling))
+        frames.append((coupled, layer, coupled, layer + 1))
+
+    return pd.DataFrame(
+        {
+            "source": np.concatenate([_names("n", f[0]) for f in frames]),
+            "source_layer": np.concatenate(
+                [np.full(len(f[0]), f"l{f[1]}") for f in frames]
+            ),
+            "target": np.concatenate([_names("n", f[2]) for f in frames]),
+            "target_layer": np.concatenate(
+                [np.full(len(f[2]), f"l{f[3]}") for f in frames]
+            ),
+            "weight": np.round(
+                rng.uniform(0.1, 1.0, size=sum(len(f[0]) for f in frames)), 3
+            ),
+        }
+    )
+
+
+def write_edgelist(df, path):
+    """
+    Write an edge list in the default input format of HeNHoE-2vec (tab-separated, no
+    header).
+    """
+    df.to_csv(path, sep="\t", header=False, index=False)
+
+
+def _simple_edges(src, dst):
+    """
+    Drop self-loops and duplicate undirected edges.
+    """
+    keep = src != dst
+    pairs = np.unique(
+        np.stack([np.minimum(src, dst), np.maximum(src, dst)])[:, keep], axis=1
+    )
+    return pairs[0], pairs[1]
+
+
+def _names(prefix, ids):
+    return np.char.add(prefix, ids.astype(str))
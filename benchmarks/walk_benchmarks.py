@@ -0,0 +1,250 @@
+"""
+Benchmarks of the stages of HeNHoE-2vec on synthetic multilayer networks.
+
+For every network model and size, a seeded network is generated (see `generators`) and
+the stages are timed separately:
+
+    parse_multilayer_edgelist    edge list -> NetworkX graph
+    from_edgelist                edge list -> MultilayerGraph (used by `run`)
+    preprocess_transition_probs  transition tables
+    simulate_walks               random walks
+    generate_embeddings          word2vec on the walks
+
+Every configuration runs in a fresh process, so the recorded peak RSS (the high-water
+mark after each stage) is not inflated by earlier configurations. Results are written
+to JSON together with the versions and the machine, to compare releases:
+
+    python benchmarks/walk_benchmarks.py --sizes 1000 10000 100000 --output bench.json
+"""
+import argparse
+import json
+import os
+import platform
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from importlib.metadata import version, PackageNotFoundError
+from multiprocessing import get_context
+from pathlib import Path
+import numpy as np
+import henhoe2vec
+from henhoe2vec import utils, embeddings
+from henhoe2vec.henhoe2vec_walks import HenHoe2vec
+from henhoe2vec.multilayer_graph import MultilayerGraph
+from henhoe2vec.instrumentation import peak_rss
+from generators import MODELS, multilayer_edgelist, write_edgelist
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Benchmark the stages of HeNHoE-2vec on synthetic networks."
+    )
+    parser.add_argument(
+        "--sizes",
+        type=int,
+        nargs="+",
+        default=[1000, 10000, 100000],
+        help="Numbers of nodes per layer. Default is 1000 10000 100000.",
+    )
+    parser.add_argument(
+        "--models",
+        type=str,
+        nargs="+",
+        choices=MODELS,
+        default=MODELS,
+        help="Models of the intra-layer edges. Default is all models.",
+    )
+    parser.add_argument("--num_layers", type=int, default=3)
+    parser.add_argument("--avg_degree", type=float, default=8)
+    parser.add_argument("--coupling", type=float, default=0.1)
+    parser.add_argument("--exponent", type=float, default=2.5)
+    parser.add_argument("--p", type=float, default=1.0)
+    parser.add_argument("--q", type=float, default=0.5)
+    parser.add_argument("--s", type=float, default=1.0)
+    parser.add_argument("--sampling", type=str, default="alias")
+    parser.add_argument("--walk_length", type=int, default=20)
+    parser.add_argument("--num_walks", type=int, default=10)
+    parser.add_argument("--dims", type=int, default=64)
+    parser.add_argument("--window_size", type=int, default=10)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument(
+        "--skip",
+        type=str,
+        nargs="*",
+        default=[],
+        help="Stages to skip, e.g., parse_multilayer_edgelist generate_embeddings.",
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--output",
+        type=str,
+        default=None,
+        help="Path of the JSON results file. Default is printing only.",
+    )
+    return parser.parse_args()
+
+
+def timed(stages, name, method, **throughput):
+    """
+    Run `method`, record its wall time and peak RSS as stage `name` and return its
+    result. `throughput` maps names of rates to functions of the result which return
+    the number of processed units, e.g., {"steps_per_second": count_steps}.
+    """
+    start = time.perf_counter()
+    result = method()
+    seconds = time.perf_counter() - start
+    stages[name] = {"seconds": seconds, **peak_rss()}
+    for rate, units in throughput.items():
+        stages[name][rate] = units(result) / seconds if seconds > 0 else None
+    return result
+
+
+def run_benchmark(config):
+    """
+    Benchmark all stages on one synthetic network.
+    """
+    stages = {}
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        tmp_dir = Path(tmp_dir)
+        df = multilayer_edgelist(
+            config["num_nodes"],
+            config["num_layers"],
+            config["avg_degree"],
+            config["model"],
+            config["coupling"],
+            config["exponent"],
+            config["seed"],
+        )
+        edgelist_path = tmp_dir.joinpath("edgelist.tsv")
+        write_edgelist(df, edgelist_path)
+        num_edges = len(df)
+        del df
+
+        if "parse_multilayer_edgelist" not in config["skip"]:
+            timed(
+                stages,
+                "parse_multilayer_edgelist",
+                lambda: utils.parse_multilayer_edgelist(edgelist_path, False),
+                edges_per_second=lambda G: num_edges,
+            )
+        N = timed(
+            stages,
+            "from_edgelist",
+            lambda: MultilayerGraph.from_edgelist(edgelist_path, False),
+            edges_per_second=lambda N: num_edges,
+        )
+
+        hh2v = HenHoe2vec(
+            N,
+            False,
+            config["p"],
+            config["q"],
+            config["s"],
+            sampling=config["sampling"],
+            seed=config["seed"],
+        )
+        timed(
+            stages,
+            "preprocess_transition_probs",
+            lambda: hh2v.preprocess_transition_probs(config["workers"]),
+            arcs_per_second=lambda _: N.number_of_arcs(),
+        )
+        walks = timed(
+            stages,
+            "simulate_walks",
+            lambda: hh2v.simulate_walks(
+                config["num_walks"],
+                config["walk_length"],
+                config["workers"],
+                seed=config["seed"],
+            ),
+            # The first node of every walk is not a step
+            steps_per_second=lambda walks: np.count_nonzero(walks >= 0) - len(walks),
+        )
+        # Shut down the worker processes of the walks
+        hh2v.close()
+
+        if "generate_embeddings" not in config["skip"]:
+            timed(
+                stages,
+                "generate_embeddings",
+                lambda: embeddings.generate_embeddings(
+                    walks,
+                    tmp_dir,
+                    dimensions=config["dims"],
+                    window_size=config["window_size"],
+                    workers=config["workers"],
+                    verbose=False,
+                    nodes=N.nodes,
+                    output_format="npy",
+                ),
+                steps_per_second=lambda _: np.count_nonzero(walks >= 0) - len(walks),
+            )
+
+    return {
+        "config": config,
+        "num_nodes": N.number_of_nodes(),
+        "num_edges": num_edges,
+        "num_arcs": N.number_of_arcs(),
+        "stages": stages,
+    }
+
+
+def environment():
+    try:
+        package_version = version("henhoe2vec")
+    except PackageNotFoundError:
+        package_version = None
+    return {
+        "henhoe2vec": package_version,
+        "henhoe2vec_path": str(Path(henhoe2vec.__file__).parent),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "processor": platform.processor(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def main():
+    args = parse_args()
+    params = vars(args)
+    results = []
+    for model in args.models:
+        for num_nodes in args.sizes:
+            config = {
+                key: value
+                for key, value in params.items()
+                if key not in ["sizes", "models", "output"]
+            }
+            config.update({"model": model, "num_nodes": num_nodes})
+            # A fresh process per network, so peak RSS is measured per network
+            with ProcessPoolExecutor(1, mp_context=get_context("spawn")) as executor:
+                result = executor.submit(run_benchmark, config).result()
+            results.append(result)
+            print(
+                json.dumps(
+                    {
+                        "model": model,
+                        "num_nodes": num_nodes,
+                        **{
+                            name: round(stage["seconds"], 3)
+                            for name, stage in result["stages"].items()
+                        },
+                    }
+                )
+            )
+
+    report = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "environment": environment(),
+        "params": params,
+        "results": results,
+    }
+    if args.output is not None:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
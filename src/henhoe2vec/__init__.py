@@ -1 +1,15 @@
-from . import utils, alias_sampling, henhoe2vec_walks, embeddings, henhoe2vec
+from . import (
+    utils,
+    artifacts,
+    instrumentation,
+    multilayer_graph,
+    alias_sampling,
+    henhoe2vec_walks,
+    walk_corpus,
+    walk_file,
+    embeddings,
+    ann_index,
+    embedding_store,
+    henhoe2vec,
+    sweep,
+)
@@ -1,3 +1,8 @@
+import sys
 from .henhoe2vec import main
+from .sweep import main as sweep_main
 
-main()
+if sys.argv[1:2] == ["sweep"]:
+    sweep_main(sys.argv[2:])
+else:
+    main()
@@ -1,5 +1,10 @@
 import numpy as np
 
+try:
+    import numba
+except ImportError:  # Numba is optional
+    numba = None
+
 
 def alias_setup(probs):
     """
@@ -56,7 +61,7 @@ def alias_setup(probs):
     return J, q
 
 
-def alias_draw(J, q):
+def alias_draw(J, q, rng=None):
     """
     Draw a sample from a non-uniform discrete distribution using alias sampling.
 
@@ -66,6 +71,9 @@ def alias_draw(J, q):
         The alias table.
     q : np.array of floats
         The probability table.
+    rng : np.random.Generator or RandomBuffer
+        Source of random numbers. If None, the global NumPy random state is used.
+        Default is None.
 
     Returns
     -------
@@ -73,13 +81,469 @@ def alias_draw(J, q):
         A sample from the discrete probability distribution.
     """
     K = len(J)
+    if rng is None:
+        u_mixture, u_binary = np.random.rand(), np.random.rand()
+    else:
+        u_mixture, u_binary = rng.random(2)
 
     # Draw from the overall uniform mixture.
-    kk = int(np.floor(np.random.rand() * K))
+    kk = int(np.floor(u_mixture * K))
 
     # Draw from the binary mixture, either keeping the small one, or choosing the
     # associated larger one.
-    if np.random.rand() < q[kk]:
+    if u_binary < q[kk]:
         return kk
     else:
         return J[kk]
+
+
+def alias_draw_batch(J, q, offsets, rows, rng):
+    """
+    Draw one sample from each of many non-uniform discrete distributions at once using
+    alias sampling.
+
+    Parameters
+    ----------
+    J : np.array of ints
+        The concatenated alias tables (see `alias_setup_batch`).
+    q : np.array of floats
+        The concatenated probability tables.
+    offsets : np.array of ints
+        Start of every table in `J` and `q`, followed by `len(J)`.
+    rows : np.array of ints
+        Index of the table to draw from for every sample. Tables may occur several
+        times. All referenced tables must be non-empty.
+    rng : np.random.Generator or RandomBuffer
+        Source of random numbers.
+
+    Returns
+    -------
+    np.array of ints
+        One sample per entry of `rows`, as an index local to its table.
+    """
+    rows = np.asarray(rows, dtype=np.int64)
+    num_samples = len(rows)
+    starts = offsets[rows]
+    K = offsets[rows + 1] - starts
+    u = rng.random(2 * num_samples)
+
+    # Draw from the overall uniform mixtures. The minimum guards against rounding up
+    # to K.
+    kk = np.minimum((u[:num_samples] * K).astype(np.int64), K - 1)
+
+    # Draw from the binary mixtures
+    pos = starts + kk
+    use_alias = u[num_samples:] >= q[pos]
+    kk[use_alias] = J[pos[use_alias]]
+
+    return kk
+
+
+class RandomBuffer:
+    """
+    Uniform random numbers in [0, 1) which are pre-generated in large blocks from a
+    np.random.Generator. Drawing many small batches from the buffer avoids the
+    per-call overhead of the generator while keeping results reproducible.
+
+    Attributes
+    ----------
+    rng : np.random.Generator
+        Generator which fills the buffer.
+    buffer_size : int
+        Number of random numbers generated per refill.
+    """
+
+    def __init__(self, rng=None, buffer_size=1 << 16):
+        """
+        Constructor for the RandomBuffer class.
+
+        Parameters
+        ----------
+        rng : np.random.Generator or int
+            Generator which fills the buffer, or a seed for a new generator. If None, a
+            generator with a random seed is created. Default is None.
+        buffer_size : int
+            Number of random numbers generated per refill. Default is 65536.
+        """
+        if not isinstance(rng, np.random.Generator):
+            rng = np.random.default_rng(rng)
+        self.rng = rng
+        self.buffer_size = buffer_size
+        self._buffer = np.empty(0)
+        self._pos = 0
+
+    def random(self, size=None):
+        """
+        Return random numbers from the buffer, like `np.random.Generator.random`.
+
+        Parameters
+        ----------
+        size : int
+            Number of random numbers. If None, a single float is returned. Default is
+            None.
+
+        Returns
+        -------
+        float or np.array of floats
+            Uniform random numbers in [0, 1).
+        """
+        if size is None:
+            return float(self.random(1)[0])
+
+        available = len(self._buffer) - self._pos
+        if size <= available:
+            out = self._buffer[self._pos : self._pos + size]
+            self._pos += size
+            return out
+
+        # Use up the rest of the buffer and refill it
+        out = np.empty(size)
+        out[:available] = self._buffer[self._pos :]
+        missing = size - available
+        self._buffer = self.rng.random(max(self.buffer_size, missing))
+        out[available:] = self._buffer[:missing]
+        self._pos = missing
+        return out
+
+
+# --------------------------------------------------------------------------------------
+# BATCHED ALIAS TABLES
+# --------------------------------------------------------------------------------------
+class AliasTables:
+    """
+    Flat storage of the alias tables of many discrete distributions, laid out like the
+    rows of a CSR matrix.
+
+    Attributes
+    ----------
+    J : np.array of ints
+        The concatenated alias tables. Alias indices are local to their distribution.
+    q : np.array of floats
+        The concatenated probability tables.
+    offsets : np.array of ints
+        Start of every table in `J` and `q`, followed by `len(J)`.
+    """
+
+    def __init__(self, J, q, offsets):
+        """
+        Constructor for the AliasTables class.
+
+        Parameters
+        ----------
+        J : np.array of ints
+            The concatenated alias tables.
+        q : np.array of floats
+            The concatenated probability tables.
+        offsets : np.array of ints
+            Start of every table in `J` and `q`, followed by `len(J)`.
+        """
+        self.J = J
+        self.q = q
+        self.offsets = np.asarray(offsets, dtype=np.int64)
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        """
+        Parameters
+        ----------
+        i : int
+            Index of the table.
+
+        Returns
+        -------
+        J : np.array of ints
+            The alias table (a view).
+        q : np.array of floats
+            The probability table (a view).
+        """
+        start = self.offsets[i]
+        stop = self.offsets[i + 1]
+        return self.J[start:stop], self.q[start:stop]
+
+    def draw(self, rows, rng):
+        """
+        Draw one sample from each of the tables in `rows` (see `alias_draw_batch`).
+
+        Parameters
+        ----------
+        rows : np.array of ints
+            Index of the table to draw from for every sample.
+        rng : np.random.Generator or RandomBuffer
+            Source of random numbers.
+
+        Returns
+        -------
+        np.array of ints
+            One sample per entry of `rows`, as an index local to its table.
+        """
+        return alias_draw_batch(self.J, self.q, self.offsets, rows, rng)
+
+    @property
+    def nbytes(self):
+        """
+        Total size of the tables in bytes.
+        """
+        return self.J.nbytes + self.q.nbytes + self.offsets.nbytes
+
+
+def alias_setup_batch(probs, offsets, use_numba=None):
+    """
+    Compute the alias tables of a batch of discrete distributions in one pass.
+
+    The distributions are stored like the rows of a CSR matrix: distribution `r` is
+    `probs[offsets[r]:offsets[r + 1]]`. The returned flat tables use the same layout,
+    i.e., `(J[offsets[r]:offsets[r + 1]], q[offsets[r]:offsets[r + 1]])` is the alias
+    table of distribution `r` and equals `alias_setup` of that distribution (up to
+    floating point rounding). Alias indices in `J` are local to their distribution.
+
+    Parameters
+    ----------
+    probs : np.array of floats
+        Concatenated discrete probability distributions.
+    offsets : np.array of ints
+        Start of every distribution in `probs`, followed by `len(probs)`.
+    use_numba : bool
+        Whether to use the compiled Numba kernel. If None, Numba is used if it is
+        installed. Default is None.
+
+    Returns
+    -------
+    J : np.array of ints
+        The concatenated alias tables.
+    q : np.array of floats
+        The concatenated probability tables.
+    """
+    probs = np.asarray(probs, dtype=np.float64)
+    offsets = np.asarray(offsets, dtype=np.int64)
+    if np.any(probs < 0):
+        kk = int(np.flatnonzero(probs < 0)[0])
+        raise ValueError(
+            f"[ERROR]: probs must all be non-negative but probs[{kk}] is {probs[kk]}."
+        )
+    if use_numba is None:
+        use_numba = numba is not None
+    if use_numba:
+        if numba is None:
+            raise ImportError("[ERROR] use_numba=True requires Numba to be installed.")
+        J = np.zeros(len(probs), dtype=np.int64)
+        q = np.zeros(len(probs), dtype=np.float64)
+        _alias_setup_rows_numba(probs, offsets, J, q)
+        return J, q
+
+    return _alias_setup_batch_numpy(probs, offsets)
+
+
+def _alias_setup_batch_numpy(probs, offsets):
+    """
+    Vectorized NumPy implementation of `alias_setup_batch`.
+
+    `alias_setup` pairs the small outcomes (q < 1) in descending index order with the
+    large outcomes (q >= 1) in descending index order: the current large outcome
+    donates to small outcomes until it becomes small itself, in which case it is
+    topped up by the next large outcome. With the cumulative deficits D of the small
+    outcomes and the cumulative excesses E of the large outcomes of a distribution,
+    small outcome i is served by the first large outcome j with E_j >= D_{i-1}, and
+    large outcome j is exhausted by the first small outcome i with D_i > E_j. Both
+    searches are done for all distributions at once.
+
+    The comparisons of E and D are exact ties in exact arithmetic whenever a large
+    outcome ends with q == 1 (common with integer weights), and then depend on the
+    rounding of the sequential subtractions. Distributions with such near-ties are
+    rebuilt with the sequential kernel so that they equal `alias_setup`.
+    """
+    sizes = np.diff(offsets)
+    num_rows = len(sizes)
+    rows = np.repeat(np.arange(num_rows), sizes)
+    local = np.arange(len(probs)) - offsets[rows]
+
+    q = sizes[rows] * probs
+    J = np.zeros(len(probs), dtype=np.int64)
+
+    # Small and large outcomes in the order in which alias_setup pops them. Reversing
+    # the flat order reverses the order within every distribution.
+    is_small = q < 1.0
+    small = np.flatnonzero(is_small)[::-1]
+    large = np.flatnonzero(~is_small)[::-1]
+    small_rows = rows[small]
+    large_rows = rows[large]
+    small_first, num_small = _segment_starts(small_rows, num_rows)
+    large_first, num_large = _segment_starts(large_rows, num_rows)
+
+    # Cumulative deficits of the small outcomes and excesses of the large outcomes
+    d = 1.0 - q[small]
+    D = _segmented_cumsum(d, small_rows)
+    E = _segmented_cumsum(q[large] - 1.0, large_rows)
+
+    # Small outcomes: alias to the large outcome which is active when they are served
+    jj = _segmented_count(E, large_rows, D - d, small_rows, strict=True)
+    served = jj < num_large[small_rows]
+    J[small[served]] = local[large[large_first[small_rows[served]] + jj[served]]]
+
+    # Large outcomes which are exhausted become small and are topped up by the next
+    # large outcome
+    kk = _segmented_count(D, small_rows, E, large_rows, strict=False)
+    exhausted = kk < num_small[large_rows]
+    ex = np.flatnonzero(exhausted)
+    q[large[ex]] = 1.0 + E[ex] - D[small_first[large_rows[ex]] + kk[ex]]
+    pos_in_row = np.arange(len(large)) - large_first[large_rows]
+    has_next = ex[pos_in_row[ex] + 1 < num_large[large_rows[ex]]]
+    J[large[has_next]] = local[large[has_next + 1]]
+
+    # The first large outcome of every distribution which is not exhausted keeps the
+    # remaining mass. Large outcomes after it are never touched.
+    previous_exhausted = np.zeros(len(large), dtype=bool)
+    previous_exhausted[1:] = exhausted[:-1]
+    active = np.flatnonzero(~exhausted & ((pos_in_row == 0) | previous_exhausted))
+    D_total = np.zeros(num_rows)
+    has_small = num_small > 0
+    D_total[has_small] = D[small_first[has_small] + num_small[has_small] - 1]
+    q[large[active]] = 1.0 + E[active] - D_total[large_rows[active]]
+
+    tied = np.flatnonzero(
+        _near_ties(D, E, kk, small_first, num_small, large_rows, sizes)
+    )
+    if len(tied) > 0:
+        tied_offsets = np.zeros(len(tied) + 1, dtype=np.int64)
+        np.cumsum(sizes[tied], out=tied_offsets[1:])
+        positions = np.repeat(
+            offsets[tied] - tied_offsets[:-1], sizes[tied]
+        ) + np.arange(tied_offsets[-1])
+        J_tied = np.zeros(len(positions), dtype=np.int64)
+        q_tied = np.zeros(len(positions), dtype=np.float64)
+        kernel = _alias_setup_rows_numba or _alias_setup_rows
+        kernel(probs[positions], tied_offsets, J_tied, q_tied)
+        J[positions] = J_tied
+        q[positions] = q_tied
+
+    return J, q
+
+
+def _near_ties(D, E, kk, small_first, num_small, large_rows, sizes):
+    """
+    Distributions in which a cumulative excess E is within rounding error of 0 or of a
+    cumulative deficit D, i.e., in which the vectorized pairing may differ from the
+    sequential one. `kk` is the number of deficits of the same distribution which are
+    smaller than or equal to every excess, so only the deficits next to it are close.
+    The total excess and the total deficit of a distribution are always equal, which
+    does not affect the pairing.
+    """
+    # The tolerance grows with the size of a distribution, which bounds E and D and
+    # the number of subtractions of the sequential algorithm
+    tol = 1e-9 * np.maximum(sizes[large_rows], 1)
+    num_small = num_small[large_rows]
+    pos = small_first[large_rows] + kk
+
+    close = (num_small > 0) & (E <= tol)
+    below = np.flatnonzero(kk > 0)
+    close[below] |= E[below] - D[pos[below] - 1] <= tol[below]
+    above = np.flatnonzero(kk < num_small)
+    close[above] |= D[pos[above]] - E[above] <= tol[above]
+    # Skip the last excess of every distribution, the total excess
+    if len(E) > 0:
+        close[np.r_[large_rows[1:] != large_rows[:-1], True]] = False
+
+    tied = np.zeros(len(sizes), dtype=bool)
+    tied[large_rows[close]] = True
+    return tied
+
+
+def _segment_starts(segments, num_segments):
+    """
+    Start position and length of every segment in an array whose equal segment IDs are
+    contiguous.
+    """
+    lengths = np.bincount(segments, minlength=num_segments)
+    first = np.zeros(num_segments, dtype=np.int64)
+    if len(segments) > 0:
+        starts = np.flatnonzero(np.r_[True, segments[1:] != segments[:-1]])
+        first[segments[starts]] = starts
+    return first, lengths
+
+
+def _segmented_cumsum(values, segments):
+    """
+    Inclusive cumulative sum which restarts at every segment. Equal segment IDs must be
+    contiguous. The running total is reset at the start of every segment so that
+    rounding errors do not grow with the total length of the array.
+    """
+    if len(values) == 0:
+        return values.copy()
+    starts = np.flatnonzero(np.r_[True, segments[1:] != segments[:-1]])
+    sums = np.add.reduceat(values, starts)
+    values = values.copy()
+    values[starts[1:]] -= sums[:-1]
+    return np.cumsum(values)
+
+
+def _segmented_count(events, event_segments, queries, query_segments, strict):
+    """
+    For every query, count the events of the same segment which are smaller than
+    (`strict`) or smaller than or equal to (not `strict`) the query.
+    """
+    num_events = len(events)
+    values = np.concatenate([events, queries])
+    segments = np.concatenate([event_segments, query_segments])
+    is_event = np.zeros(len(values), dtype=np.int64)
+    is_event[:num_events] = 1
+    # Break ties between events and queries according to `strict`
+    ties = is_event if strict else 1 - is_event
+    order = np.lexsort((ties, values, segments))
+
+    events_before = np.cumsum(is_event[order]) - is_event[order]
+    is_query = order >= num_events
+    counts = np.empty(len(queries), dtype=np.int64)
+    counts[order[is_query] - num_events] = events_before[is_query]
+    # Remove the events of all preceding segments
+    counts -= np.searchsorted(np.sort(event_segments), query_segments, side="left")
+
+    return counts
+
+
+def _alias_setup_rows(probs, offsets, J, q):
+    """
+    Sequential `alias_setup` over every distribution of a batch, writing into the flat
+    tables `J` and `q`. Compiled with Numba if it is installed.
+    """
+    max_size = 0
+    for r in range(len(offsets) - 1):
+        max_size = max(max_size, offsets[r + 1] - offsets[r])
+    smaller = np.empty(max_size, dtype=np.int64)
+    larger = np.empty(max_size, dtype=np.int64)
+
+    for r in range(len(offsets) - 1):
+        start = offsets[r]
+        K = offsets[r + 1] - start
+        num_smaller = 0
+        num_larger = 0
+        for kk in range(K):
+            q[start + kk] = K * probs[start + kk]
+            if q[start + kk] < 1.0:
+                smaller[num_smaller] = kk
+                num_smaller += 1
+            else:
+                larger[num_larger] = kk
+                num_larger += 1
+
+        while num_smaller > 0 and num_larger > 0:
+            num_smaller -= 1
+            small = smaller[num_smaller]
+            num_larger -= 1
+            large = larger[num_larger]
+
+            J[start + small] = large
+            q[start + large] = q[start + large] - (1.0 - q[start + small])
+
+            if q[start + large] < 1.0:
+                smaller[num_smaller] = large
+                num_smaller += 1
+            else:
+                larger[num_larger] = large
+                num_larger += 1
+
+
+if numba is not None:
+    _alias_setup_rows_numba = numba.njit(cache=True)(_alias_setup_rows)
+else:
+    _alias_setup_rows_numba = None
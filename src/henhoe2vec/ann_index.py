@@ -0,0 +1,292 @@
+from pathlib import Path
+import numpy as np
+from .artifacts import save_artifact, load_artifact
+from .embeddings import load_embeddings
+
+# Number of rows per inverted list used to train the centroids
+TRAINING_ROWS_PER_LIST = 256
+# Number of rows assigned to centroids at once
+ASSIGN_CHUNK_SIZE = 1 << 16
+
+
+def index_path(output_dir, output_name="embeddings"):
+    """
+    Path of the ANN index saved next to embeddings with output_format "npy".
+
+    Parameters
+    ----------
+    output_dir : str or pathlib.Path object
+        Directory of the embedding files.
+    output_name : str
+        Name of the embedding files (without suffix). Default is "embeddings".
+
+    Returns
+    -------
+    pathlib.Path object
+        Path of the index directory.
+    """
+    return Path(output_dir).joinpath(f"{output_name}.ivf")
+
+
+def embeddings_stamp(output_dir, output_name="embeddings"):
+    """
+    Size and modification time of the saved embedding matrix. An index is stale if
+    the stamp of the embeddings changed since the index was built.
+    """
+    stat = Path(output_dir).joinpath(f"{output_name}.npy").stat()
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+class IVFIndex:
+    """
+    Inverted file (IVF) index for approximate cosine similarity search over node
+    embeddings.
+
+    The normalized embeddings are clustered by spherical k-means. Every row is stored
+    in the inverted list of its closest centroid, further split by the layer of its
+    node, so a query only scores the rows of the `n_probe` lists closest to it, and
+    only of one layer if the search is restricted to that layer. The index only stores
+    row numbers; the rows are scored exactly against the embedding matrix (see
+    `EmbeddingStore.top_k`).
+
+    Attributes
+    ----------
+    centroids : np.array of floats
+        Unit-norm centroid of every inverted list.
+    layers : list of strs
+        Sorted layer vocabulary.
+    offsets : np.array of ints
+        Offsets of the (list, layer) buckets into `rows`. Bucket `list * len(layers) +
+        layer` holds the rows `rows[offsets[bucket] : offsets[bucket + 1]]`.
+    rows : np.array of ints
+        Embedding rows sorted by bucket.
+    stamp : list
+        Stamp of the indexed embeddings (see `embeddings_stamp`), or None.
+    """
+
+    def __init__(self, centroids, layers, offsets, rows, stamp=None):
+        """
+        Constructor for the IVFIndex class. Use `build` to build an index.
+        """
+        self.centroids = centroids
+        self.layers = list(layers)
+        self.offsets = offsets
+        self.rows = rows
+        self.stamp = stamp
+        self._layer_ids = {layer: i for i, layer in enumerate(self.layers)}
+
+    @property
+    def num_lists(self):
+        return len(self.centroids)
+
+    @classmethod
+    def build(
+        cls,
+        vectors,
+        nodes,
+        num_lists=None,
+        iterations=10,
+        seed=None,
+        stamp=None,
+    ):
+        """
+        Build an index over embeddings.
+
+        Parameters
+        ----------
+        vectors : np.array of floats
+            Embedding matrix with one row per node.
+        nodes : list of 2-tuples of strs
+            Node of every row of `vectors` as (node, layer) tuple.
+        num_lists : int
+            Number of inverted lists. If None, the square root of the number of rows is
+            used. An index over no rows has no lists. Default is None.
+        iterations : int
+            Number of k-means iterations. Default is 10.
+        seed : int
+            Seed for sampling the training rows and initial centroids. Default is None.
+        stamp : list
+            Stamp of the indexed embeddings (see `embeddings_stamp`). Default is None.
+
+        Returns
+        -------
+        IVFIndex
+            The index.
+        """
+        num_rows = len(vectors)
+        if num_lists is None:
+            num_lists = int(np.sqrt(num_rows))
+        num_lists = min(max(1, num_lists), num_rows)
+        rng = np.random.default_rng(seed)
+
+        # Train the centroids on a sample of the rows
+        num_training = min(num_rows, TRAINING_ROWS_PER_LIST * num_lists)
+        training = np.sort(rng.choice(num_rows, num_training, replace=False))
+        training = _normalize(np.asarray(vectors[training], dtype=np.float32))
+        centroids = training[rng.choice(num_training, num_lists, replace=False)]
+        for _ in range(iterations if num_lists > 0 else 0):
+            assignment = np.argmax(training @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assignment, training)
+            counts = np.bincount(assignment, minlength=num_lists)
+            # Reseed empty lists with random training rows
+            empty = counts == 0
+            sums[empty] = training[rng.choice(num_training, empty.sum())]
+            centroids = _normalize(sums)
+
+        # Assign all rows to their closest centroid
+        assignment = np.concatenate(
+            [
+                np.argmax(
+                    np.asarray(vectors[start : start + ASSIGN_CHUNK_SIZE])
+                    @ centroids.T,
+                    axis=1,
+                )
+                for start in range(0, num_rows, ASSIGN_CHUNK_SIZE)
+            ]
+            or [np.empty(0, dtype=np.int64)]
+        )
+
+        layer_names = [node[1] for node in nodes]
+        layers = sorted(set(layer_names))
+        layer_ids = {layer: i for i, layer in enumerate(layers)}
+        row_layers = np.fromiter(
+            (layer_ids[layer] for layer in layer_names), np.int64, num_rows
+        )
+        buckets = assignment * len(layers) + row_layers
+        rows = np.argsort(buckets, kind="stable")
+        offsets = np.zeros(num_lists * len(layers) + 1, dtype=np.int64)
+        np.cumsum(
+            np.bincount(buckets, minlength=num_lists * len(layers)), out=offsets[1:]
+        )
+
+        return cls(centroids, layers, offsets, rows, stamp)
+
+    def candidates(self, query, n_probe=8, layer=None):
+        """
+        Rows in the `n_probe` inverted lists closest to a query.
+
+        Parameters
+        ----------
+        query : np.array of floats
+            Unit-norm query vector.
+        n_probe : int
+            Number of inverted lists to search. Default is 8.
+        layer : str
+            If given, only rows of nodes in this layer are returned. Default is None.
+
+        Returns
+        -------
+        np.array of ints
+            Candidate rows, sorted.
+
+        Raises
+        ------
+        ValueError
+            If `n_probe` is smaller than 1.
+        """
+        if n_probe < 1:
+            raise ValueError("[ERROR] n_probe must be at least 1.")
+        if self.num_lists == 0:
+            return np.empty(0, dtype=np.int64)
+        n_probe = min(n_probe, self.num_lists)
+        scores = self.centroids @ query
+        probe = np.argpartition(-scores, n_probe - 1)[:n_probe]
+        num_layers = len(self.layers)
+        if layer is None:
+            buckets = (probe[:, None] * num_layers + np.arange(num_layers)).ravel()
+        elif layer in self._layer_ids:
+            buckets = probe * num_layers + self._layer_ids[layer]
+        else:
+            return np.empty(0, dtype=np.int64)
+
+        return np.sort(
+            np.concatenate(
+                [self.rows[self.offsets[b] : self.offsets[b + 1]] for b in buckets]
+            )
+        )
+
+    def save(self, directory):
+        """
+        Save the index as an artifact directory (see `artifacts.save_artifact`).
+
+        Parameters
+        ----------
+        directory : str or pathlib.Path object
+            Path of the index directory, e.g., `index_path(output_dir, output_name)`.
+        """
+        save_artifact(
+            directory,
+            {"centroids": self.centroids, "offsets": self.offsets, "rows": self.rows},
+            {"layers": self.layers, "stamp": self.stamp},
+        )
+
+    @classmethod
+    def load(cls, directory, mmap=True):
+        """
+        Load an index saved with `save`.
+
+        Parameters
+        ----------
+        directory : str or pathlib.Path object
+            Path of the index directory.
+        mmap : bool
+            Whether to memory-map the index instead of reading it into memory. Default
+            is True.
+
+        Returns
+        -------
+        IVFIndex
+            The index.
+        """
+        arrays, meta = load_artifact(directory, mmap)
+        return cls(
+            arrays["centroids"],
+            meta["layers"],
+            arrays["offsets"],
+            arrays["rows"],
+            meta["stamp"],
+        )
+
+
+def build_index(output_dir, output_name="embeddings", num_lists=None, seed=None):
+    """
+    Build an index over embeddings saved with output_format "npy" and save it next to
+    them, where `EmbeddingStore.open` picks it up.
+
+    Parameters
+    ----------
+    output_dir : str or pathlib.Path object
+        Directory of the embedding files.
+    output_name : str
+        Name of the embedding files (without suffix). Default is "embeddings".
+    num_lists : int
+        Number of inverted lists. If None, the square root of the number of nodes is
+        used. Default is None.
+    seed : int
+        Seed for building the index. Default is None.
+
+    Returns
+    -------
+    IVFIndex
+        The index.
+    """
+    nodes, vectors = load_embeddings(output_dir, output_name)
+    index = IVFIndex.build(
+        vectors,
+        nodes,
+        num_lists,
+        seed=seed,
+        stamp=embeddings_stamp(output_dir, output_name),
+    )
+    index.save(index_path(output_dir, output_name))
+
+    return index
+
+
+def _normalize(vectors):
+    """
+    Scale the rows of a matrix to unit norm (leaving zero rows unchanged).
+    """
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.where(norms > 0, norms, 1)
@@ -0,0 +1,132 @@
+import hashlib
+import json
+import os
+import shutil
+from pathlib import Path
+import numpy as np
+
+# Bump to invalidate all cached artifacts when their layout changes
+ARTIFACT_VERSION = 1
+
+
+def fingerprint(key):
+    """
+    Stable hex digest of a JSON-serializable cache key.
+
+    Parameters
+    ----------
+    key : dict
+        Everything the cached artifact depends on.
+
+    Returns
+    -------
+    str
+        SHA-256 hex digest of the key and `ARTIFACT_VERSION`.
+    """
+    payload = json.dumps(
+        {"version": ARTIFACT_VERSION, "key": key}, sort_keys=True, default=str
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def hash_arrays(*arrays):
+    """
+    Hex digest of the contents, shapes and types of numpy arrays.
+
+    Parameters
+    ----------
+    *arrays : np.array
+        Arrays to hash.
+
+    Returns
+    -------
+    str
+        SHA-256 hex digest.
+    """
+    h = hashlib.sha256()
+    for array in arrays:
+        array = np.ascontiguousarray(array)
+        h.update(f"{array.dtype.str}{array.shape}".encode("utf-8"))
+        h.update(memoryview(array).cast("B"))
+    return h.hexdigest()
+
+
+def save_artifact(directory, arrays, meta):
+    """
+    Save numpy arrays and JSON metadata as an artifact directory with one .npy file per
+    array and a meta.json file.
+
+    The artifact is written into a temporary directory first and then renamed, so
+    readers never see a partially written artifact.
+
+    Parameters
+    ----------
+    directory : str or pathlib.Path object
+        Path of the artifact directory. An existing artifact is replaced.
+    arrays : dict
+        Numpy arrays keyed by name. Arrays must not have object dtype.
+    meta : dict
+        JSON-serializable metadata.
+    """
+    directory = Path(directory)
+    directory.parent.mkdir(parents=True, exist_ok=True)
+    tmp = directory.with_name(f"{directory.name}.tmp-{os.getpid()}")
+    shutil.rmtree(tmp, ignore_errors=True)
+    tmp.mkdir()
+    try:
+        for name, array in arrays.items():
+            np.save(tmp.joinpath(f"{name}.npy"), array, allow_pickle=False)
+        with open(tmp.joinpath("meta.json"), "w") as f:
+            json.dump({"arrays": sorted(arrays), "meta": meta}, f)
+        shutil.rmtree(directory, ignore_errors=True)
+        os.replace(tmp, directory)
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+def load_artifact(directory, mmap=True):
+    """
+    Load an artifact directory written by `save_artifact`.
+
+    Parameters
+    ----------
+    directory : str or pathlib.Path object
+        Path of the artifact directory.
+    mmap : bool
+        Whether to memory-map the arrays (read-only) instead of reading them into
+        memory. Default is True.
+
+    Returns
+    -------
+    arrays : dict
+        Numpy arrays keyed by name.
+    meta : dict
+        The metadata.
+
+    Raises
+    ------
+    FileNotFoundError
+        If there is no complete artifact at `directory`.
+    """
+    directory = Path(directory)
+    with open(directory.joinpath("meta.json")) as f:
+        content = json.load(f)
+    arrays = {
+        name: _load_array(directory.joinpath(f"{name}.npy"), mmap)
+        for name in content["arrays"]
+    }
+
+    return arrays, content["meta"]
+
+
+def _load_array(path, mmap):
+    """
+    Load a .npy file, memory-mapped if `mmap` and the array is not empty.
+    """
+    if mmap:
+        try:
+            return np.load(path, mmap_mode="r", allow_pickle=False)
+        except ValueError:
+            # Empty arrays cannot be memory-mapped
+            pass
+    return np.load(path, allow_pickle=False)
@@ -0,0 +1,379 @@
+from pathlib import Path
+import numpy as np
+from .embeddings import load_node_index
+from .ann_index import IVFIndex, index_path, embeddings_stamp
+
+
+class EmbeddingStore:
+    """
+    Read-side access to node embeddings saved with output_format "npy" (see
+    `embeddings.generate_embeddings`).
+
+    The embedding matrix (and its row norms, if saved) is memory-mapped, so opening a
+    store is cheap and worker processes which open the same files share their pages.
+    The node index is only read on first use. Nodes are (node, layer) tuples.
+
+    Attributes
+    ----------
+    vectors : np.array of floats
+        Read-only float32 embedding matrix with one row per node.
+    index : IVFIndex
+        ANN index for approximate similarity queries, or None.
+    """
+
+    # Number of embedding rows scored at once in similarity queries
+    QUERY_CHUNK_SIZE = 1 << 16
+
+    def __init__(self, vectors, nodes=None, norms=None, node_loader=None, index=None):
+        """
+        Constructor for the EmbeddingStore class. Use `open` to open saved embeddings.
+
+        Parameters
+        ----------
+        vectors : np.array of floats
+            Embedding matrix with one row per node.
+        nodes : list of 2-tuples of strs
+            Node of every row of `vectors`. May be None if `node_loader` is given.
+            Default is None.
+        norms : np.array of floats
+            Euclidean norm of every row of `vectors`. Computed on demand if None.
+            Default is None.
+        node_loader : function
+            Function without arguments which returns `nodes`, called on first use.
+            Default is None.
+        index : IVFIndex
+            ANN index over `vectors` for approximate similarity queries. Default is
+            None.
+        """
+        if nodes is None and node_loader is None:
+            raise ValueError("[ERROR] Either nodes or node_loader must be given.")
+        self.vectors = vectors
+        self._nodes = list(nodes) if nodes is not None else None
+        self._node_loader = node_loader
+        self._norms = norms
+        self.index = index
+        # Built on demand
+        self._node_rows = None
+        self._layers = None
+        self._row_layers = None
+
+    @classmethod
+    def open(cls, output_dir, output_name="embeddings", mmap=True):
+        """
+        Open embeddings saved with output_format "npy", together with their ANN index
+        if one was built (see `ann_index.build_index`) and is up to date.
+
+        Parameters
+        ----------
+        output_dir : str or pathlib.Path object
+            Directory of the embedding files.
+        output_name : str
+            Name of the embedding files (without suffix). Default is "embeddings".
+        mmap : bool
+            Whether to memory-map the embedding matrix instead of reading it into
+            memory. Default is True.
+
+        Returns
+        -------
+        EmbeddingStore
+            Store over the saved embeddings.
+        """
+        output_dir = Path(output_dir)
+        mmap_mode = "r" if mmap else None
+        vectors = np.load(
+            output_dir.joinpath(f"{output_name}.npy"), mmap_mode=mmap_mode
+        )
+        norms_path = output_dir.joinpath(f"{output_name}.norms.npy")
+        norms = (
+            np.load(norms_path, mmap_mode=mmap_mode) if norms_path.is_file() else None
+        )
+        index = None
+        if index_path(output_dir, output_name).is_dir():
+            index = IVFIndex.load(index_path(output_dir, output_name), mmap)
+            if index.stamp != embeddings_stamp(output_dir, output_name):
+                # The embeddings changed since the index was built
+                index = None
+
+        return cls(
+            vectors,
+            norms=norms,
+            node_loader=lambda: load_node_index(output_dir, output_name),
+            index=index,
+        )
+
+    def __len__(self):
+        return len(self.vectors)
+
+    def __contains__(self, node):
+        return node in self.node_rows
+
+    @property
+    def nodes(self):
+        """
+        Node of every row as (node, layer) tuple.
+        """
+        if self._nodes is None:
+            self._nodes = self._node_loader()
+        return self._nodes
+
+    @property
+    def node_rows(self):
+        """
+        Mapping from (node, layer) tuples to rows.
+        """
+        if self._node_rows is None:
+            self._node_rows = {node: row for row, node in enumerate(self.nodes)}
+        return self._node_rows
+
+    @property
+    def norms(self):
+        """
+        Euclidean norm of every row.
+        """
+        if self._norms is None:
+            self._norms = np.concatenate(
+                [
+                    np.linalg.norm(
+                        self.vectors[start : start + self.QUERY_CHUNK_SIZE], axis=1
+                    )
+                    for start in range(0, len(self.vectors), self.QUERY_CHUNK_SIZE)
+                ]
+                or [np.empty(0, dtype=np.float32)]
+            )
+        return self._norms
+
+    @property
+    def layers(self):
+        """
+        Sorted layer vocabulary.
+        """
+        self._build_layers()
+        return self._layers
+
+    def _build_layers(self):
+        if self._row_layers is None:
+            layer_names = [node[1] for node in self.nodes]
+            self._layers = sorted(set(layer_names))
+            layer_ids = {layer: i for i, layer in enumerate(self._layers)}
+            self._row_layers = np.fromiter(
+                (layer_ids[layer] for layer in layer_names), np.int32, len(layer_names)
+            )
+
+    def layer_rows(self, layer):
+        """
+        Parameters
+        ----------
+        layer : str
+            Name of a layer.
+
+        Returns
+        -------
+        np.array of ints
+            Rows of the nodes in `layer`.
+        """
+        self._build_layers()
+        if layer not in self._layers:
+            return np.empty(0, dtype=np.int64)
+        return np.flatnonzero(self._row_layers == self._layers.index(layer))
+
+    def row(self, node):
+        """
+        Parameters
+        ----------
+        node : 2-tuple of strs
+            A node, e.g., ('n1','l1').
+
+        Returns
+        -------
+        int
+            Row of `node`.
+        """
+        try:
+            return self.node_rows[tuple(node)]
+        except KeyError:
+            raise KeyError(f"[ERROR] Node {node} has no embedding.") from None
+
+    def rows(self, nodes):
+        """
+        Vectorized version of `row`.
+
+        Parameters
+        ----------
+        nodes : list of 2-tuples of strs
+            Nodes.
+
+        Returns
+        -------
+        np.array of ints
+            Row of every node.
+        """
+        return np.fromiter((self.row(node) for node in nodes), np.int64, len(nodes))
+
+    def vector(self, node):
+        """
+        Parameters
+        ----------
+        node : 2-tuple of strs
+            A node.
+
+        Returns
+        -------
+        np.array of floats
+            Embedding of `node` (a read-only view).
+        """
+        return self.vectors[self.row(node)]
+
+    def get_vectors(self, nodes):
+        """
+        Parameters
+        ----------
+        nodes : list of 2-tuples of strs
+            Nodes.
+
+        Returns
+        -------
+        np.array of floats
+            Embeddings of `nodes` as a matrix with one row per node.
+        """
+        return self.vectors[self.rows(nodes)]
+
+    def most_similar(self, nodes, k=10, layer=None, n_probe=None):
+        """
+        Top-k most similar nodes of every node in `nodes` by cosine similarity. The
+        query nodes themselves are excluded.
+
+        Parameters
+        ----------
+        nodes : list of 2-tuples of strs
+            Query nodes.
+        k : int
+            Number of similar nodes per query node. Default is 10.
+        layer : str
+            If given, only nodes in this layer are returned. Default is None.
+        n_probe : int
+            If given, search approximately with the ANN index (see `top_k`). Default is
+            None.
+
+        Returns
+        -------
+        list of lists of 2-tuples
+            For every query node, up to `k` (node, similarity) pairs, most similar
+            first.
+        """
+        rows = self.rows(nodes)
+        top_rows, top_scores = self.top_k(
+            self.vectors[rows], k, layer, exclude=rows, n_probe=n_probe
+        )
+        return [
+            [
+                (self.nodes[row], float(score))
+                for row, score in zip(query_rows, query_scores)
+                if row >= 0
+            ]
+            for query_rows, query_scores in zip(top_rows.tolist(), top_scores.tolist())
+        ]
+
+    def top_k(self, queries, k=10, layer=None, exclude=None, n_probe=None):
+        """
+        Vectorized top-k search by cosine similarity.
+
+        By default, the search is exact: the embedding matrix is scored in chunks of
+        `QUERY_CHUNK_SIZE` rows against all queries at once. If `n_probe` is given, the
+        search is approximate: every query only scores the rows in the `n_probe`
+        inverted lists of the ANN index closest to it.
+
+        Parameters
+        ----------
+        queries : np.array of floats
+            Query vectors as a matrix with one row per query.
+        k : int
+            Number of results per query. Default is 10.
+        layer : str
+            If given, only rows of nodes in this layer are searched. Default is None.
+        exclude : np.array of ints
+            Row to exclude from the results of every query (e.g., the row of the query
+            node), or -1. Default is None.
+        n_probe : int
+            Number of inverted lists of the ANN index to search per query. If None, the
+            search is exact. Default is None.
+
+        Returns
+        -------
+        rows : np.array of ints
+            Matrix of shape (number of queries, `k`) of the most similar rows, most
+            similar first, padded with -1 if there are fewer than `k` candidates.
+        scores : np.array of floats
+            Cosine similarities aligned with `rows`, padded with -inf.
+        """
+        queries = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+        num_queries = len(queries)
+        query_norms = np.linalg.norm(queries, axis=1)
+        queries = queries / np.where(query_norms > 0, query_norms, 1)[:, None]
+        if exclude is None:
+            exclude = np.full(num_queries, -1, dtype=np.int64)
+        if n_probe is not None:
+            if self.index is None:
+                raise ValueError("[ERROR] Approximate search requires an ANN index.")
+            return self._top_k_approximate(queries, k, layer, exclude, n_probe)
+
+        candidates = self.layer_rows(layer) if layer is not None else None
+        num_candidates = len(self) if candidates is None else len(candidates)
+
+        top_rows = np.full((num_queries, k), -1, dtype=np.int64)
+        top_scores = np.full((num_queries, k), -np.inf, dtype=np.float32)
+        for start in range(0, num_candidates, self.QUERY_CHUNK_SIZE):
+            stop = min(start + self.QUERY_CHUNK_SIZE, num_candidates)
+            if candidates is None:
+                chunk_rows = np.arange(start, stop)
+                chunk = self.vectors[start:stop]
+                chunk_norms = self.norms[start:stop]
+            else:
+                chunk_rows = candidates[start:stop]
+                chunk = self.vectors[chunk_rows]
+                chunk_norms = self.norms[chunk_rows]
+            scores = queries @ chunk.T
+            scores /= np.where(chunk_norms > 0, chunk_norms, 1)
+            scores[chunk_rows[None, :] == exclude[:, None]] = -np.inf
+
+            # Merge the chunk into the running top-k
+            rows = np.concatenate(
+                [top_rows, np.broadcast_to(chunk_rows, scores.shape)], axis=1
+            )
+            scores = np.concatenate([top_scores, scores], axis=1)
+            best = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+            top_rows = np.take_along_axis(rows, best, axis=1)
+            top_scores = np.take_along_axis(scores, best, axis=1)
+
+        return _sorted_top_k(top_rows, top_scores)
+
+    def _top_k_approximate(self, queries, k, layer, exclude, n_probe):
+        """
+        Top-k search over the candidates of the ANN index, one query at a time.
+        """
+        top_rows = np.full((len(queries), k), -1, dtype=np.int64)
+        top_scores = np.full((len(queries), k), -np.inf, dtype=np.float32)
+        for i, query in enumerate(queries):
+            candidates = self.index.candidates(query, n_probe, layer)
+            candidates = candidates[candidates != exclude[i]]
+            if len(candidates) == 0:
+                continue
+            norms = self.norms[candidates]
+            scores = self.vectors[candidates] @ query
+            scores /= np.where(norms > 0, norms, 1)
+            best = np.argpartition(-scores, min(k, len(scores)) - 1)[:k]
+            top_rows[i, : len(best)] = candidates[best]
+            top_scores[i, : len(best)] = scores[best]
+
+        return _sorted_top_k(top_rows, top_scores)
+
+
+def _sorted_top_k(top_rows, top_scores):
+    """
+    Sort top-k results by decreasing similarity and pad missing results with -1.
+    """
+    order = np.argsort(-top_scores, axis=1, kind="stable")
+    top_rows = np.take_along_axis(top_rows, order, axis=1)
+    top_scores = np.take_along_axis(top_scores, order, axis=1)
+    top_rows[np.isneginf(top_scores)] = -1
+
+    return top_rows, top_scores
@@ -1,6 +1,15 @@
+import time
 from gensim.models import word2vec as w2v
 from pathlib import Path
+import numpy as np
+import pandas as pd
 from . import utils
+from .walk_corpus import WalkCorpus
+from .walk_file import WalkFile
+from .instrumentation import NULL_INSTRUMENTATION
+
+# Formats in which embeddings can be saved
+OUTPUT_FORMATS = ["csv", "npy"]
 
 
 def generate_embeddings(
@@ -12,15 +21,23 @@ def generate_embeddings(
     epochs=1,
     workers=8,
     verbose=True,
+    nodes=None,
+    save_model=False,
+    output_format="csv",
+    instrumentation=None,
 ):
     """
     Learn the embeddings of the nodes by optimizing the Skip-Gram objective using SGD.
-    Save embeddings to `output_dir` in word2vec and csv format.
+    Save embeddings to `output_dir` in csv or binary format.
 
     Parameters
     ----------
-    walks : list of list of 2-tuples of strs
-        The list of random walks generated over the HeNHoE network.
+    walks : WalkCorpus or WalkFile or np.array of ints or list of list of ints or list
+        of list of 2-tuples of strs
+        The random walks generated over the HeNHoE network, e.g., the walk matrix from
+        `HenHoe2vec.simulate_walks`. Negative entries (padding after dead ends) are
+        skipped. A WalkCorpus or WalkFile is streamed to word2vec without materializing
+        the walks.
     output_dir : str
         Path of the output directory where the embedding files shall be saved, e.g.,
         "project/output/".
@@ -37,11 +54,37 @@ def generate_embeddings(
         Number of parallel workers (threads). Default is 8.
     verbose : bool
         Whether to print status messages. Default is True.
+    nodes : list of 2-tuples of strs
+        Node vocabulary used to translate the node IDs in `walks` into node names, e.g.,
+        `MultilayerGraph.nodes`. If None, the entries of `walks` are used as node names.
+        Default is None.
+    save_model : bool
+        Whether to also save the word2vec model as `output_name`.model in `output_dir`,
+        e.g., to update it later with `update_embeddings`. Default is False.
+    output_format : str
+        "csv": Tab-separated `output_name`.csv file with the node names as first
+        column, sorted by node name.
+        "npy": The float32 embedding matrix as `output_name`.npy, written directly from
+        the word2vec model, and the nodes of its rows as a tab-separated
+        `output_name`.nodes.tsv file with the columns 'node' and 'layer'. Load them
+        (memory-mapped) with `load_embeddings` or query them with an EmbeddingStore.
+        Default is "csv".
+    instrumentation : Instrumentation
+        Receiver of the "build_vocab" and "train_word2vec" stages (the latter with the
+        number of trained words and the training throughput). If None, no events are
+        emitted. Default is None.
+
+    Returns
+    -------
+    gensim.models.Word2Vec
+        The trained model.
     """
     # Generate embeddings
-    walks = [list(map(str, walk)) for walk in walks]
+    if instrumentation is None:
+        instrumentation = NULL_INSTRUMENTATION
+    nodes = _walk_nodes(walks, nodes)
+    walks = _tokenized_walks(walks, nodes)
     w2v_model = w2v.Word2Vec(
-        walks,
         vector_size=dimensions,
         window=window_size,
         epochs=epochs,
@@ -49,6 +92,136 @@ def generate_embeddings(
         sg=1,
         workers=workers,
     )
+    with instrumentation.stage("build_vocab"):
+        w2v_model.build_vocab(walks)
+    _train(w2v_model, walks, epochs, instrumentation)
+
+    _save_embeddings(
+        w2v_model, output_dir, output_name, verbose, save_model, output_format, nodes
+    )
+
+    return w2v_model
+
+
+def update_embeddings(
+    model_path,
+    walks,
+    output_dir,
+    output_name="embeddings",
+    epochs=1,
+    workers=8,
+    verbose=True,
+    nodes=None,
+    output_format="csv",
+    instrumentation=None,
+):
+    """
+    Continue training a saved word2vec model on new random walks, e.g., walks from the
+    neighborhoods of changed edges. Nodes which do not occur in the model yet are added
+    to its vocabulary. Save the updated model and embeddings to `output_dir` like
+    `generate_embeddings`.
+
+    Parameters
+    ----------
+    model_path : str or pathlib.Path object
+        Path of the word2vec model saved by `generate_embeddings` (with `save_model`).
+    walks : WalkCorpus or WalkFile or np.array of ints or list of list of ints or list
+        of list of 2-tuples of strs
+        The new random walks (see `generate_embeddings`).
+    output_dir : str
+        Path of the output directory where the embedding files shall be saved.
+    output_name : str
+        Name of the output .csv embedding file (without suffix). Default is
+        "embeddings".
+    epochs : int
+        Number of epochs in SGD. Default is 1.
+    workers : int
+        Number of parallel workers (threads). Default is 8.
+    verbose : bool
+        Whether to print status messages. Default is True.
+    nodes : list of 2-tuples of strs
+        Node vocabulary used to translate the node IDs in `walks` into node names. If
+        None, the entries of `walks` are used as node names. Default is None.
+    output_format : str
+        "csv" or "npy" (see `generate_embeddings`). Default is "csv".
+    instrumentation : Instrumentation
+        Receiver of events (see `generate_embeddings`). Default is None.
+
+    Returns
+    -------
+    gensim.models.Word2Vec
+        The updated model.
+    """
+    nodes = _walk_nodes(walks, nodes)
+    walks = _tokenized_walks(walks, nodes)
+    w2v_model = w2v.Word2Vec.load(str(model_path))
+    if instrumentation is None:
+        instrumentation = NULL_INSTRUMENTATION
+    w2v_model.workers = workers
+    with instrumentation.stage("build_vocab", update=True):
+        w2v_model.build_vocab(walks, update=True)
+    _train(w2v_model, walks, epochs, instrumentation)
+
+    _save_embeddings(
+        w2v_model, output_dir, output_name, verbose, True, output_format, nodes
+    )
+
+    return w2v_model
+
+
+def _train(w2v_model, walks, epochs, instrumentation):
+    """
+    Train a word2vec model with a built vocabulary on the walks for `epochs` epochs.
+    """
+    with instrumentation.stage("train_word2vec", epochs=epochs) as fields:
+        start = time.perf_counter()
+        effective_words, words = w2v_model.train(
+            walks, total_examples=w2v_model.corpus_count, epochs=epochs
+        )
+        seconds = time.perf_counter() - start
+        fields.update(
+            words=words,
+            effective_words=effective_words,
+            words_per_second=words / seconds if seconds > 0 else None,
+        )
+
+
+def _walk_nodes(walks, nodes):
+    """
+    Node vocabulary of the walks: `nodes` or the vocabulary of a walk corpus.
+    """
+    if nodes is None and isinstance(walks, WalkCorpus):
+        return walks.hh2v.N.nodes
+    if nodes is None and isinstance(walks, WalkFile):
+        return walks.nodes
+    return nodes
+
+
+def _tokenized_walks(walks, nodes):
+    """
+    Random walks as lists of node names, as expected by gensim.
+    """
+    if isinstance(walks, (WalkCorpus, WalkFile)):
+        # Already yields node names and can be iterated once per pass
+        return walks
+    if nodes is not None:
+        tokens = [str(node) for node in nodes]
+        return [[tokens[node] for node in walk if node >= 0] for walk in walks]
+    return [list(map(str, walk)) for walk in walks]
+
+
+def _save_embeddings(
+    w2v_model, output_dir, output_name, verbose, save_model, output_format, nodes
+):
+    """
+    Save the embeddings of a word2vec model to `output_dir` in `output_format` and, if
+    `save_model`, the model itself as `output_name`.model.
+    """
+    if output_format not in OUTPUT_FORMATS:
+        raise ValueError(
+            f"[ERROR] Invalid output format {output_format}. Should be one of"
+            f" {OUTPUT_FORMATS}."
+        )
 
     # Remove redundant suffix
     if ".csv" in output_name:
@@ -56,14 +229,112 @@ def generate_embeddings(
 
     # Save embeddings
     output_dir = utils.clean_output_directory(output_dir)
+    if output_format == "npy":
+        output_path = output_dir.joinpath(f"{output_name}.npy")
+        _save_embeddings_npy(w2v_model, output_dir, output_name, nodes)
+    else:
+        output_path = output_dir.joinpath(f"{output_name}.csv")
+        _save_embeddings_csv(w2v_model, output_dir, output_name)
+    if verbose:
+        print(f"[STATUS] Saved embeddings to {output_path}")
+
+    if save_model:
+        output_model = output_dir.joinpath(f"{output_name}.model")
+        w2v_model.save(str(output_model))
+        if verbose:
+            print(f"[STATUS] Saved word2vec model to {output_model}")
+
+
+def _save_embeddings_csv(w2v_model, output_dir, output_name):
+    """
+    Save embeddings as a tab-separated .csv file via a temporary word2vec .emb file.
+    """
     output_emb = output_dir.joinpath(f"{output_name}.emb")
-    w2v_model.wv.save_word2vec_format(output_emb, total_vec=dimensions)
+    w2v_model.wv.save_word2vec_format(output_emb, total_vec=w2v_model.vector_size)
 
     output_csv = output_dir.joinpath(f"{output_name}.csv")
     embedding_df = utils.emb_to_dataframe(output_emb)
     embedding_df.to_csv(output_csv, sep="\t", header=False)
-    if verbose:
-        print(f"[STATUS] Saved embeddings to {output_csv}")
 
     # Remove temporary .emb file
     output_emb.unlink()
+
+
+def _save_embeddings_npy(w2v_model, output_dir, output_name, nodes):
+    """
+    Save the embedding matrix as a .npy file, its row norms as a .norms.npy file and the
+    nodes of its rows as a .nodes.tsv file, in the row order of the word2vec model.
+    """
+    vectors = w2v_model.wv.vectors.astype(np.float32, copy=False)
+    np.save(output_dir.joinpath(f"{output_name}.npy"), vectors)
+    # Row norms for cosine similarity queries (see EmbeddingStore)
+    np.save(
+        output_dir.joinpath(f"{output_name}.norms.npy"),
+        np.linalg.norm(vectors, axis=1),
+    )
+
+    tokens = w2v_model.wv.index_to_key
+    if nodes is not None:
+        token_nodes = {str(node): node for node in nodes}
+        rows = [token_nodes[token] for token in tokens]
+        node_index = pd.DataFrame(rows, columns=["node", "layer"])
+    else:
+        node_index = pd.DataFrame({"node": tokens, "layer": ""})
+    node_index.to_csv(
+        output_dir.joinpath(f"{output_name}.nodes.tsv"), sep="\t", index=False
+    )
+
+
+def load_embeddings(output_dir, output_name="embeddings", mmap=True):
+    """
+    Load embeddings saved by `generate_embeddings` with output_format "npy".
+
+    Parameters
+    ----------
+    output_dir : str or pathlib.Path object
+        Directory of the embedding files.
+    output_name : str
+        Name of the embedding files (without suffix). Default is "embeddings".
+    mmap : bool
+        Whether to memory-map the (read-only) embedding matrix instead of reading it
+        into memory. Default is True.
+
+    Returns
+    -------
+    nodes : list of 2-tuples of strs
+        Node of every row of `vectors` as (node, layer) tuple. The layer is "" for
+        nodes which are no tuples.
+    vectors : np.array of floats
+        float32 embedding matrix with one row per node.
+    """
+    output_dir = Path(output_dir)
+    vectors = np.load(
+        output_dir.joinpath(f"{output_name}.npy"), mmap_mode="r" if mmap else None
+    )
+
+    return load_node_index(output_dir, output_name), vectors
+
+
+def load_node_index(output_dir, output_name="embeddings"):
+    """
+    Load the node index of embeddings saved with output_format "npy".
+
+    Parameters
+    ----------
+    output_dir : str or pathlib.Path object
+        Directory of the embedding files.
+    output_name : str
+        Name of the embedding files (without suffix). Default is "embeddings".
+
+    Returns
+    -------
+    list of 2-tuples of strs
+        Node of every row of the embedding matrix as (node, layer) tuple.
+    """
+    node_index = pd.read_csv(
+        Path(output_dir).joinpath(f"{output_name}.nodes.tsv"),
+        sep="\t",
+        dtype=str,
+        keep_default_na=False,
+    )
+    return list(zip(node_index["node"].tolist(), node_index["layer"].tolist()))
@@ -1,8 +1,15 @@
 import argparse
 import time
+import numpy as np
+from pathlib import Path
 from . import utils
 from . import henhoe2vec_walks
 from . import embeddings
+from .multilayer_graph import MultilayerGraph
+from .walk_corpus import WalkCorpus
+from .walk_file import WalkFile
+from .ann_index import build_index
+from .instrumentation import Instrumentation, JsonLinesSink, NULL_INSTRUMENTATION
 
 
 def parse_args():
@@ -135,7 +142,169 @@ def parse_args():
         "--workers",
         type=int,
         default=8,
-        help="Number of parallel workers (threads). Default is 8.",
+        help=(
+            "Number of parallel workers (processes for preprocessing and the random"
+            " walks, threads for word2vec). Default is 8."
+        ),
+    )
+
+    parser.add_argument(
+        "--seed",
+        type=int,
+        default=None,
+        help=(
+            "Seed for the random walks. For a given seed, the walks are the same for"
+            " any number of workers. Default is a random seed."
+        ),
+    )
+
+    parser.add_argument(
+        "--stream_walks",
+        action="store_true",
+        help=(
+            "Pass this argument to stream the random walks to word2vec chunk by chunk"
+            " instead of keeping all of them in memory. The walks are regenerated for"
+            " every pass of word2vec over the corpus."
+        ),
+    )
+
+    parser.add_argument(
+        "--walks_file",
+        type=str,
+        default=None,
+        help=(
+            "Path of a binary walk file. Walks of the same network and walk parameters"
+            " (and seed, if given) are reused from it, otherwise the walks are"
+            " generated into it. Default is None."
+        ),
+    )
+
+    parser.add_argument(
+        "--cache_dir",
+        type=str,
+        default=None,
+        help=(
+            "Directory of the binary cache of parsed networks and transition tables."
+            " The parsed network is reused by later runs on the same, unchanged edge"
+            " list with the same parsing options, the transition tables by later runs"
+            " on the same network with the same p, q and s. Default is None."
+        ),
+    )
+
+    parser.add_argument(
+        "--save_model",
+        action="store_true",
+        help=(
+            "Pass this argument to also save the word2vec model next to the embeddings"
+            " so that they can be refreshed incrementally after changes of the network."
+        ),
+    )
+
+    parser.add_argument(
+        "--output_format",
+        type=str,
+        choices=embeddings.OUTPUT_FORMATS,
+        default="csv",
+        help=(
+            "Format of the saved embeddings. 'csv' saves a tab-separated .csv file,"
+            " 'npy' a binary .npy matrix and a .nodes.tsv node index. Default is 'csv'."
+        ),
+    )
+
+    parser.add_argument(
+        "--ann_index",
+        action="store_true",
+        help=(
+            "Pass this argument to also build an approximate nearest-neighbour index"
+            " over the embeddings and save it next to them. Requires --output_format"
+            " npy."
+        ),
+    )
+
+    parser.add_argument(
+        "--events_file",
+        type=str,
+        default=None,
+        help=(
+            "Path of a JSON-lines file to which structured events (stage durations,"
+            " peak memory, table counts, walk and training throughput, cache hit"
+            " rates) are appended. Default is None."
+        ),
+    )
+
+    parser.add_argument(
+        "--profile_dir",
+        type=str,
+        default=None,
+        help=(
+            "Directory to which a cProfile dump of every stage (<stage>.prof) is"
+            " written. Default is None."
+        ),
+    )
+
+    parser.add_argument(
+        "--trace_memory",
+        action="store_true",
+        help=(
+            "Pass this argument to trace the Python heap of every stage with"
+            " tracemalloc and add its peak to the stage events. Slows down the run."
+        ),
+    )
+
+    parser.add_argument(
+        "--sampling",
+        type=str,
+        choices=henhoe2vec_walks.SAMPLING_STRATEGIES,
+        default="alias",
+        help=(
+            "Strategy for sampling the steps of the random walks. 'alias' precomputes"
+            " the transition tables of all node pairs, 'lazy' computes them on demand"
+            " and keeps them in a bounded LRU cache, 'rejection' samples from the node"
+            " transition tables by rejection sampling, 'hybrid' precomputes the"
+            " transition tables of low-degree nodes and samples the steps from hubs by"
+            " rejection sampling. Default is 'alias'."
+        ),
+    )
+
+    parser.add_argument(
+        "--cache_max_entries",
+        type=int,
+        default=None,
+        help=(
+            "Maximum number of cached transition tables in 'lazy' sampling. Default is"
+            " unbounded."
+        ),
+    )
+
+    parser.add_argument(
+        "--cache_max_bytes",
+        type=int,
+        default=None,
+        help=(
+            "Maximum total size of the cached transition tables in bytes in 'lazy'"
+            " sampling. Default is unbounded."
+        ),
+    )
+
+    parser.add_argument(
+        "--degree_threshold",
+        type=int,
+        default=None,
+        help=(
+            "Maximum degree of the nodes whose transition tables are precomputed in"
+            " 'hybrid' sampling. Default is None."
+        ),
+    )
+
+    parser.add_argument(
+        "--max_table_bytes",
+        type=int,
+        default=None,
+        help=(
+            "Maximum total size of the transition tables in bytes in 'hybrid'"
+            " sampling. The degree threshold is lowered as far as needed to stay"
+            " within it. Default is None."
+        ),
     )
 
     return parser.parse_args()
@@ -183,6 +352,44 @@ def parse_switching_param(s, s_dict):
     return switching_dict
 
 
+def _matches_walk_file(walks_file, hh2v, num_walks, walk_length, walk_seed):
+    """
+    Check whether a walk file holds walks over the network of `hh2v` with the given
+    parameters.
+
+    Parameters
+    ----------
+    walks_file : str
+        Path of the walk file.
+    hh2v : HenHoe2vec
+        HenHoe2vec object of the walks.
+    num_walks : int
+        Number of random walks per node.
+    walk_length : int
+        Length of each random walk.
+    walk_seed : int
+        Seed of the walks. If None, walks of any seed match.
+
+    Returns
+    -------
+    bool
+        True if the walks can be reused.
+    """
+    if not Path(walks_file).is_file():
+        return False
+    try:
+        walk_file = WalkFile(walks_file)
+    except ValueError:
+        return False
+
+    params = dict(walk_file.params)
+    if walk_seed is None:
+        walk_seed = params.get("seed")
+    return walk_file.nodes == hh2v.N.nodes and params == hh2v.walk_params(
+        num_walks, walk_length, walk_seed
+    )
+
+
 def run(
     input_csv,
     output_dir,
@@ -201,10 +408,23 @@ def run(
     epochs=1,
     workers=8,
     verbose=True,
+    sampling="alias",
+    cache_max_entries=None,
+    cache_max_bytes=None,
+    degree_threshold=None,
+    max_table_bytes=None,
+    seed=None,
+    stream_walks=False,
+    walks_file=None,
+    cache_dir=None,
+    save_model=False,
+    output_format="csv",
+    ann_index=False,
+    instrumentation=None,
 ):
     """
     Main method to embed the nodes of a HeNHoE (multilayer) network using the
-    HeNHoE-2vec algorithm. Results are saved as .emb and .csv files. Call this method if
+    HeNHoE-2vec algorithm. Results are saved as .csv or .npy files. Call this method if
     you are using HeNHoE-2vec as a package.
 
     Parameters
@@ -255,62 +475,189 @@ def run(
     epochs : int
         Number of epochs in SGD. Default is 1.
     workers : int
-        Number of parallel workers (threads). Default is 8.
+        Number of parallel workers (processes for preprocessing and the random walks,
+        threads for word2vec). Default is 8.
     verbose : bool
         Whether to print status messages. Default is True.
+    sampling : str
+        Strategy for sampling the steps of the random walks. "alias" precomputes the
+        transition tables of all (previous, current) node pairs, "lazy" computes them
+        on demand and keeps them in a bounded LRU cache, "rejection" samples from the
+        node transition tables by rejection sampling and needs no tables for node
+        pairs, "hybrid" precomputes the transition tables of node pairs (previous,
+        current) where current is not a hub and samples the steps from hubs by
+        rejection sampling. Default is "alias".
+    cache_max_entries : int
+        Maximum number of cached transition tables in "lazy" sampling. None means
+        unbounded. Default is None.
+    cache_max_bytes : int
+        Maximum total size of the cached transition tables in bytes in "lazy" sampling.
+        None means unbounded. Default is None.
+    degree_threshold : int
+        Maximum degree of the nodes which are not hubs in "hybrid" sampling. Default is
+        None.
+    max_table_bytes : int
+        Maximum total size of the transition tables in bytes in "hybrid" sampling. The
+        degree threshold is lowered as far as needed to stay within it. "hybrid"
+        sampling needs `degree_threshold`, `max_table_bytes` or both. Default is None.
+    seed : int
+        Seed for the random walks. For a given seed, the walks are the same for any
+        number of workers. If None, a random seed is used. Default is None.
+    stream_walks : bool
+        Whether to stream the random walks to word2vec chunk by chunk with a WalkCorpus
+        instead of keeping all of them in memory. The walks are regenerated for every
+        pass of word2vec over the corpus (vocabulary scan and every epoch). Default is
+        False.
+    walks_file : str
+        Path of a binary walk file. If the file holds walks of the same network and
+        walk parameters (and seed, if given), they are reused and the walk stage is
+        skipped, e.g., to sweep the word2vec parameters. Otherwise, the walks are
+        generated into the file. Either way, the walks are read from the memory-mapped
+        file while learning the embeddings. Default is None.
+    cache_dir : str
+        Directory of the binary cache of parsed networks and transition tables. If
+        given, the parsed network is cached there and reused by later runs on the same,
+        unchanged edge list with the same parsing options. The transition tables are
+        reused by later runs on the same network with the same p, q and s. Default is
+        None.
+    save_model : bool
+        Whether to also save the word2vec model as `output_name`.model in `output_dir`,
+        e.g., to refresh the embeddings incrementally with `refresh` later. Default is
+        False.
+    output_format : str
+        Format of the saved embeddings. "csv" saves a tab-separated .csv file, "npy" a
+        binary .npy matrix and a .nodes.tsv node index which can be memory-mapped with
+        `embeddings.load_embeddings`. Default is "csv".
+    ann_index : bool
+        Whether to also build an IVF index for approximate similarity queries over the
+        embeddings and save it next to them, where `EmbeddingStore.open` picks it up.
+        Requires output_format "npy". Default is False.
+    instrumentation : Instrumentation
+        Receiver of structured events: a "stage" event with duration and peak memory
+        per stage, the "graph", "transition_tables", "walks", "edge_table_cache" and
+        word2vec training events of the components, and a final "run" event. E.g.,
+        `Instrumentation([JsonLinesSink("events.jsonl")])`. If None, no events are
+        emitted. Default is None.
     """
+    if ann_index and output_format != "npy":
+        raise ValueError('[ERROR] An ANN index requires output_format "npy".')
+
+    if instrumentation is None:
+        instrumentation = NULL_INSTRUMENTATION
+
     start = time.time()
     # Parse multilayer network
-    if verbose:
-        N_nx = utils.timed_invoke(
-            "parsing edgelist",
-            lambda: utils.parse_multilayer_edgelist(
-                input_csv, is_directed, edges_are_distance, sep=sep, header=header
-            ),
-        )
-    else:
-        N_nx = utils.parse_multilayer_edgelist(
-            input_csv, is_directed, edges_are_distance
-        )
+    N = _run_stage(
+        instrumentation,
+        verbose,
+        "parse_edgelist",
+        "parsing edgelist",
+        lambda: MultilayerGraph.from_edgelist(
+            input_csv,
+            is_directed,
+            edges_are_distance,
+            sep=sep,
+            header=header,
+            cache_dir=cache_dir,
+        ),
+    )
+    instrumentation.emit(
+        "graph", nodes=N.number_of_nodes(), arcs=N.number_of_arcs(), layers=N.layers
+    )
 
     # Create HenHoe2vec object
-    hh2v = henhoe2vec_walks.HenHoe2vec(N_nx, is_directed, p, q, s)
+    hh2v = henhoe2vec_walks.HenHoe2vec(
+        N,
+        is_directed,
+        p,
+        q,
+        s,
+        sampling=sampling,
+        cache_max_entries=cache_max_entries,
+        cache_max_bytes=cache_max_bytes,
+        degree_threshold=degree_threshold,
+        max_table_bytes=max_table_bytes,
+        seed=seed,
+        instrumentation=instrumentation,
+    )
+
+    # Seed of the walks
+    walk_seed = int(hh2v.rng.integers(2**63))
+    reuse_walks = walks_file is not None and _matches_walk_file(
+        walks_file, hh2v, num_walks, walk_length, None if seed is None else walk_seed
+    )
 
     # Preprocess transition probabilities
-    if verbose:
-        utils.timed_invoke(
+    if reuse_walks:
+        if verbose:
+            print(f"[STATUS] Reusing random walks from {walks_file}")
+    else:
+        _run_stage(
+            instrumentation,
+            verbose,
+            "preprocess_transition_probs",
             "preprocessing transition probabilities",
-            lambda: hh2v.preprocess_transition_probs(),
+            lambda: hh2v.preprocess_transition_probs(workers, cache_dir),
         )
-    else:
-        hh2v.preprocess_transition_probs()
 
     # Generate random walks
-    if verbose:
-        walks = utils.timed_invoke(
+    if walks_file is not None:
+        if not reuse_walks:
+            _run_stage(
+                instrumentation,
+                verbose,
+                "simulate_walks",
+                "generating random walks",
+                lambda: hh2v.simulate_walks(
+                    num_walks,
+                    walk_length,
+                    workers,
+                    seed=walk_seed,
+                    output_path=walks_file,
+                ),
+            )
+        # Walks are read from the memory-mapped file while learning the embeddings
+        walks = WalkFile(walks_file)
+    elif stream_walks:
+        # Walks are generated while learning the embeddings
+        walks = WalkCorpus(hh2v, num_walks, walk_length, workers, seed=walk_seed)
+    else:
+        walks = _run_stage(
+            instrumentation,
+            verbose,
+            "simulate_walks",
             "generating random walks",
-            lambda: hh2v.simulate_walks(num_walks, walk_length),
+            lambda: hh2v.simulate_walks(
+                num_walks, walk_length, workers, seed=walk_seed
+            ),
+        )
+    if verbose and sampling == "hybrid" and not reuse_walks:
+        report = hh2v.sampling_report()
+        print(
+            f"[STATUS] Hybrid sampling: {len(report['hub_nodes'])} hub nodes with degree"
+            f" > {report['hub_degree']} use rejection sampling, saving"
+            f" {report['saved_bytes']} bytes of transition tables."
+        )
+    # With more than one worker, the tables are cached in the worker processes
+    if (
+        verbose
+        and sampling == "lazy"
+        and workers == 1
+        and not (stream_walks or reuse_walks)
+    ):
+        stats = hh2v.transition_probs_edges.stats()
+        print(
+            f"[STATUS] Transition table cache: {stats['hits']} hits,"
+            f" {stats['misses']} misses, {stats['evictions']} evictions."
         )
-    else:
-        walks = hh2v.simulate_walks(num_walks, walk_length)
 
     # Learn and save embeddings
-    if verbose:
-        utils.timed_invoke(
-            "learning and saving embeddings",
-            lambda: embeddings.generate_embeddings(
-                walks,
-                output_dir,
-                output_name,
-                dims,
-                window_size,
-                epochs,
-                workers,
-                verbose,
-            ),
-        )
-    else:
-        embeddings.generate_embeddings(
+    _run_stage(
+        instrumentation,
+        verbose,
+        "generate_embeddings",
+        "learning and saving embeddings",
+        lambda: embeddings.generate_embeddings(
             walks,
             output_dir,
             output_name,
@@ -319,9 +666,27 @@ def run(
             epochs,
             workers,
             verbose,
+            N.nodes,
+            save_model,
+            output_format,
+            instrumentation,
+        ),
+    )
+    # Shut down the worker processes of the walks
+    hh2v.close()
+
+    # Build the ANN index over the saved embeddings
+    if ann_index:
+        _run_stage(
+            instrumentation,
+            verbose,
+            "build_ann_index",
+            "building ANN index",
+            lambda: build_index(output_dir, output_name, seed=seed),
         )
 
     finish = time.time()
+    instrumentation.emit("run", seconds=finish - start, output_dir=str(output_dir))
     if verbose:
         print(
             f"[STATUS] Completed multilayer network embedding in"
@@ -329,10 +694,154 @@ def run(
         )
 
 
+def _run_stage(instrumentation, verbose, stage, action_desc, method):
+    """
+    Invoke a stage of `run` or `refresh` as a stage of `instrumentation` and, if
+    `verbose`, with status messages (see `utils.timed_invoke`).
+    """
+    with instrumentation.stage(stage):
+        if verbose:
+            return utils.timed_invoke(action_desc, method)
+        return method()
+
+
+def refresh(
+    hh2v,
+    changes,
+    model_path,
+    output_dir,
+    output_name="embeddings",
+    hops=2,
+    walk_length=20,
+    num_walks=10,
+    epochs=1,
+    workers=8,
+    verbose=True,
+    output_format="csv",
+    instrumentation=None,
+):
+    """
+    Refresh the embeddings of a network incrementally after a batch of edge changes
+    applied with `HenHoe2vec.update_edges`, instead of calling `run` again.
+
+    Walks are only regenerated from the nodes within `hops` hops of the changed nodes
+    (following arcs backwards for directed networks, i.e., from the nodes whose walks
+    reach the changes within `hops` steps). The saved word2vec model is trained further
+    on these walks and new nodes are added to its vocabulary.
+
+    Parameters
+    ----------
+    hh2v : HenHoe2vec
+        HenHoe2vec object whose transition tables were updated with `update_edges`.
+    changes : dict
+        Report returned by `hh2v.update_edges`.
+    model_path : str
+        Path of the word2vec model saved by `run` (with `save_model`).
+    output_dir : str
+        Path of the output directory where the embedding files will be saved.
+    output_name : str
+        Name of the output .csv file (without suffix). Default is "embeddings".
+    hops : int
+        Radius of the neighborhood of the changed nodes to regenerate walks from. Walks
+        from nodes further away may still pass the changes after `hops` steps, so
+        larger values trade speed for accuracy. Default is 2.
+    walk_length : int
+        Length of each random walk. Default is 20.
+    num_walks : int
+        Number of random walks to simulate for each node. Default is 10.
+    epochs : int
+        Number of epochs in SGD. Default is 1.
+    workers : int
+        Number of parallel workers (processes for the random walks, threads for
+        word2vec). Default is 8.
+    verbose : bool
+        Whether to print status messages. Default is True.
+    output_format : str
+        Format of the saved embeddings, "csv" or "npy" (see `run`). Default is "csv".
+    instrumentation : Instrumentation
+        Receiver of structured events (see `run`), ending with a "refresh" event with
+        the report. If None, no events are emitted. Default is None.
+
+    Returns
+    -------
+    dict
+        Work done compared with a full run: 'start_nodes' and 'nodes' (nodes walks
+        were started from and all nodes), 'walks' and 'full_walks' (number of walks),
+        and the table counts of `changes`.
+    """
+    if instrumentation is None:
+        instrumentation = NULL_INSTRUMENTATION
+
+    start = time.time()
+    N = hh2v.N
+    changed = np.concatenate([changes["changed_nodes"], changes["new_nodes"]])
+    start_nodes = N.k_hop_neighborhood(changed, hops, reverse=True)
+
+    # Generate random walks
+    walks = _run_stage(
+        instrumentation,
+        verbose,
+        "simulate_walks",
+        "generating random walks",
+        lambda: hh2v.simulate_walks(num_walks, walk_length, workers, nodes=start_nodes),
+    )
+
+    # Update and save embeddings
+    _run_stage(
+        instrumentation,
+        verbose,
+        "update_embeddings",
+        "updating and saving embeddings",
+        lambda: embeddings.update_embeddings(
+            model_path,
+            walks,
+            output_dir,
+            output_name,
+            epochs,
+            workers,
+            verbose,
+            N.nodes,
+            output_format,
+            instrumentation,
+        ),
+    )
+
+    report = {
+        "start_nodes": len(start_nodes),
+        "nodes": N.number_of_nodes(),
+        "walks": len(walks),
+        "full_walks": num_walks * N.number_of_nodes(),
+    }
+    for key in [
+        "recomputed_node_tables",
+        "node_tables",
+        "recomputed_edge_tables",
+        "edge_tables",
+    ]:
+        report[key] = changes[key]
+    instrumentation.emit("refresh", seconds=time.time() - start, **report)
+
+    if verbose:
+        skipped_walks = 1 - report["walks"] / max(report["full_walks"], 1)
+        tables = report["node_tables"] + report["edge_tables"]
+        recomputed = report["recomputed_node_tables"] + report["recomputed_edge_tables"]
+        skipped_tables = 1 - recomputed / max(tables, 1)
+        print(
+            f"[STATUS] Refreshed embeddings in {round((time.time() - start), 1)}"
+            f" seconds. Skipped {round(100 * skipped_walks, 1)}% of the walks and"
+            f" {round(100 * skipped_tables, 1)}% of the transition tables of a full"
+            f" run. See results in {output_dir}."
+        )
+
+    return report
+
+
 def main():
     args = parse_args()
     # Parse arguments s and s-dict
     s = parse_switching_param(args.s, args.s_dict)
+    sinks = [] if args.events_file is None else [JsonLinesSink(args.events_file)]
+    instrumentation = Instrumentation(sinks, args.profile_dir, args.trace_memory)
     run(
         input_csv=args.input,
         output_dir=args.output_dir,
@@ -351,4 +860,17 @@ def main():
         epochs=args.epochs,
         workers=args.workers,
         verbose=True,
+        sampling=args.sampling,
+        cache_max_entries=args.cache_max_entries,
+        cache_max_bytes=args.cache_max_bytes,
+        degree_threshold=args.degree_threshold,
+        max_table_bytes=args.max_table_bytes,
+        seed=args.seed,
+        stream_walks=args.stream_walks,
+        walks_file=args.walks_file,
+        cache_dir=args.cache_dir,
+        save_model=args.save_model,
+        output_format=args.output_format,
+        ann_index=args.ann_index,
+        instrumentation=instrumentation,
     )
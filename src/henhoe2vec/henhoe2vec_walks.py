@@ -1,8 +1,31 @@
-import random
+import time
+from collections import deque
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
 import numpy as np
 
 # from alias_sampling import alias_setup, alias_draw
-from .alias_sampling import alias_setup, alias_draw
+from .alias_sampling import (
+    alias_setup,
+    alias_draw,
+    alias_setup_batch,
+    AliasTables,
+    RandomBuffer,
+)
+from .artifacts import fingerprint, save_artifact, load_artifact
+from .multilayer_graph import MultilayerGraph
+from .lru_cache import LRUCache
+from .shared_arrays import SharedArrays, attach_shared_arrays
+from .walk_file import write_walk_file, WalkFile
+from .instrumentation import NULL_INSTRUMENTATION
+
+# Strategies for sampling the steps of the random walks
+SAMPLING_STRATEGIES = ["alias", "lazy", "rejection", "hybrid"]
+# Size of one entry of the flat alias tables in bytes (int64 alias, float64 probability)
+ALIAS_ENTRY_BYTES = 16
+# Number of walks simulated per chunk. Every chunk has its own random number stream, so
+# walks do not depend on the number of worker processes.
+WALK_CHUNK_SIZE = 1 << 14
 
 
 class HenHoe2vec:
@@ -12,8 +35,9 @@ class HenHoe2vec:
 
     Attributes
     ----------
-    henhoe_network : NetworkX Graph
-        Heterogeneous-node homogeneous-edge network.
+    N : MultilayerGraph
+        Heterogeneous-node homogeneous-edge network in CSR form. Nodes are referred to
+        by their integer IDs in `N`.
     is_directed : bool
         Whether the network is directed or not.
     p : float
@@ -22,22 +46,65 @@ class HenHoe2vec:
         The in-out parameter `q` from the node2vec algorithm.
     s : dict
         The type-switching parameter(s) of the HeNHoE-2vec algorithm.
-    transition_probs_nodes : dict
-        Transition probability distribution to neighbors of each node based only on edge
-        weights and switching parameters.
-    transition_probs_edges : dict
+    switching_matrix : np.array of floats
+        `s` compiled into a dense matrix over the layer IDs of `N`: entry [i, j] is the
+        switching parameter from layer i to layer j, 1 on the diagonal and NaN for
+        layer pairs without an entry if `s` has no "default" entry.
+    transition_probs_nodes : AliasTables
+        Transition probability distribution to neighbors of each node based only on
+        edge weights and switching parameters, indexed by node ID.
+    transition_probs_edges : AliasTables or LRUCache
         Transition probability distribution to neighbors of each node based on edge
-        weights, p, q, and switching parameters.
+        weights, p, q, and switching parameters, indexed by the arc (previous, current)
+        in `N`. An LRUCache which computes missing entries on demand if `sampling` is
+        "lazy".
+    sampling : str
+        Strategy for sampling the steps of the random walks.
+    cache_max_entries : int
+        Maximum number of cached edge transition tables in "lazy" sampling.
+    cache_max_bytes : int
+        Maximum total size of the cached edge transition tables in bytes in "lazy"
+        sampling.
+    degree_threshold : int
+        Maximum degree of the nodes whose arcs get edge transition tables in "hybrid"
+        sampling, or None.
+    max_table_bytes : int
+        Maximum total size of the transition tables in bytes in "hybrid" sampling, or
+        None.
+    hub_degree : int
+        Degree above which nodes are hubs in "hybrid" sampling, resolved from
+        `degree_threshold` and `max_table_bytes` by `preprocess_transition_probs`.
+        None before preprocessing and in other sampling strategies.
+    rng : np.random.Generator
+        Source of randomness of the random walks.
+    instrumentation : Instrumentation
+        Receiver of the events of preprocessing and the random walks.
     """
 
-    def __init__(self, henhoe_network, is_directed, p, q, s):
+    def __init__(
+        self,
+        henhoe_network,
+        is_directed,
+        p,
+        q,
+        s,
+        sampling="alias",
+        cache_max_entries=None,
+        cache_max_bytes=None,
+        degree_threshold=None,
+        max_table_bytes=None,
+        seed=None,
+        instrumentation=None,
+    ):
         """
         Constructor for the HenHoe2vec class.
 
         Parameters
         ----------
-        henhoe_network : NetworkX Graph
-            Heterogeneous-node homogeneous-edge network.
+        henhoe_network : MultilayerGraph or NetworkX Graph
+            Heterogeneous-node homogeneous-edge network. NetworkX graphs (e.g., as
+            returned by `utils.parse_multilayer_edgelist`) are converted into a
+            MultilayerGraph once.
         is_directed : bool
             Whether the network is directed or not.
         p : float
@@ -59,41 +126,114 @@ class HenHoe2vec:
             The switching modes "multiple switching" and "special node switching" are
             special cases of "versus specific switching" and are therefore not
             explicitly implemented here.
+        sampling : str
+            Strategy for sampling the steps of the random walks. One of:
+            "alias": Precompute the alias tables of all nodes and all (previous,
+            current) node pairs in `preprocess_transition_probs`. Fastest walks, but
+            memory grows with the sum of squared node degrees.
+            "lazy": Precompute only the alias tables of the nodes. The alias table of a
+            (previous, current) node pair is computed the first time a walk visits it
+            and is kept in a bounded LRU cache.
+            "rejection": Precompute only the alias tables of the nodes and sample all
+            other steps by rejection sampling (see `rejection_draw`). Memory scales
+            with the number of edges instead of the number of wedges.
+            "hybrid": Choose per node by its degree. Steps to the neighbors of nodes up
+            to `degree_threshold` use precomputed alias tables as in "alias"
+            sampling, steps to the neighbors of hubs with a higher degree use
+            rejection sampling. With a power-law degree distribution, this avoids the
+            largest tables at little cost in speed (see `sampling_report`).
+            Default is "alias".
+        cache_max_entries : int
+            Maximum number of cached edge transition tables in "lazy" sampling. None
+            means unbounded. Default is None.
+        cache_max_bytes : int
+            Maximum total size of the cached edge transition tables in bytes in "lazy"
+            sampling. None means unbounded. Default is None.
+        degree_threshold : int
+            Maximum degree of the nodes whose arcs get edge transition tables in
+            "hybrid" sampling. Default is None.
+        max_table_bytes : int
+            Memory budget of the transition tables in bytes in "hybrid" sampling. The
+            degree threshold is lowered as far as needed to keep the node and edge
+            tables within the budget. "hybrid" sampling needs `degree_threshold`,
+            `max_table_bytes` or both. Default is None.
+        seed : int
+            Seed of the random number generator used for the random walks. If None, a
+            random seed is used. Default is None.
+        instrumentation : Instrumentation
+            Receiver of the events of preprocessing ("transition_tables") and the
+            random walks ("walks", "edge_table_cache"). If None, no events are emitted.
+            Default is None.
 
         Returns
         -------
         HenHoe2vec
             Constructed HenHoe2vec object.
         """
-        self.N = henhoe_network
+        if isinstance(henhoe_network, MultilayerGraph):
+            self.N = henhoe_network
+        else:
+            self.N = MultilayerGraph.from_networkx(henhoe_network)
         self.is_directed = is_directed
         self.p = p  # Return parameter
         self.q = q  # In-out parameter
 
+        if sampling not in SAMPLING_STRATEGIES:
+            raise ValueError(
+                f"[ERROR] Invalid sampling strategy {sampling}. Should be one of"
+                f" {SAMPLING_STRATEGIES}."
+            )
+        if (
+            sampling == "hybrid"
+            and degree_threshold is None
+            and max_table_bytes is None
+        ):
+            raise ValueError(
+                f"[ERROR] Hybrid sampling needs a degree threshold and/or a maximum"
+                f" size of the transition tables."
+            )
+        self.sampling = sampling
+        self.cache_max_entries = cache_max_entries
+        self.cache_max_bytes = cache_max_bytes
+        self.degree_threshold = degree_threshold
+        self.max_table_bytes = max_table_bytes
+        self.hub_degree = None
+        self.rng = np.random.default_rng(seed)
+        if instrumentation is None:
+            instrumentation = NULL_INSTRUMENTATION
+        self.instrumentation = instrumentation
+        # Pre-generated random numbers for the (scalar) single-walk sampling
+        self._random_buffer = RandomBuffer(self.rng)
+
         # Transition probability distribution to neighbors of each node based only on
         # edge weights and switching parameters. Only used for first step of each walk
         # where there is no previous node.
-        # Form: {node : (J, q)}
+        # Form: transition_probs_nodes[node_id] = (J, q)
         self.transition_probs_nodes = {}
         # Transition probability distribution to neighbors of each node based on edge
         # weights, p, q, and switching parameters. Used for all other steps of the walk.
-        # Form: {(node1, node2) : (J, q)}
+        # Form: transition_probs_edges[N.arc_index(node_id1, node_id2)] = (J, q) (an
+        # LRUCache in "lazy" sampling)
         self.transition_probs_edges = {}
 
-        if type(s) in [float, int] or isinstance(s, np.floating):
-            self.s = {"default": s}
-        elif type(s) == dict:
-            self.s = s
-        else:
-            raise TypeError(
-                f"[ERROR] Invalid type for argument s. Should be float or dict but"
-                f" is {type(s)}."
-            )
+        self.s = _switching_dict(s)
+        # Switching parameters are looked up by layer IDs
+        self.switching_matrix = _switching_matrix(self.s, self.N.layers)
+        # Switching-independent factors of the table entries, computed on demand by
+        # `set_switching_params` and keyed by kind ("nodes" or "edges")
+        self._switching_factors = {}
+        # Shared memory copy of the graph and the flat alias tables, the arrays it
+        # mirrors and a pool of worker processes attached to it, created by
+        # `_worker_pool` and released by `close`
+        self._shared = None
+        self._shared_sources = {}
+        self._pool = None
+        self._pool_workers = 0
 
     # ----------------------------------------------------------------------------------
     # RANDOM WALKS
     # ----------------------------------------------------------------------------------
-    def henhoe2vec_walk(self, walk_length, start_node):
+    def henhoe2vec_walk(self, walk_length, start_node, rng=None):
         """
         Simulate a random walk of length `walk_length` starting from `start_node`.
 
@@ -101,70 +241,570 @@ class HenHoe2vec:
         ----------
         walk_length : int
             Length of the random walk.
-        start_node : 2-tuple of strs
-            Starting node of the random walk, e.g., ('n1','l1').
+        start_node : int
+            ID of the starting node of the random walk.
+        rng : np.random.Generator or RandomBuffer
+            Source of random numbers. If None, the generator of the HenHoe2vec object
+            is used. Default is None.
 
         Returns
         -------
-        list of 2-tuples of strs (nodes)
-            Random walk of length `walk_length` starting from `start_node`.
+        list of ints (node IDs)
+            Random walk of length `walk_length` starting from `start_node`. Shorter if
+            the walk reaches a node without neighbors.
         """
         N = self.N
         transition_probs_nodes = self.transition_probs_nodes
         transition_probs_edges = self.transition_probs_edges
+        if rng is None:
+            rng = self._random_buffer
 
         walk = [start_node]
+        # Arc (previous, current) over which the walk reached the current node
+        arc = -1
 
         while len(walk) < walk_length:
             current = walk[-1]
-            neighbors = sorted(N.neighbors(current))
+            neighbors = N.neighbors(current)
             if len(neighbors) > 0:
                 # First step of the walk
                 if len(walk) == 1:
-                    J = transition_probs_nodes[current][0]
-                    q = transition_probs_nodes[current][1]
-                    next = neighbors[alias_draw(J, q)]
-                    walk.append(next)
+                    J, q = transition_probs_nodes[current]
+                    kk = alias_draw(J, q, rng)
                 # All other steps of the walk
+                elif self.sampling == "rejection" or (
+                    self.sampling == "hybrid" and len(neighbors) > self.hub_degree
+                ):
+                    kk = self.rejection_draw(walk[-2], current, rng)
                 else:
-                    previous = walk[-2]
-                    J = transition_probs_edges[(previous, current)][0]
-                    q = transition_probs_edges[(previous, current)][1]
-                    next = neighbors[alias_draw(J, q)]
-                    walk.append(next)
+                    J, q = transition_probs_edges[arc]
+                    kk = alias_draw(J, q, rng)
+                arc = int(N.indptr[current]) + kk
+                walk.append(int(neighbors[kk]))
             else:
                 break
 
         return walk
 
-    def simulate_walks(self, num_walks, walk_length):
+    def rejection_draw(self, previous, current, rng=None):
+        """
+        Sample the next step of a walk from `current` by rejection sampling, without an
+        alias table for the (previous, current) node pair.
+
+        Candidates are drawn from the first-order transition probabilities of `current`
+        (edge weights and switching parameters) and accepted with probability
+        proportional to the p/q bias of the candidate, i.e., 1/p for returning to
+        `previous`, 1 for neighbors of `previous`, and 1/q otherwise. Accepted samples
+        follow the same distribution as the tables from `get_edge_trans_probs`.
+
+        Parameters
+        ----------
+        previous : int
+            ID of the previous node on the random walk.
+        current : int
+            ID of the current node on the random walk. Must have at least one neighbor.
+        rng : np.random.Generator or RandomBuffer
+            Source of random numbers. If None, the generator of the HenHoe2vec object
+            is used. Default is None.
+
+        Returns
+        -------
+        int
+            Position of the sampled next node in `N.neighbors(current)`.
+        """
+        N = self.N
+        if rng is None:
+            rng = self._random_buffer
+        neighbors = N.neighbors(current)
+        J, q = self.transition_probs_nodes[current]
+        # Largest possible bias, used to scale the acceptance probabilities
+        max_bias = max(1 / self.p, 1.0, 1 / self.q)
+
+        while True:
+            kk = alias_draw(J, q, rng)
+            candidate = neighbors[kk]
+            if candidate == previous:
+                bias = 1 / self.p  # Return
+            elif N.has_edge(previous, candidate):
+                bias = 1.0
+            else:
+                bias = 1 / self.q  # Explore
+            if rng.random() * max_bias < bias:
+                return kk
+
+    def rejection_draw_batch(self, previous, current, rng):
+        """
+        Vectorized version of `rejection_draw` for many walkers at once. Rejected
+        walkers draw new candidates until all of them have accepted a step.
+
+        Parameters
+        ----------
+        previous : np.array of ints
+            IDs of the previous nodes of the walkers.
+        current : np.array of ints
+            IDs of the current nodes of the walkers. All must have neighbors.
+        rng : np.random.Generator or RandomBuffer
+            Source of random numbers.
+
+        Returns
+        -------
+        np.array of ints
+            Position of the sampled next node in `N.neighbors(current)` per walker.
+        """
+        N = self.N
+        inv_p = 1 / self.p
+        inv_q = 1 / self.q
+        max_bias = max(inv_p, 1.0, inv_q)
+
+        kk = np.empty(len(current), dtype=np.int64)
+        pending = np.arange(len(current))
+        while len(pending) > 0:
+            cur = current[pending]
+            prev = previous[pending]
+            draws = self.transition_probs_nodes.draw(cur, rng)
+            candidates = N.indices[N.indptr[cur] + draws]
+            bias = np.where(N.arc_indices(prev, candidates) >= 0, 1.0, inv_q)
+            bias[candidates == prev] = inv_p
+            accepted = rng.random(len(pending)) * max_bias < bias
+            kk[pending[accepted]] = draws[accepted]
+            pending = pending[~accepted]
+
+        return kk
+
+    def simulate_walks(
+        self,
+        num_walks,
+        walk_length,
+        workers=1,
+        chunk_size=WALK_CHUNK_SIZE,
+        seed=None,
+        output_path=None,
+        nodes=None,
+    ):
         """
         Simulate `num_walks` random walks of length `walk_length` for each node.
 
+        The walks are generated chunk by chunk with `iter_walks`, so for a given seed
+        they are the same for any number of `workers`.
+
         Parameters
         ----------
         num_walks : int
             Number of random walks to simulate for each node.
         walk_length : int
             Length of each random walk.
+        workers : int
+            Number of worker processes. Default is 1.
+        chunk_size : int
+            Number of walks per chunk. Default is 16384.
+        seed : int
+            Seed of the walks. If None, a seed is drawn from the generator of the
+            HenHoe2vec object. Default is None.
+        output_path : str or pathlib.Path object
+            If given, the walks are streamed into a binary walk file (see
+            `walk_file.write_walk_file`) together with the node vocabulary and the
+            parameters of the walks, and are returned memory-mapped from it. Default
+            is None.
+        nodes : np.array of ints
+            IDs of the nodes to start walks from. If None, walks start from all nodes.
+            Default is None.
 
         Returns
         -------
-        list of list of 2-tuples of strs
-            List of random walks.
+        np.array of ints
+            Random walks over node IDs as an int32 matrix of shape
+            (`num_walks` * number of start nodes, `walk_length`). Walks which reach a node
+            without neighbors are padded with -1. Use `N.nodes` to translate node IDs
+            into node tuples.
+        """
+        if seed is None:
+            seed = int(self.rng.integers(2**63))
+        chunks = self.iter_walks(
+            num_walks, walk_length, workers, chunk_size, seed, nodes
+        )
+
+        if output_path is not None:
+            write_walk_file(
+                output_path,
+                chunks,
+                walk_length,
+                self.N.nodes,
+                self.walk_params(num_walks, walk_length, seed),
+            )
+            return WalkFile(output_path).walks
+
+        num_total = num_walks * (
+            self.N.number_of_nodes() if nodes is None else len(nodes)
+        )
+        walks = np.full((num_total, walk_length), -1, dtype=np.int32)
+        start = 0
+        for chunk_walks in chunks:
+            walks[start : start + len(chunk_walks)] = chunk_walks
+            start += len(chunk_walks)
+
+        return walks
+
+    def iter_walks(
+        self,
+        num_walks,
+        walk_length,
+        workers=1,
+        chunk_size=WALK_CHUNK_SIZE,
+        seed=None,
+        nodes=None,
+    ):
+        """
+        Generate `num_walks` random walks of length `walk_length` for each node, chunk
+        by chunk.
+
+        In every round, one walk starts at each node in shuffled order. The walks are
+        split into chunks of `chunk_size` walks. The start nodes of every round and the
+        steps of every chunk draw from their own random number streams derived from
+        `seed`, so for a given seed the walks are the same for any number of `workers`
+        and can be regenerated without keeping them in memory.
+
+        Parameters
+        ----------
+        num_walks : int
+            Number of random walks to simulate for each node.
+        walk_length : int
+            Length of each random walk.
+        workers : int
+            Number of worker processes. With more than one worker, the chunks are
+            distributed over a process pool which attaches to the graph and the alias
+            tables through shared memory. The pool and the shared memory are kept for
+            later calls until the tables change or `close` is called. At most two
+            chunks per worker are in flight. Default is 1.
+        chunk_size : int
+            Number of walks per chunk. Default is 16384.
+        seed : int
+            Seed of the walks. If None, a seed is drawn from the generator of the
+            HenHoe2vec object. Default is None.
+        nodes : np.array of ints
+            IDs of the nodes to start walks from. If None, walks start from all nodes.
+            Default is None.
+
+        Yields
+        ------
+        np.array of ints
+            Random walks of one chunk as an int32 matrix with `walk_length` columns,
+            padded with -1 after dead ends.
+        """
+        if seed is None:
+            seed = int(self.rng.integers(2**63))
+        instrumentation = self.instrumentation
+        chunks = self._iter_walk_chunks(
+            num_walks, walk_length, workers, chunk_size, seed, nodes
+        )
+        if not instrumentation.sinks:
+            yield from chunks
+            return
+
+        # Only the time spent generating (or waiting for) the walks is counted
+        seconds = 0.0
+        num_total = num_steps = num_dead_ends = 0
+        while True:
+            start = time.perf_counter()
+            walks = next(chunks, None)
+            seconds += time.perf_counter() - start
+            if walks is None:
+                break
+            num_total += len(walks)
+            num_steps += np.count_nonzero(walks >= 0) - len(walks)
+            if walk_length > 0:
+                num_dead_ends += np.count_nonzero(walks[:, -1] < 0)
+            yield walks
+
+        instrumentation.emit(
+            "walks",
+            sampling=self.sampling,
+            workers=workers,
+            walks=num_total,
+            steps=int(num_steps),
+            dead_end_walks=int(num_dead_ends),
+            seconds=seconds,
+            steps_per_second=num_steps / seconds if seconds > 0 else None,
+        )
+        # Only the cache of this process is visible with a single worker
+        if isinstance(self.transition_probs_edges, LRUCache):
+            instrumentation.emit(
+                "edge_table_cache", **self.transition_probs_edges.stats()
+            )
+
+    def _iter_walk_chunks(
+        self, num_walks, walk_length, workers, chunk_size, seed, nodes
+    ):
+        """
+        Generate the chunks of walks (see `iter_walks`).
+        """
+        if nodes is None:
+            nodes = np.arange(self.N.number_of_nodes())
+        nodes = np.asarray(nodes, dtype=np.int64)
+        chunks = enumerate(_start_node_chunks(seed, nodes, num_walks, chunk_size))
+
+        if workers <= 1 or num_walks * len(nodes) <= chunk_size:
+            for chunk, start_nodes in chunks:
+                yield self.simulate_walks_from(
+                    start_nodes, walk_length, _chunk_rng(seed, chunk)
+                )
+            return
+
+        pool = self._worker_pool(workers)
+        pending = deque()
+        try:
+            for chunk, start_nodes in chunks:
+                pending.append(
+                    pool.submit(_walk_chunk, start_nodes, walk_length, seed, chunk)
+                )
+                if len(pending) >= 2 * workers:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+        finally:
+            # Walks which are no longer consumed are not generated
+            for future in pending:
+                future.cancel()
+
+    def walk_params(self, num_walks, walk_length, seed):
+        """
+        JSON-serializable parameters of a set of walks, as stored in walk files.
+
+        Parameters
+        ----------
+        num_walks : int
+            Number of random walks per node.
+        walk_length : int
+            Length of each random walk.
+        seed : int
+            Seed of the walks.
+
+        Returns
+        -------
+        dict
+            The parameters, including the fingerprint of the graph so that walks over
+            a changed network are not reused. Switching parameters of layer pairs are
+            stored as [from_layer, to_layer, s] lists.
+        """
+        params = {
+            "graph": self.N.fingerprint(),
+            "num_walks": num_walks,
+            "walk_length": walk_length,
+            "seed": seed,
+            "is_directed": self.is_directed,
+            "p": self.p,
+            "q": self.q,
+            **self._switching_params(),
+            "sampling": self.sampling,
+        }
+        if self.sampling == "hybrid":
+            # The hubs determine which steps are drawn by rejection sampling
+            params["degree_threshold"] = self.degree_threshold
+            params["max_table_bytes"] = self.max_table_bytes
+        return params
+
+    def _switching_params(self):
+        """
+        JSON-serializable switching parameters: the default under "s_default" and the
+        layer pairs as sorted [from_layer, to_layer, s] lists under "s_pairs".
+        """
+        return {
+            "s_default": self.s.get("default"),
+            "s_pairs": sorted(
+                [*pair, value] for pair, value in self.s.items() if pair != "default"
+            ),
+        }
+
+    def simulate_walks_from(self, start_nodes, walk_length, rng=None):
+        """
+        Simulate one random walk of length `walk_length` from each of `start_nodes`.
+
+        In "alias", "rejection" and "hybrid" sampling, all walkers advance in lock-step:
+        every iteration draws the next step of all walkers which have not reached a node
+        without neighbors at once from the flat alias tables. "lazy" sampling simulates
+        the walks one by one with `henhoe2vec_walk`.
+
+        Parameters
+        ----------
+        start_nodes : np.array of ints
+            IDs of the starting nodes of the walks.
+        walk_length : int
+            Length of each random walk.
+        rng : np.random.Generator or RandomBuffer
+            Source of random numbers. If None, the generator of the HenHoe2vec object
+            is used. Default is None.
+
+        Returns
+        -------
+        np.array of ints
+            Random walks as an int32 matrix of shape (len(`start_nodes`),
+            `walk_length`), padded with -1 after dead ends.
         """
         N = self.N
-        nodes = list(N.nodes)
-        walks = []
+        start_nodes = np.asarray(start_nodes, dtype=np.int64)
+        walks = np.full((len(start_nodes), walk_length), -1, dtype=np.int32)
+        if walk_length == 0:
+            return walks
+
+        if rng is None:
+            rng = RandomBuffer(self.rng)
 
-        for _ in range(num_walks):
-            random.shuffle(nodes)  # Shuffle nodes to switch up the order
-            for node in nodes:
-                walk = self.henhoe2vec_walk(walk_length=walk_length, start_node=node)
-                walks.append(walk)
+        if self.sampling == "lazy":
+            for i, start_node in enumerate(start_nodes.tolist()):
+                walk = self.henhoe2vec_walk(walk_length, start_node, rng)
+                walks[i, : len(walk)] = walk
+            return walks
+        degrees = N.degree()
+
+        walks[:, 0] = start_nodes
+        # Rows of the walkers which are still moving and their state
+        active = np.arange(len(start_nodes))
+        current = start_nodes
+        previous = None
+        arcs = None
+        for step in range(1, walk_length):
+            # Walkers at nodes without neighbors stop
+            alive = degrees[current] > 0
+            if not alive.all():
+                active = active[alive]
+                current = current[alive]
+                if step > 1:
+                    previous = previous[alive]
+                    arcs = arcs[alive]
+            if len(active) == 0:
+                break
+
+            if step == 1:
+                kk = self.transition_probs_nodes.draw(current, rng)
+            elif self.sampling == "rejection":
+                kk = self.rejection_draw_batch(previous, current, rng)
+            elif self.sampling == "hybrid":
+                # Steps from hubs have no edge tables
+                hubs = degrees[current] > self.hub_degree
+                kk = np.empty(len(current), dtype=np.int64)
+                kk[~hubs] = self.transition_probs_edges.draw(arcs[~hubs], rng)
+                kk[hubs] = self.rejection_draw_batch(previous[hubs], current[hubs], rng)
+            else:
+                kk = self.transition_probs_edges.draw(arcs, rng)
+
+            arcs = N.indptr[current] + kk
+            previous = current
+            current = N.indices[arcs].astype(np.int64)
+            walks[active, step] = current
 
         return walks
 
+    def _shared_graph(self):
+        """
+        Arrays of the CSR graph which worker processes attach to.
+
+        Returns
+        -------
+        dict
+            Numpy arrays keyed by name.
+        """
+        N = self.N
+        return {
+            "indptr": N.indptr,
+            "indices": N.indices,
+            "weights": N.weights,
+            "node_layers": N.node_layers,
+        }
+
+    def _shared_state(self):
+        """
+        Arrays which worker processes need to simulate walks: the CSR graph and the
+        flat alias tables.
+
+        Returns
+        -------
+        dict
+            Numpy arrays keyed by name.
+        """
+        arrays = self._shared_graph()
+        arrays["nodes_J"] = self.transition_probs_nodes.J
+        arrays["nodes_q"] = self.transition_probs_nodes.q
+        if isinstance(self.transition_probs_edges, AliasTables):
+            arrays["edges_J"] = self.transition_probs_edges.J
+            arrays["edges_q"] = self.transition_probs_edges.q
+            arrays["edges_offsets"] = self.transition_probs_edges.offsets
+        return arrays
+
+    def _worker_config(self):
+        """
+        Small, picklable parameters which worker processes need to rebuild the
+        HenHoe2vec object around the shared arrays.
+
+        Returns
+        -------
+        dict
+            Constructor arguments and the layer vocabulary.
+        """
+        return {
+            "layers": self.N.layers,
+            "is_directed": self.is_directed,
+            "p": self.p,
+            "q": self.q,
+            "s": self.s,
+            "sampling": self.sampling,
+            "cache_max_entries": self.cache_max_entries,
+            "cache_max_bytes": self.cache_max_bytes,
+            "degree_threshold": self.degree_threshold,
+            "max_table_bytes": self.max_table_bytes,
+            "hub_degree": self.hub_degree,
+        }
+
+    def _worker_pool(self, workers):
+        """
+        Pool of worker processes attached to the graph and the flat alias tables in
+        shared memory.
+
+        The shared memory copy and the pool are created on first use and reused by all
+        later walks, e.g., by every pass of a streaming `WalkCorpus`, until the graph
+        or the tables are replaced or `close` is called.
+
+        Parameters
+        ----------
+        workers : int
+            Number of worker processes.
+
+        Returns
+        -------
+        ProcessPoolExecutor
+            The pool.
+        """
+        arrays = self._shared_state()
+        if self._shared is None or any(
+            self._shared_sources.get(name) is not array
+            for name, array in arrays.items()
+        ):
+            self.close()
+            self._shared = SharedArrays(arrays)
+            self._shared_sources = arrays
+        if self._pool is None or self._pool_workers != workers:
+            if self._pool is not None:
+                self._pool.shutdown()
+            self._pool = ProcessPoolExecutor(
+                max_workers=workers,
+                initializer=_init_worker,
+                initargs=(self._shared.spec, self._worker_config()),
+            )
+            self._pool_workers = workers
+        return self._pool
+
+    def close(self):
+        """
+        Shut down the worker processes and release the shared memory of parallel walks.
+        The HenHoe2vec object can still be used; both are created again when needed.
+        """
+        if self._pool is not None:
+            self._pool.shutdown(cancel_futures=True)
+        if self._shared is not None:
+            self._shared.close()
+        self._shared = None
+        self._shared_sources = {}
+        self._pool = None
+        self._pool_workers = 0
+
     # ----------------------------------------------------------------------------------
     # CALCULATE TRANSITION PROBABILITIES
     # ----------------------------------------------------------------------------------
@@ -176,8 +816,8 @@ class HenHoe2vec:
 
         Parameters
         ----------
-        node : 2-tuple of strs
-            Node for which to get the transition probabilities, e.g., ('n1','l1').
+        node : int
+            ID of the node for which to get the transition probabilities.
 
         Returns
         -------
@@ -186,32 +826,7 @@ class HenHoe2vec:
         q : list of floats
             The probability table.
         """
-        N = self.N
-        s = self.s
-
-        # Unnormalized transition probabilities based on edge weights
-        unnormalized_probs = []
-        for nbr in sorted(N.neighbors(node)):
-            src_layer = N.nodes[node]["layer"]
-            trgt_layer = N.nodes[nbr]["layer"]
-            weight = N[node][nbr]["weight"]
-
-            if src_layer == trgt_layer:
-                unnormalized_probs.append(weight)
-            else:
-                # Get switching parameter
-                if (src_layer, trgt_layer) in s:
-                    switch_param = s[(src_layer, trgt_layer)]
-                else:
-                    try:
-                        switch_param = s["default"]
-                    except:
-                        raise ValueError(
-                            f"[ERROR] The dict of switching parameters s must contain a"
-                            f" 'default' entry."
-                        )
-                unnormalized_probs.append(weight / switch_param)
-
+        unnormalized_probs = self._node_unnormalized_probs(node)
         # Normalization constant
         norm_const = sum(unnormalized_probs)
         # Normalized transition probabilities
@@ -219,6 +834,51 @@ class HenHoe2vec:
 
         return alias_setup(normalized_probs)
 
+    def _node_unnormalized_probs(self, node):
+        """
+        Unnormalized transition probabilities from `node` to all its neighbors based on
+        edge weights and switching parameters.
+
+        Parameters
+        ----------
+        node : int
+            ID of the node for which to get the transition probabilities.
+
+        Returns
+        -------
+        np.array of floats
+            Unnormalized transition probabilities, aligned with `N.neighbors(node)`.
+        """
+        N = self.N
+        # Switching parameters are 1 within a layer
+        return N.neighbor_weights(node) / self._switch_params(node, N.neighbors(node))
+
+    def _switch_params(self, node, nbrs):
+        """
+        Switching parameters of the steps from `node` to `nbrs`, looked up in
+        `switching_matrix` by the layer IDs of the nodes.
+
+        Parameters
+        ----------
+        node : int or np.array of ints
+            ID(s) of the node(s) the steps start from.
+        nbrs : np.array of ints
+            IDs of the nodes the steps lead to.
+
+        Returns
+        -------
+        np.array of floats
+            Switching parameter of every step (1 within a layer).
+        """
+        N = self.N
+        switch_params = self.switching_matrix[N.node_layers[node], N.node_layers[nbrs]]
+        if np.isnan(switch_params).any():
+            raise ValueError(
+                f"[ERROR] The dict of switching parameters s must contain a"
+                f" 'default' entry."
+            )
+        return switch_params
+
     def get_edge_trans_probs(self, previous, current):
         """
         Using alias sampling, calculate the discrete transition probability distribution
@@ -228,11 +888,11 @@ class HenHoe2vec:
 
         Parameters
         ----------
-        previous : 2-tuple of strs
-            Previous node on the random walk, e.g., ('n1','l1').
-        current : 2-tuple of strs
-            Current node on the random walk for which we want to calculate the
-            transition probabilities to its neighbors, e.g., ('n2','l1').
+        previous : int
+            ID of the previous node on the random walk.
+        current : int
+            ID of the current node on the random walk for which we want to calculate
+            the transition probabilities to its neighbors.
 
         Returns
         -------
@@ -241,47 +901,7 @@ class HenHoe2vec:
         q : list of floats
             The probability table.
         """
-        N = self.N
-        p = self.p
-        q = self.q
-        s = self.s
-
-        # Unnormalized transition probabilities
-        unnormalized_probs = []
-        for nbr in sorted(N.neighbors(current)):
-            src_layer = N.nodes[current]["layer"]
-            trgt_layer = N.nodes[nbr]["layer"]
-            weight = N[current][nbr]["weight"]
-
-            # Neighbor is on the same layer
-            if src_layer == trgt_layer:
-                if nbr == previous:
-                    unnormalized_probs.append(weight / p)  # Return
-                elif N.has_edge(previous, nbr):
-                    unnormalized_probs.append(weight)
-                else:
-                    unnormalized_probs.append(weight / q)  # Explore
-            # Neighbor is on a different layer
-            else:
-                # Get switching parameter
-                if (src_layer, trgt_layer) in s:
-                    switch_param = s[(src_layer, trgt_layer)]
-                else:
-                    try:
-                        switch_param = s["default"]
-                    except:
-                        raise ValueError(
-                            f"[ERROR] The dict of switching parameters s must contain a"
-                            f" 'default' entry."
-                        )
-
-                if nbr == previous:
-                    unnormalized_probs.append(weight / (p * switch_param))  # Return
-                elif N.has_edge(previous, nbr):
-                    unnormalized_probs.append(weight / switch_param)
-                else:
-                    unnormalized_probs.append(weight / (q * switch_param))  # Explore
-
+        unnormalized_probs = self._edge_unnormalized_probs(previous, current)
         # Normalization constant
         norm_const = sum(unnormalized_probs)
         # Normalized transition probabilities
@@ -289,36 +909,972 @@ class HenHoe2vec:
 
         return alias_setup(normalized_probs)
 
-    def preprocess_transition_probs(self):
+    def _edge_unnormalized_probs(self, previous, current):
         """
-        Preprocessing of transition probabilities for guiding the random walks.
+        Unnormalized transition probabilities from `current` to all its neighbors based
+        on edge weights, p, q, and switching parameters.
+
+        Parameters
+        ----------
+        previous : int
+            ID of the previous node on the random walk.
+        current : int
+            ID of the current node on the random walk.
+
+        Returns
+        -------
+        np.array of floats
+            Unnormalized transition probabilities, aligned with `N.neighbors(current)`.
         """
         N = self.N
-        is_directed = self.is_directed
+        neighbors = N.neighbors(current)
+        # Both neighbor arrays are sorted, so the neighbors of current which are also
+        # neighbors of previous are found by binary search in one pass
+        biases = _wedge_biases(
+            _sorted_isin(neighbors, N.neighbors(previous)),
+            neighbors,
+            previous,
+            self.p,
+            self.q,
+        )
+        # Switching parameters are 1 within a layer
+        switch_params = self._switch_params(current, neighbors)
 
-        transition_probs_nodes = {}
-        transition_probs_edges = {}
+        return N.neighbor_weights(current) / (biases * switch_params)
 
-        # Calculate the transition probabilities for the first step of the walks
-        for node in N.nodes:
-            transition_probs_nodes[node] = self.get_node_trans_probs(node)
+    def preprocess_transition_probs(self, workers=1, cache_dir=None):
+        """
+        Preprocessing of transition probabilities for guiding the random walks. In
+        "lazy" and "rejection" sampling, only the transition probabilities of the nodes
+        are precomputed. In "hybrid" sampling, the degree above which nodes are hubs is
+        resolved first (see `hub_degree`) and the tables of the arcs into hubs are left
+        empty.
 
-        # Calculate the transition probabilities for all other steps of the walks
-        if is_directed:
-            for edge in N.edges:
-                transition_probs_edges[edge] = self.get_edge_trans_probs(
-                    edge[0], edge[1]
-                )
+        The alias tables of all distributions are built with `alias_setup_batch` and
+        stored as flat AliasTables: the node tables are indexed by node ID and the edge
+        tables by arc, i.e., the table of the (previous, current) node pair is
+        `transition_probs_edges[N.arc_index(previous, current)]`.
+
+        Parameters
+        ----------
+        workers : int
+            Number of worker processes. With more than one worker, the nodes and arcs
+            are split into shards of similar table size which are built by a process
+            pool and written straight into shared flat tables, which are kept as the
+            tables and shared with the workers of parallel walks. Default is 1.
+        cache_dir : str or pathlib.Path object
+            Directory of the transition table cache. If given, the tables are saved
+            under a key of the fingerprint of the graph, p, q, s and the tables needed
+            by the sampling strategy (see `transition_probs_key`), and are loaded
+            (memory-mapped) from there instead of being built again. Default is None.
+        """
+        if self.sampling == "hybrid":
+            self.hub_degree = self._resolve_hub_degree()
+        if cache_dir is not None:
+            cache_path = Path(cache_dir).joinpath(
+                "transition_probs", self.transition_probs_key()
+            )
+            try:
+                self.load_transition_probs(cache_path)
+                self._emit_transition_tables("hit")
+                return
+            except FileNotFoundError:
+                pass
+
+        self._preprocess_transition_probs(workers)
+
+        if cache_dir is not None:
+            self.save_transition_probs(cache_path)
+        self._emit_transition_tables(None if cache_dir is None else "miss")
+
+    def _emit_transition_tables(self, cache):
+        """
+        Emit a "transition_tables" event with the number and size of the precomputed
+        alias tables.
+        """
+        fields = {"sampling": self.sampling, "cache": cache}
+        for kind, tables in [
+            ("node", self.transition_probs_nodes),
+            ("edge", self.transition_probs_edges),
+        ]:
+            if isinstance(tables, AliasTables):
+                fields[f"{kind}_tables"] = len(tables)
+                fields[f"{kind}_table_entries"] = len(tables.J)
+                fields[f"{kind}_table_bytes"] = tables.J.nbytes + tables.q.nbytes
+        if self.sampling == "hybrid":
+            report = self.sampling_report()
+            fields.update(report, hub_nodes=len(report["hub_nodes"]))
+        self.instrumentation.emit("transition_tables", **fields)
+
+    def _preprocess_transition_probs(self, workers):
+        """
+        Build the transition tables (see `preprocess_transition_probs`).
+        """
+        N = self.N
+        # The shared memory copy of the old tables is no longer used
+        self.close()
+
+        # Offsets of the flat tables. The tables of the nodes are used for the first
+        # step of the walks and are aligned with the CSR arrays.
+        table_offsets = {"nodes": N.indptr}
+        if self.sampling in ["alias", "hybrid"]:
+            # The tables of the arcs are used for all other steps of the walks. The CSR
+            # arrays store undirected edges in both directions, so all arcs cover both
+            # (u, v) and (v, u). The table of arc (u, v) has one entry per neighbor of
+            # v (none if v is a hub in "hybrid" sampling).
+            table_offsets["edges"] = _edge_table_offsets(N, self.hub_degree)
+
+        tables = self._build_tables(table_offsets, workers)
+
+        self.transition_probs_nodes = tables["nodes"]
+        if self.sampling == "rejection":
+            self.transition_probs_edges = {}
+        elif self.sampling == "lazy":
+            self.transition_probs_edges = self._lazy_edge_tables()
         else:
-            for edge in N.edges:
-                transition_probs_edges[edge] = self.get_edge_trans_probs(
-                    edge[0], edge[1]
-                )
-                transition_probs_edges[(edge[1], edge[0])] = self.get_edge_trans_probs(
-                    edge[1], edge[0]
+            self.transition_probs_edges = tables["edges"]
+
+    def transition_probs_key(self):
+        """
+        Cache key of the transition tables. The tables depend only on the graph, p, q,
+        s, on whether the tables of the arcs are precomputed ("alias" and "hybrid"
+        sampling) and on the degree above which nodes are hubs ("hybrid" sampling).
+
+        Returns
+        -------
+        str
+            Hex digest of the key.
+        """
+        key = {
+            "graph": self.N.fingerprint(),
+            "p": self.p,
+            "q": self.q,
+            **self._switching_params(),
+            "edge_tables": self.sampling in ["alias", "hybrid"],
+        }
+        if self.sampling == "hybrid":
+            key["hub_degree"] = self.hub_degree
+        return fingerprint(key)
+
+    def save_transition_probs(self, directory):
+        """
+        Save the preprocessed transition tables as a binary artifact directory (see
+        `artifacts.save_artifact`) which can be loaded by `load_transition_probs`.
+
+        Parameters
+        ----------
+        directory : str or pathlib.Path object
+            Path of the artifact directory.
+        """
+        arrays = {
+            "nodes_J": self.transition_probs_nodes.J,
+            "nodes_q": self.transition_probs_nodes.q,
+        }
+        if isinstance(self.transition_probs_edges, AliasTables):
+            arrays["edges_J"] = self.transition_probs_edges.J
+            arrays["edges_q"] = self.transition_probs_edges.q
+            arrays["edges_offsets"] = self.transition_probs_edges.offsets
+        save_artifact(directory, arrays, {"key": self.transition_probs_key()})
+
+    def load_transition_probs(self, directory, mmap=True):
+        """
+        Load transition tables saved by `save_transition_probs` instead of calling
+        `preprocess_transition_probs`.
+
+        Parameters
+        ----------
+        directory : str or pathlib.Path object
+            Path of the artifact directory.
+        mmap : bool
+            Whether to memory-map the (read-only) tables. Default is True.
+
+        Raises
+        ------
+        FileNotFoundError
+            If there are no saved tables at `directory`.
+        ValueError
+            If the saved tables do not belong to the graph and parameters of the
+            HenHoe2vec object.
+        """
+        if self.sampling == "hybrid" and self.hub_degree is None:
+            self.hub_degree = self._resolve_hub_degree()
+        arrays, meta = load_artifact(directory, mmap)
+        if meta["key"] != self.transition_probs_key():
+            raise ValueError(
+                f"[ERROR] The transition tables in {directory} were built for another"
+                f" graph or other parameters."
+            )
+
+        self.transition_probs_nodes = AliasTables(
+            arrays["nodes_J"], arrays["nodes_q"], self.N.indptr
+        )
+        if self.sampling == "rejection":
+            self.transition_probs_edges = {}
+        elif self.sampling == "lazy":
+            self.transition_probs_edges = self._lazy_edge_tables()
+        else:
+            self.transition_probs_edges = AliasTables(
+                arrays["edges_J"], arrays["edges_q"], arrays["edges_offsets"]
+            )
+        # The shared memory copy of the old tables is no longer used
+        self.close()
+
+    def update_edges(self, insert=(), delete=(), reweight=()):
+        """
+        Apply a batch of edge changes to the network and update the preprocessed
+        transition tables incrementally instead of calling
+        `preprocess_transition_probs` again.
+
+        Only the tables which depend on the changes are recomputed:
+        - the node tables of the nodes whose neighborhoods (neighbors or edge weights)
+          changed,
+        - the tables of the arcs (previous, current) which are new or where current's
+          neighborhood changed,
+        - the tables of the arcs (previous, current) where the `has_edge(previous, nbr)`
+          test flips for a neighbor nbr of current because the edge (previous, nbr) was
+          inserted or deleted.
+        All other tables are copied over. In "lazy" sampling, the cached tables which
+        are still valid are kept. In "hybrid" sampling, the degree above which nodes
+        are hubs is kept. Node IDs are stable (see
+        `MultilayerGraph.with_edge_updates`).
+
+        Parameters
+        ----------
+        insert : list of 3-tuples
+            Edges (u, v, weight) to insert, with u and v node tuples. Inserting an
+            existing edge sets its weight.
+        delete : list of 2-tuples
+            Existing edges (u, v) to delete.
+        reweight : list of 3-tuples
+            Existing edges (u, v, weight) to set a new weight for.
+
+        Returns
+        -------
+        dict
+            'changed_nodes': IDs of the nodes whose neighborhoods changed,
+            'new_nodes': IDs of the inserted nodes,
+            'recomputed_node_tables' and 'recomputed_edge_tables': number of
+            recomputed (in "lazy" sampling: invalidated) tables, 'node_tables' and
+            'edge_tables': total number of tables.
+        """
+        old_N = self.N
+        N = old_N.with_edge_updates(insert, delete, reweight)
+        # The shared memory copy of the old graph and tables is no longer used
+        self.close()
+        old_num_nodes = old_N.number_of_nodes()
+        num_nodes = N.number_of_nodes()
+
+        # Match the arcs of both graphs
+        src = N.arc_sources().astype(np.int64)
+        dst = N.indices.astype(np.int64)
+        old_arcs = np.full(N.number_of_arcs(), -1, dtype=np.int64)
+        existing = (src < old_num_nodes) & (dst < old_num_nodes)
+        old_arcs[existing] = old_N.arc_indices(src[existing], dst[existing])
+        inserted = old_arcs < 0
+        kept = np.zeros(old_N.number_of_arcs(), dtype=bool)
+        kept[old_arcs[~inserted]] = True
+        reweighted = ~inserted
+        reweighted[~inserted] = (
+            N.weights[~inserted] != old_N.weights[old_arcs[~inserted]]
+        )
+
+        # Arcs (u, v) which were inserted or deleted flip `has_edge(u, v)`
+        old_src = old_N.arc_sources()
+        flip_src = np.concatenate([src[inserted], old_src[~kept]])
+        flip_dst = np.concatenate([dst[inserted], old_N.indices[~kept]])
+        changed = np.zeros(num_nodes, dtype=bool)
+        changed[flip_src] = True
+        changed[src[reweighted]] = True
+        changed[old_num_nodes:] = True
+
+        self.N = N
+        self.switching_matrix = _switching_matrix(self.s, N.layers)
+        self._switching_factors = {}
+        report = {
+            "changed_nodes": np.flatnonzero(changed[:old_num_nodes]),
+            "new_nodes": np.arange(old_num_nodes, num_nodes),
+            "recomputed_node_tables": int(changed.sum()),
+            "node_tables": num_nodes,
+            "recomputed_edge_tables": 0,
+            "edge_tables": 0,
+        }
+
+        # Node tables depend on the neighborhood of the node
+        old_nodes = np.arange(num_nodes)
+        old_nodes[old_num_nodes:] = -1
+        self.transition_probs_nodes = self._updated_tables(
+            "nodes", self.transition_probs_nodes, old_nodes, changed, N.indptr
+        )
+        if self.sampling == "rejection":
+            return report
+
+        # Arc tables depend on the neighborhood of current and on `has_edge(previous,
+        # nbr)` for its neighbors: a flipped arc (a, b) affects the arcs (a, current)
+        # where b is a neighbor of current.
+        affected = inserted | changed[dst]
+        deg = N.degree()[flip_src]
+        candidates = _segment_positions(N.indptr[flip_src], deg)
+        flip_nbrs = np.repeat(flip_dst, deg)
+        affected[candidates[N.arc_indices(dst[candidates], flip_nbrs) >= 0]] = True
+        report["recomputed_edge_tables"] = int(affected.sum())
+        report["edge_tables"] = N.number_of_arcs()
+
+        if self.sampling == "lazy":
+            # Keep the cached tables which are still valid under their new arcs
+            new_arcs = np.full(old_N.number_of_arcs(), -1, dtype=np.int64)
+            valid = ~affected
+            new_arcs[old_arcs[valid]] = np.flatnonzero(valid)
+            self.transition_probs_edges.remap_keys(
+                lambda arc: int(new_arcs[arc]) if new_arcs[arc] >= 0 else None
+            )
+            self.transition_probs_edges.compute = self._lazy_edge_tables().compute
+        else:
+            self.transition_probs_edges = self._updated_tables(
+                "edges",
+                self.transition_probs_edges,
+                old_arcs,
+                affected,
+                _edge_table_offsets(N, self.hub_degree),
+            )
+
+        return report
+
+    def _updated_tables(self, kind, old_tables, old_rows, affected, offsets):
+        """
+        Flat alias tables of the updated network which reuse the tables of unaffected
+        nodes or arcs.
+
+        Parameters
+        ----------
+        kind : str
+            "nodes" for node tables or "edges" for arc tables.
+        old_tables : AliasTables
+            Tables of the network before the update.
+        old_rows : np.array of ints
+            Node ID or arc before the update of every node or arc (-1 if new).
+        affected : np.array of bools
+            Whether the table of every node or arc must be recomputed.
+        offsets : np.array of ints
+            Offsets of the new flat tables.
+
+        Returns
+        -------
+        AliasTables
+            The updated tables.
+        """
+        lengths = np.diff(offsets)
+        reuse = (old_rows >= 0) & ~affected
+        J = np.empty(offsets[-1], dtype=np.int64)
+        q = np.empty(offsets[-1], dtype=np.float64)
+
+        positions = _segment_positions(offsets[:-1][reuse], lengths[reuse])
+        old_positions = _segment_positions(
+            old_tables.offsets[:-1][old_rows[reuse]], lengths[reuse]
+        )
+        J[positions] = old_tables.J[old_positions]
+        q[positions] = old_tables.q[old_positions]
+
+        rows = np.flatnonzero(~reuse)
+        positions = _segment_positions(offsets[:-1][rows], lengths[rows])
+        J[positions], q[positions] = self._alias_tables_rows(kind, rows)
+
+        return AliasTables(J, q, offsets)
+
+    def sampling_report(self):
+        """
+        Per-node choice of the sampling method in "hybrid" sampling and the memory it
+        saves.
+
+        Returns
+        -------
+        dict
+            'hub_degree': degree above which nodes are hubs, 'hub_nodes': IDs of the
+            hubs, whose steps after the first one are drawn by rejection sampling,
+            'hub_arcs': number of arcs into hubs, whose edge tables are not built,
+            'table_bytes': size of the node and edge tables, 'saved_bytes': size which
+            the edge tables of the arcs into hubs would take, and 'max_table_bytes':
+            the memory budget.
+
+        Raises
+        ------
+        ValueError
+            If the sampling strategy is not "hybrid" or the transition tables have not
+            been preprocessed.
+        """
+        if self.sampling != "hybrid" or self.hub_degree is None:
+            raise ValueError(
+                f"[ERROR] The sampling report is only available after preprocessing in"
+                f" 'hybrid' sampling."
+            )
+        N = self.N
+        hubs = N.degree() > self.hub_degree
+        table_bytes = 0
+        for tables in [self.transition_probs_nodes, self.transition_probs_edges]:
+            if isinstance(tables, AliasTables):
+                table_bytes += tables.J.nbytes + tables.q.nbytes
+        table_bytes += self.transition_probs_edges.offsets.nbytes
+
+        return {
+            "hub_degree": self.hub_degree,
+            "hub_nodes": np.flatnonzero(hubs),
+            "hub_arcs": int(np.count_nonzero(hubs[N.indices])),
+            "table_bytes": int(table_bytes),
+            "saved_bytes": int(_in_arc_table_bytes(N)[hubs].sum()),
+            "max_table_bytes": self.max_table_bytes,
+        }
+
+    def _resolve_hub_degree(self):
+        """
+        Degree above which nodes are hubs in "hybrid" sampling: `degree_threshold`,
+        lowered as far as needed to keep the node tables, the edge tables and their
+        offsets within `max_table_bytes`. If even the node tables exceed the budget,
+        all nodes with neighbors are hubs.
+
+        Returns
+        -------
+        int
+            The degree.
+        """
+        N = self.N
+        hub_degree = self.degree_threshold
+        if self.max_table_bytes is not None:
+            num_arcs = N.number_of_arcs()
+            # The node tables and the offsets of the edge tables are always built
+            fixed_bytes = num_arcs * ALIAS_ENTRY_BYTES + (num_arcs + 1) * 8
+            # Total size if the arcs into all nodes up to every degree get tables
+            degrees, inverse = np.unique(N.degree(), return_inverse=True)
+            total_bytes = fixed_bytes + np.cumsum(
+                np.bincount(inverse, weights=_in_arc_table_bytes(N))
+            )
+            within_budget = degrees[total_bytes <= self.max_table_bytes]
+            budget_degree = int(within_budget[-1]) if len(within_budget) > 0 else 0
+            if hub_degree is None or budget_degree < hub_degree:
+                hub_degree = budget_degree
+
+        return int(hub_degree)
+
+    def set_switching_params(self, s):
+        """
+        Change the switching parameter(s) and update the preprocessed transition tables
+        without recomputing their p/q structure.
+
+        The unnormalized transition probability of every table entry is the edge weight
+        divided by the p/q bias of the step (1 in the node tables) and by the switching
+        parameter of its layer pair (1 within a layer). The first two factors do not
+        depend on s, so they are computed once together with the layer pair of every
+        entry and kept. Every change of s then only divides by the new switching
+        parameters, renormalizes and rebuilds the alias tables in vectorized passes,
+        e.g., to sweep s on a fixed network, p and q. The kept factors take about 12
+        bytes per table entry.
+
+        Parameters
+        ----------
+        s : float or dict
+            The new type-switching parameter(s) (see the constructor).
+        """
+        s = _switching_dict(s)
+        switching_matrix = _switching_matrix(s, self.N.layers)
+
+        tables = {}
+        for kind in ["nodes", "edges"]:
+            kind_tables = getattr(self, f"transition_probs_{kind}")
+            if not isinstance(kind_tables, AliasTables):
+                continue
+            base, pairs = self._switching_factors_of(kind)
+            switch_params = switching_matrix.ravel()[pairs]
+            if np.isnan(switch_params).any():
+                raise ValueError(
+                    f"[ERROR] The dict of switching parameters s must contain a"
+                    f" 'default' entry."
                 )
+            J, q = _normalized_alias_setup(base / switch_params, kind_tables.offsets)
+            tables[kind] = AliasTables(J, q, kind_tables.offsets)
+
+        self.s = s
+        self.switching_matrix = switching_matrix
+        if "nodes" in tables:
+            self.transition_probs_nodes = tables["nodes"]
+        if "edges" in tables:
+            self.transition_probs_edges = tables["edges"]
+        elif self.sampling == "lazy":
+            self.transition_probs_edges = self._lazy_edge_tables()
+        # The shared memory copy of the old tables is no longer used
+        self.close()
+
+    def _switching_factors_of(self, kind):
+        """
+        Factors of the entries of the flat tables of `kind` which do not depend on the
+        switching parameters, computed on first use.
+
+        Parameters
+        ----------
+        kind : str
+            "nodes" for node tables or "edges" for arc tables.
+
+        Returns
+        -------
+        base : np.array of floats
+            Edge weight divided by the p/q bias of every entry.
+        pairs : np.array of ints
+            Index `from_layer * L + to_layer` of the layer pair of every entry, where L
+            is the number of layers.
+        """
+        if kind in self._switching_factors:
+            return self._switching_factors[kind]
+
+        N = self.N
+        num_rows = N.number_of_nodes() if kind == "nodes" else N.number_of_arcs()
+        sources, nbrs, weights, biases, _ = self._table_entries(
+            kind, np.arange(num_rows)
+        )
+        base = weights / biases
+        pairs = (
+            N.node_layers[sources].astype(np.int64) * len(N.layers)
+            + N.node_layers[nbrs]
+        )
+
+        self._switching_factors[kind] = (base, pairs)
+        return base, pairs
+
+    def _build_tables(self, table_offsets, workers):
+        """
+        Build the flat alias tables of the nodes and/or arcs, optionally sharded over a
+        process pool.
+
+        Parameters
+        ----------
+        table_offsets : dict
+            Offsets of the flat tables to build, keyed by kind ("nodes" or "edges").
+        workers : int
+            Number of worker processes.
+
+        Returns
+        -------
+        dict
+            AliasTables keyed by kind.
+        """
+        if workers <= 1:
+            tables = {}
+            for kind, offsets in table_offsets.items():
+                J, q = self._alias_tables_rows(kind, np.arange(len(offsets) - 1))
+                tables[kind] = AliasTables(J, q, offsets)
+            return tables
+
+        arrays = self._shared_graph()
+        shards = []
+        for kind, offsets in table_offsets.items():
+            arrays[f"{kind}_J"] = np.zeros(offsets[-1], dtype=np.int64)
+            arrays[f"{kind}_q"] = np.zeros(offsets[-1], dtype=np.float64)
+            arrays[f"{kind}_offsets"] = offsets
+            shards += [(kind, start, stop) for start, stop in _shards(offsets, workers)]
+
+        shared = SharedArrays(arrays)
+        pool = ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_init_worker,
+            initargs=(shared.spec, self._worker_config()),
+        )
+        try:
+            futures = [pool.submit(_preprocess_shard, *shard) for shard in shards]
+            for future in futures:
+                future.result()
+        except BaseException:
+            pool.shutdown(cancel_futures=True)
+            shared.close()
+            raise
+
+        # The shared flat tables which the workers wrote into back the tables, and the
+        # workers, which are attached to them, simulate the walks (see `_worker_pool`)
+        tables = {
+            kind: AliasTables(
+                shared.arrays[f"{kind}_J"], shared.arrays[f"{kind}_q"], offsets
+            )
+            for kind, offsets in table_offsets.items()
+        }
+        sources = self._shared_graph()
+        for kind, kind_tables in tables.items():
+            sources[f"{kind}_J"] = kind_tables.J
+            sources[f"{kind}_q"] = kind_tables.q
+            sources[f"{kind}_offsets"] = kind_tables.offsets
+        self.close()
+        self._shared = shared
+        self._shared_sources = sources
+        self._pool = pool
+        self._pool_workers = workers
+
+        return tables
+
+    def _alias_tables_rows(self, kind, rows):
+        """
+        Build the alias tables of some nodes or arcs.
+
+        Parameters
+        ----------
+        kind : str
+            "nodes" for node tables or "edges" for arc tables.
+        rows : np.array of ints
+            Node IDs or arcs.
+
+        Returns
+        -------
+        J : np.array of ints
+            The concatenated alias tables.
+        q : np.array of floats
+            The concatenated probability tables.
+        """
+        sources, nbrs, weights, biases, lengths = self._table_entries(kind, rows)
+        switch_params = self._switch_params(sources, nbrs)
+
+        offsets = np.zeros(len(lengths) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=offsets[1:])
+        return _normalized_alias_setup(weights / (biases * switch_params), offsets)
+
+    def _table_entries(self, kind, rows):
+        """
+        Steps of the entries of the alias tables of some nodes or arcs, i.e., of all
+        their tables concatenated.
+
+        The steps of the table of arc (previous, current) lead from current to its
+        neighbors nbr. They are classified at once by searching all arcs (previous,
+        nbr) in the sorted arc keys of `N` (see `MultilayerGraph.arc_indices`), instead
+        of one `has_edge` call per step.
+
+        Parameters
+        ----------
+        kind : str
+            "nodes" for node tables or "edges" for arc tables.
+        rows : np.array of ints
+            Node IDs or arcs.
+
+        Returns
+        -------
+        sources : np.array of ints
+            ID of the node every step starts from.
+        nbrs : np.array of ints
+            ID of the node every step leads to.
+        weights : np.array of floats
+            Weight of the edge of every step.
+        biases : np.array of floats
+            p/q bias of every step (see `_wedge_biases`), 1 in node tables.
+        lengths : np.array of ints
+            Number of entries of the table of every row.
+        """
+        N = self.N
+        rows = np.asarray(rows, dtype=np.int64)
+        if kind == "nodes":
+            sources = rows
+        else:
+            sources = N.indices[rows].astype(np.int64)
+        lengths = N.degree()[sources]
+        if kind == "edges" and self.hub_degree is not None:
+            # No tables for the arcs into hubs
+            lengths[lengths > self.hub_degree] = 0
+        arcs = _segment_positions(N.indptr[sources], lengths)
+        nbrs = N.indices[arcs]
+        if kind == "nodes":
+            biases = np.ones(len(arcs))
+        else:
+            previous = np.repeat(
+                np.searchsorted(N.indptr, rows, side="right") - 1, lengths
+            )
+            biases = _wedge_biases(
+                N.arc_indices(previous, nbrs) >= 0, nbrs, previous, self.p, self.q
+            )
 
-        self.transition_probs_nodes = transition_probs_nodes
-        self.transition_probs_edges = transition_probs_edges
+        return np.repeat(sources, lengths), nbrs, N.weights[arcs], biases, lengths
 
-        return
+    def _lazy_edge_tables(self):
+        """
+        Returns
+        -------
+        LRUCache
+            Cache which computes the alias table of an arc on demand.
+        """
+        N = self.N
+        return LRUCache(
+            lambda arc: self.get_edge_trans_probs(
+                N.arc_source(arc), int(N.indices[arc])
+            ),
+            max_entries=self.cache_max_entries,
+            max_bytes=self.cache_max_bytes,
+        )
+
+
+def _wedge_biases(is_neighbor, nbrs, previous, p, q):
+    """
+    p/q biases of the steps to `nbrs` of a walk coming from `previous`: p for returning
+    to `previous`, 1 for neighbors of `previous` and q for exploring (unnormalized
+    transition probabilities are divided by them).
+
+    Parameters
+    ----------
+    is_neighbor : np.array of bools
+        Whether every node of `nbrs` is a neighbor of `previous`.
+    nbrs : np.array of ints
+        IDs of the nodes the steps lead to.
+    previous : int or np.array of ints
+        ID(s) of the previous node(s) of the steps.
+    p : float
+        The return parameter.
+    q : float
+        The in-out parameter.
+
+    Returns
+    -------
+    np.array of floats
+        The bias of every step.
+    """
+    biases = np.where(is_neighbor, 1.0, q)
+    biases[nbrs == previous] = p
+    return biases
+
+
+def _sorted_isin(values, sorted_values):
+    """
+    Whether every element of `values` is contained in the sorted array
+    `sorted_values`.
+    """
+    pos = np.searchsorted(sorted_values, values)
+    found = pos < len(sorted_values)
+    found[found] = sorted_values[pos[found]] == values[found]
+    return found
+
+
+def _switching_dict(s):
+    """
+    Switching parameter(s) as a dict of layer pairs and/or a "default" entry.
+
+    Parameters
+    ----------
+    s : float or dict
+        The type-switching parameter(s) (see `HenHoe2vec`).
+
+    Returns
+    -------
+    dict
+        The switching parameters.
+    """
+    if type(s) in [float, int] or isinstance(s, np.floating):
+        return {"default": s}
+    elif type(s) == dict:
+        return s
+    else:
+        raise TypeError(
+            f"[ERROR] Invalid type for argument s. Should be float or dict but"
+            f" is {type(s)}."
+        )
+
+
+def _switching_matrix(s, layers):
+    """
+    Dense matrix of the switching parameters between the layers of a network.
+
+    Parameters
+    ----------
+    s : dict
+        The switching parameters (see `_switching_dict`).
+    layers : list of strs
+        Layer vocabulary.
+
+    Returns
+    -------
+    np.array of floats
+        Matrix of shape (len(`layers`), len(`layers`)) whose entry [i, j] is the
+        switching parameter from layer i to layer j, 1 on the diagonal and NaN for
+        layer pairs without an entry if `s` has no "default" entry.
+    """
+    layer_ids = {layer: i for i, layer in enumerate(layers)}
+    matrix = np.full((len(layers), len(layers)), s.get("default", np.nan), dtype=float)
+    for pair, value in s.items():
+        if pair != "default" and pair[0] in layer_ids and pair[1] in layer_ids:
+            matrix[layer_ids[pair[0]], layer_ids[pair[1]]] = value
+    np.fill_diagonal(matrix, 1.0)
+    return matrix
+
+
+def _normalized_alias_setup(unnormalized_probs, offsets):
+    """
+    Normalize a batch of unnormalized discrete distributions and build their alias
+    tables.
+
+    Parameters
+    ----------
+    unnormalized_probs : np.array of floats
+        Concatenated unnormalized probability distributions. Normalized in place.
+    offsets : np.array of ints
+        Start of every distribution in the concatenated distributions, followed by the
+        total number of probabilities.
+
+    Returns
+    -------
+    J : np.array of ints
+        The concatenated alias tables.
+    q : np.array of floats
+        The concatenated probability tables.
+    """
+    probs = np.asarray(unnormalized_probs, dtype=np.float64)
+    rows = np.repeat(np.arange(len(offsets) - 1), np.diff(offsets))
+    norm_consts = np.bincount(rows, weights=probs, minlength=len(offsets) - 1)
+    probs /= norm_consts[rows]
+
+    return alias_setup_batch(probs, offsets)
+
+
+def _edge_table_offsets(N, hub_degree=None):
+    """
+    Offsets of the flat alias tables of the arcs of `N`. The table of arc (u, v) has
+    one entry per neighbor of v, or none if the degree of v is above `hub_degree`.
+    """
+    lengths = N.degree()[N.indices]
+    if hub_degree is not None:
+        lengths[lengths > hub_degree] = 0
+    edge_offsets = np.zeros(N.number_of_arcs() + 1, dtype=np.int64)
+    np.cumsum(lengths, out=edge_offsets[1:])
+    return edge_offsets
+
+
+def _in_arc_table_bytes(N):
+    """
+    Size in bytes of the full alias tables of the arcs into every node of `N`.
+    """
+    in_arcs = np.bincount(N.indices, minlength=N.number_of_nodes())
+    return in_arcs * N.degree() * ALIAS_ENTRY_BYTES
+
+
+def _segment_positions(starts, lengths):
+    """
+    Flat positions of the segments [starts[i], starts[i] + lengths[i]).
+    """
+    lengths = np.asarray(lengths, dtype=np.int64)
+    ends = np.cumsum(lengths)
+    return np.repeat(np.asarray(starts, dtype=np.int64) - ends + lengths, lengths) + (
+        np.arange(ends[-1] if len(ends) > 0 else 0)
+    )
+
+
+def _shards(offsets, workers):
+    """
+    Split the rows of flat tables into contiguous shards of similar total table size.
+
+    Parameters
+    ----------
+    offsets : np.array of ints
+        Offsets of the flat tables.
+    workers : int
+        Number of worker processes. Every worker gets several shards on average to
+        balance the load.
+
+    Returns
+    -------
+    list of 2-tuples of ints
+        (start, stop) row ranges of the shards.
+    """
+    num_rows = len(offsets) - 1
+    # Balance by table size, but every row also counts so that empty rows are split
+    work = offsets + np.arange(num_rows + 1)
+    targets = np.linspace(0, work[-1], 4 * workers + 1)
+    bounds = np.unique(np.searchsorted(work, targets))
+    bounds[0] = 0
+    bounds[-1] = num_rows
+    bounds = np.unique(bounds)
+    return list(zip(bounds[:-1].tolist(), bounds[1:].tolist()))
+
+
+# --------------------------------------------------------------------------------------
+# WORKER PROCESSES
+# --------------------------------------------------------------------------------------
+def _start_node_chunks(seed, nodes, num_walks, chunk_size):
+    """
+    Start nodes of the walks in chunks of `chunk_size`. Every round of walks starts at
+    all `nodes` in the order of its own random permutation.
+    """
+    start_nodes = np.empty(0, dtype=np.int64)
+    for walk_round in range(num_walks):
+        seed_seq = np.random.SeedSequence(seed, spawn_key=(0, walk_round))
+        start_nodes = np.concatenate(
+            [
+                start_nodes,
+                nodes[np.random.default_rng(seed_seq).permutation(len(nodes))],
+            ]
+        )
+        while len(start_nodes) >= chunk_size:
+            yield start_nodes[:chunk_size]
+            start_nodes = start_nodes[chunk_size:]
+    if len(start_nodes) > 0:
+        yield start_nodes
+
+
+def _chunk_rng(seed, chunk):
+    """
+    Random number stream of a chunk of walks, independent of the process it runs in.
+    """
+    seed_seq = np.random.SeedSequence(seed, spawn_key=(1, chunk))
+    return RandomBuffer(np.random.default_rng(seed_seq))
+
+
+# State of a worker process, set by `_init_worker`
+_worker_state = {}
+
+
+def _init_worker(spec, config):
+    """
+    Attach a worker process to the shared arrays and rebuild the HenHoe2vec object.
+    """
+    arrays, blocks = attach_shared_arrays(spec)
+    N = MultilayerGraph(
+        None,
+        config["layers"],
+        arrays["node_layers"],
+        arrays["indptr"],
+        arrays["indices"],
+        arrays["weights"],
+        config["is_directed"],
+    )
+    hh2v = HenHoe2vec(
+        N,
+        config["is_directed"],
+        config["p"],
+        config["q"],
+        config["s"],
+        sampling=config["sampling"],
+        cache_max_entries=config["cache_max_entries"],
+        cache_max_bytes=config["cache_max_bytes"],
+        degree_threshold=config["degree_threshold"],
+        max_table_bytes=config["max_table_bytes"],
+    )
+    hh2v.hub_degree = config["hub_degree"]
+    if "nodes_J" in arrays:
+        hh2v.transition_probs_nodes = AliasTables(
+            arrays["nodes_J"], arrays["nodes_q"], N.indptr
+        )
+    if "edges_J" in arrays:
+        hh2v.transition_probs_edges = AliasTables(
+            arrays["edges_J"], arrays["edges_q"], arrays["edges_offsets"]
+        )
+    elif hh2v.sampling == "lazy":
+        hh2v.transition_probs_edges = hh2v._lazy_edge_tables()
+
+    _worker_state["hh2v"] = hh2v
+    _worker_state["arrays"] = arrays
+    _worker_state["blocks"] = blocks
+
+
+def _walk_chunk(start_nodes, walk_length, seed, chunk):
+    """
+    Simulate the walks of one chunk in a worker process.
+    """
+    return _worker_state["hh2v"].simulate_walks_from(
+        start_nodes, walk_length, _chunk_rng(seed, chunk)
+    )
+
+
+def _preprocess_shard(kind, start, stop):
+    """
+    Build the alias tables of one shard of nodes or arcs in a worker process and write
+    them into the shared flat tables.
+    """
+    arrays = _worker_state["arrays"]
+    offsets = arrays[f"{kind}_offsets"]
+    J, q = _worker_state["hh2v"]._alias_tables_rows(kind, np.arange(start, stop))
+    arrays[f"{kind}_J"][offsets[start] : offsets[stop]] = J
+    arrays[f"{kind}_q"][offsets[start] : offsets[stop]] = q
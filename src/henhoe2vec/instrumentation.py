@@ -0,0 +1,208 @@
+import cProfile
+import json
+import sys
+import time
+import tracemalloc
+import numpy as np
+from contextlib import contextmanager
+from pathlib import Path
+
+try:
+    import resource
+except ImportError:
+    # Not available on Windows
+    resource = None
+
+
+class Instrumentation:
+    """
+    Pluggable instrumentation of HeNHoE-2vec. Components which accept an
+    `instrumentation` argument (`henhoe2vec.run`, `HenHoe2vec`, `generate_embeddings`)
+    emit structured events to it, e.g., stage durations and peak memory, the number of
+    built alias tables, walk throughput and dead ends, transition table cache hit rates
+    and word2vec training throughput.
+
+    Events are dicts with the keys 'event' (the event type) and 'time' (a Unix
+    timestamp) and event-specific fields. They are passed to every sink, i.e., to every
+    callable in `sinks`, for example a `JsonLinesSink` or the `append` method of a
+    list. Without sinks, events are dropped.
+
+    Optionally, the outermost stages are profiled with cProfile and/or traced with
+    tracemalloc. Profiles are dumped to `profile_dir`/<stage>.prof (e.g., for
+    `python -m pstats` or snakeviz) and the tracemalloc peak of a stage is added to its
+    event.
+
+    Attributes
+    ----------
+    sinks : list of functions
+        Callables which receive every event.
+    profile_dir : pathlib.Path object
+        Directory of the cProfile dumps of the stages, or None.
+    trace_memory : bool
+        Whether the Python heap of the stages is traced with tracemalloc.
+    """
+
+    def __init__(self, sinks=(), profile_dir=None, trace_memory=False):
+        """
+        Constructor for the Instrumentation class.
+
+        Parameters
+        ----------
+        sinks : iterable of functions
+            Callables which receive every event. Default is no sinks.
+        profile_dir : str or pathlib.Path object
+            If given, the outermost stages are profiled with cProfile and the profiles
+            are dumped into this directory. Default is None.
+        trace_memory : bool
+            Whether to trace the Python heap of the outermost stages with tracemalloc.
+            Tracing slows down allocations considerably. Default is False.
+        """
+        self.sinks = list(sinks)
+        self.profile_dir = Path(profile_dir) if profile_dir is not None else None
+        self.trace_memory = trace_memory
+        # Depth of nested stages
+        self._depth = 0
+
+    def emit(self, event, **fields):
+        """
+        Emit an event to all sinks.
+
+        Parameters
+        ----------
+        event : str
+            Event type, e.g., "stage" or "walks".
+        **fields
+            JSON-serializable event fields.
+        """
+        if not self.sinks:
+            return
+        record = {"event": event, "time": time.time(), **fields}
+        for sink in self.sinks:
+            sink(record)
+
+    @contextmanager
+    def stage(self, name, **fields):
+        """
+        Context manager which emits a "stage" event with the duration and peak memory
+        of the enclosed code when it exits. Fields can be added to the event through
+        the yielded dict, e.g., counts which are only known at the end of the stage.
+
+        Parameters
+        ----------
+        name : str
+            Name of the stage.
+        **fields
+            Additional JSON-serializable event fields.
+
+        Yields
+        ------
+        dict
+            Fields of the event.
+        """
+        fields = dict(fields)
+        outermost = self._depth == 0
+        profiler = None
+        tracing = False
+        if outermost and self.profile_dir is not None:
+            profiler = cProfile.Profile()
+        if outermost and self.trace_memory:
+            tracing = not tracemalloc.is_tracing()
+            if tracing:
+                tracemalloc.start()
+            elif hasattr(tracemalloc, "reset_peak"):
+                tracemalloc.reset_peak()
+
+        self._depth += 1
+        start = time.perf_counter()
+        if profiler is not None:
+            profiler.enable()
+        try:
+            yield fields
+        finally:
+            if profiler is not None:
+                profiler.disable()
+            seconds = time.perf_counter() - start
+            self._depth -= 1
+            if profiler is not None:
+                self.profile_dir.mkdir(parents=True, exist_ok=True)
+                profile_path = self.profile_dir.joinpath(f"{name}.prof")
+                profiler.dump_stats(profile_path)
+                fields["profile"] = str(profile_path)
+            if outermost and self.trace_memory:
+                fields["tracemalloc_peak_bytes"] = tracemalloc.get_traced_memory()[1]
+                if tracing:
+                    tracemalloc.stop()
+            self.emit(
+                "stage",
+                stage=name,
+                seconds=seconds,
+                **peak_rss(),
+                **fields,
+            )
+
+
+# Instrumentation without sinks, used when no instrumentation is passed
+NULL_INSTRUMENTATION = Instrumentation()
+
+
+class JsonLinesSink:
+    """
+    Sink which appends every event as one JSON line to a file, e.g., to follow a job
+    with `tail -f` or to load the events with `pandas.read_json(path, lines=True)`.
+
+    Attributes
+    ----------
+    path : pathlib.Path object
+        Path of the JSON-lines file.
+    """
+
+    def __init__(self, path):
+        """
+        Constructor for the JsonLinesSink class.
+
+        Parameters
+        ----------
+        path : str or pathlib.Path object
+            Path of the JSON-lines file. Events are appended to an existing file.
+        """
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+
+    def __call__(self, record):
+        # Reopened per event, so events are on disk as soon as they are emitted
+        with open(self.path, "a") as f:
+            f.write(json.dumps(record, default=_json_default) + "\n")
+
+
+def peak_rss():
+    """
+    Peak resident set size of this process and of its terminated child processes
+    (e.g., worker processes) so far.
+
+    Returns
+    -------
+    dict
+        'peak_rss_bytes' and 'peak_children_rss_bytes' (None where not available).
+    """
+    if resource is None:
+        return {"peak_rss_bytes": None, "peak_children_rss_bytes": None}
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    scale = 1 if sys.platform == "darwin" else 1024
+    return {
+        "peak_rss_bytes": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale,
+        "peak_children_rss_bytes": resource.getrusage(
+            resource.RUSAGE_CHILDREN
+        ).ru_maxrss
+        * scale,
+    }
+
+
+def _json_default(value):
+    """
+    JSON representation of numpy scalars and arrays (and `str` of anything else).
+    """
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    return str(value)
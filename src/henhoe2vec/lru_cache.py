@@ -0,0 +1,169 @@
+from collections import OrderedDict
+
+
+class LRUCache:
+    """
+    A size- and/or byte-bounded least recently used (LRU) cache which computes missing
+    entries on demand.
+
+    Used to compute the alias tables of `(previous, current)` node pairs lazily the
+    first time a random walk visits them instead of precomputing all of them.
+
+    Attributes
+    ----------
+    compute : function
+        Function called with a missing key to compute its value.
+    max_entries : int
+        Maximum number of cached entries. None means unbounded.
+    max_bytes : int
+        Maximum total size of the cached values in bytes. None means unbounded.
+    nbytes : int
+        Current total size of the cached values in bytes.
+    hits : int
+        Number of lookups served from the cache.
+    misses : int
+        Number of lookups which had to compute their value.
+    evictions : int
+        Number of entries evicted to stay within the bounds.
+    """
+
+    def __init__(self, compute, max_entries=None, max_bytes=None):
+        """
+        Constructor for the LRUCache class.
+
+        Parameters
+        ----------
+        compute : function
+            Function called with a missing key to compute its value. Values must be
+            numpy arrays or tuples of numpy arrays so that their size can be measured.
+        max_entries : int
+            Maximum number of cached entries. None means unbounded. Default is None.
+        max_bytes : int
+            Maximum total size of the cached values in bytes. None means unbounded.
+            Default is None.
+        """
+        if max_entries is not None and max_entries < 1:
+            raise ValueError(
+                f"[ERROR] max_entries must be a positive int or None but is"
+                f" {max_entries}."
+            )
+        if max_bytes is not None and max_bytes < 0:
+            raise ValueError(
+                f"[ERROR] max_bytes must be a non-negative int or None but is"
+                f" {max_bytes}."
+            )
+
+        self.compute = compute
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        # Form: {key : (value, size in bytes)}, ordered from least to most recently used
+        self._entries = OrderedDict()
+
+    def __getitem__(self, key):
+        """
+        Look up `key`, computing and caching its value on a miss.
+
+        Parameters
+        ----------
+        key : hashable
+            Key to look up.
+
+        Returns
+        -------
+        object
+            The (possibly just computed) value of `key`.
+        """
+        entries = self._entries
+        if key in entries:
+            self.hits += 1
+            entries.move_to_end(key)
+            return entries[key][0]
+
+        self.misses += 1
+        value = self.compute(key)
+        size = _nbytes(value)
+        if self.max_bytes is not None and size > self.max_bytes:
+            # Value can never fit into the cache
+            return value
+
+        entries[key] = (value, size)
+        self.nbytes += size
+        self._evict()
+
+        return value
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _evict(self):
+        """
+        Evict least recently used entries until the cache is within its bounds.
+        """
+        entries = self._entries
+        while (self.max_entries is not None and len(entries) > self.max_entries) or (
+            self.max_bytes is not None and self.nbytes > self.max_bytes
+        ):
+            _, (_, size) = entries.popitem(last=False)
+            self.nbytes -= size
+            self.evictions += 1
+
+    def remap_keys(self, mapping):
+        """
+        Rename the keys of all entries, keeping their order, and drop the entries whose
+        new key is None. Counters are not reset.
+
+        Parameters
+        ----------
+        mapping : function
+            Function called with the key of every entry which returns its new key or
+            None.
+        """
+        entries = OrderedDict()
+        for key, (value, size) in self._entries.items():
+            new_key = mapping(key)
+            if new_key is None:
+                self.nbytes -= size
+            else:
+                entries[new_key] = (value, size)
+        self._entries = entries
+
+    def clear(self):
+        """
+        Remove all entries from the cache. Counters are not reset.
+        """
+        self._entries.clear()
+        self.nbytes = 0
+
+    def stats(self):
+        """
+        Returns
+        -------
+        dict
+            Cache counters: 'hits', 'misses', 'evictions', 'entries', 'nbytes' and
+            'hit_rate' (None if there were no lookups yet).
+        """
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "entries": len(self._entries),
+            "nbytes": self.nbytes,
+            "hit_rate": self.hits / lookups if lookups > 0 else None,
+        }
+
+
+def _nbytes(value):
+    """
+    Size of a numpy array or a tuple of numpy arrays in bytes.
+    """
+    if isinstance(value, tuple):
+        return sum(_nbytes(v) for v in value)
+    return value.nbytes
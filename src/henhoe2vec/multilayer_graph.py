@@ -0,0 +1,825 @@
+import shutil
+from collections.abc import Sequence
+from pathlib import Path
+import numpy as np
+import networkx as nx
+from .artifacts import fingerprint, hash_arrays, save_artifact, load_artifact
+from .utils import read_multilayer_edgelist
+
+
+class MultilayerGraph:
+    """
+    Compact compressed sparse row (CSR) representation of a multilayer network.
+
+    Nodes are identified by integer IDs. The node with ID `i` is `nodes[i]`, a tuple of
+    the form ('n','l') where 'n' is the name of the node and 'l' is the layer it belongs
+    to. Node IDs are assigned in sorted order of the node tuples, so the neighbors of
+    every node are stored in the same order as `sorted(G.neighbors(node))` on the
+    equivalent NetworkX graph.
+
+    The (out-)neighbors of node `i` are `indices[indptr[i]:indptr[i + 1]]` (sorted by
+    ID) and the weights of the corresponding edges are
+    `weights[indptr[i]:indptr[i + 1]]`. Every position in `indices` is called an arc.
+    Undirected edges are stored as two arcs, one in each direction.
+
+    Attributes
+    ----------
+    nodes : list of 2-tuples of strs or NodeVocabulary
+        Node vocabulary. `nodes[i]` is the node with ID `i`. Loaded graphs decode the
+        node tuples from a `NodeVocabulary` on access.
+    node_ids : dict
+        Mapping from node tuples to node IDs.
+    layers : list of strs
+        Layer vocabulary. `layers[l]` is the name of the layer with ID `l`.
+    node_layers : np.array of ints
+        Layer ID of every node.
+    indptr : np.array of ints
+        CSR row pointers (length `number_of_nodes() + 1`).
+    indices : np.array of ints
+        CSR column indices, i.e., the neighbor IDs of every node.
+    weights : np.array of floats
+        Edge weights aligned with `indices`.
+    is_directed : bool
+        Whether the network is directed or not.
+    """
+
+    def __init__(
+        self, nodes, layers, node_layers, indptr, indices, weights, is_directed
+    ):
+        """
+        Constructor for the MultilayerGraph class. Use one of the `from_*` class
+        methods to build a MultilayerGraph from a NetworkX graph or an edge list.
+
+        Parameters
+        ----------
+        nodes : sequence of 2-tuples of strs
+            Node vocabulary. `nodes[i]` is the node with ID `i`. May be None for graphs
+            which are only walked over, e.g., in worker processes. A `NodeVocabulary`
+            is kept as is, any other sequence is copied into a list.
+        layers : list of strs
+            Layer vocabulary. `layers[l]` is the name of the layer with ID `l`.
+        node_layers : np.array of ints
+            Layer ID of every node.
+        indptr : np.array of ints
+            CSR row pointers.
+        indices : np.array of ints
+            CSR column indices. Must be sorted within every row.
+        weights : np.array of floats
+            Edge weights aligned with `indices`.
+        is_directed : bool
+            Whether the network is directed or not.
+        """
+        if nodes is None or isinstance(nodes, NodeVocabulary):
+            self.nodes = nodes
+        else:
+            self.nodes = list(nodes)
+        # Built on demand by the `node_ids` property
+        self._node_ids = None
+        self.layers = list(layers)
+        self.node_layers = np.asarray(node_layers, dtype=np.int32)
+        self.indptr = np.asarray(indptr, dtype=np.int64)
+        self.indices = np.asarray(indices, dtype=np.int32)
+        self.weights = np.asarray(weights, dtype=np.float64)
+        self.is_directed = is_directed
+        # Sorted int64 keys `source * number_of_nodes() + target` of all arcs, built on
+        # demand by `arc_indices`
+        self._arc_keys = None
+        # Computed on demand by `fingerprint`
+        self._fingerprint = None
+
+    @property
+    def node_ids(self):
+        """
+        Mapping from node tuples to node IDs, built on first access.
+        """
+        if self._node_ids is None:
+            self._node_ids = {node: i for i, node in enumerate(self.nodes or [])}
+        return self._node_ids
+
+    # ----------------------------------------------------------------------------------
+    # CONSTRUCTION
+    # ----------------------------------------------------------------------------------
+    @classmethod
+    def from_edges(cls, sources, targets, weights, is_directed):
+        """
+        Build a MultilayerGraph from a list of edges.
+
+        If an edge occurs several times, the weight of its last occurrence is used (for
+        undirected networks, (u, v) and (v, u) are the same edge).
+
+        Parameters
+        ----------
+        sources : list of 2-tuples of strs
+            Source node of every edge, e.g., ('n1','l1').
+        targets : list of 2-tuples of strs
+            Target node of every edge, e.g., ('n2','l1').
+        weights : list of floats
+            Weight of every edge.
+        is_directed : bool
+            Whether the network is directed or not.
+
+        Returns
+        -------
+        MultilayerGraph
+            Multilayer network with the passed in edges.
+        """
+        nodes = sorted(set(sources) | set(targets))
+        node_ids = {node: i for i, node in enumerate(nodes)}
+        src = np.fromiter((node_ids[n] for n in sources), np.int64, len(sources))
+        dst = np.fromiter((node_ids[n] for n in targets), np.int64, len(targets))
+
+        return cls._from_arrays(
+            nodes, src, dst, np.asarray(weights, dtype=np.float64), is_directed
+        )
+
+    @classmethod
+    def from_networkx(cls, G):
+        """
+        Build a MultilayerGraph from a NetworkX graph, e.g., as returned by
+        `utils.parse_multilayer_edgelist`.
+
+        Parameters
+        ----------
+        G : NetworkX (Di)Graph
+            Multilayer network. Nodes must be tuples of the form ('n','l'). The layer of
+            a node is taken from its attribute 'layer' if it exists and from the second
+            entry of the node tuple otherwise. Edges without a 'weight' attribute have
+            weight 1.
+
+        Returns
+        -------
+        MultilayerGraph
+            Multilayer network equivalent to `G`.
+        """
+        nodes = sorted(G.nodes)
+        node_ids = {node: i for i, node in enumerate(nodes)}
+        node_layer_names = [G.nodes[node].get("layer", node[1]) for node in nodes]
+
+        edges = list(G.edges(data="weight", default=1))
+        src = np.fromiter((node_ids[e[0]] for e in edges), np.int64, len(edges))
+        dst = np.fromiter((node_ids[e[1]] for e in edges), np.int64, len(edges))
+        weights = np.fromiter((e[2] for e in edges), np.float64, len(edges))
+
+        return cls._from_arrays(
+            nodes, src, dst, weights, G.is_directed(), node_layer_names
+        )
+
+    @classmethod
+    def from_edgelist(
+        cls,
+        multiedgelist,
+        directed,
+        edges_are_distance=False,
+        sep="\t",
+        header=False,
+        cache_dir=None,
+    ):
+        """
+        Build a MultilayerGraph straight from a multilayer edge list file, without
+        creating an intermediate NetworkX graph. The file is read in chunks and turned
+        into edge arrays with `utils.read_multilayer_edgelist`.
+
+        Parameters
+        ----------
+        multiedgelist : str
+            Path to the multilayer edge list (csv file , no index). Consists of the
+            columns 'source', 'source_layer', 'target', 'target_layer', 'weight'.
+        directed : bool
+            Whether the network is directed or not.
+        edges_are_distance : bool
+            Whether edge weights indicate distance between nodes (opposed to
+            weight/similarity). If network is unweighted, set to False. Default is
+            False.
+        sep : str
+            Delimiter used in the multilayer edge list .csv file. Default is '\\t'.
+        header : bool
+            Whether the multilayer edge list .csv file has a header row. Default is
+            False.
+        cache_dir : str or pathlib.Path object
+            Directory of the binary graph cache. If given, the parsed graph is saved
+            under a key of the resolved path, size and modification time of the edge
+            list and of `directed`, `edges_are_distance`, `sep` and `header`, and is
+            loaded (memory-mapped) from there instead of being parsed again while none
+            of them changes. When the edge list changes, the new graph replaces the
+            cached graph of its earlier version. Default is None.
+
+        Returns
+        -------
+        MultilayerGraph
+            Multilayer network parsed from the passed in edge list.
+        """
+        if cache_dir is not None:
+            # One directory per edge list and parsing options, holding the graph of the
+            # current version of the edge list
+            source_key = fingerprint(
+                {
+                    "path": str(Path(multiedgelist).resolve()),
+                    "directed": directed,
+                    "edges_are_distance": edges_are_distance,
+                    "sep": sep,
+                    "header": header,
+                }
+            )
+            stat = Path(multiedgelist).stat()
+            version_key = fingerprint(
+                {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+            )
+            cache_path = Path(cache_dir).joinpath("graphs", source_key, version_key)
+            try:
+                return cls.load(cache_path)
+            except FileNotFoundError:
+                pass
+
+        nodes, src, dst, weights = read_multilayer_edgelist(
+            multiedgelist, edges_are_distance, sep=sep, header=header
+        )
+        N = cls._from_arrays(nodes, src, dst, weights, directed)
+
+        if cache_dir is not None:
+            N.save(cache_path)
+            # Remove the graphs of earlier versions of the edge list
+            for path in cache_path.parent.iterdir():
+                if path.name != version_key:
+                    shutil.rmtree(path, ignore_errors=True)
+        return N
+
+    @classmethod
+    def _from_arrays(cls, nodes, src, dst, weights, is_directed, node_layer_names=None):
+        """
+        Build a MultilayerGraph from integer edge arrays over a sorted node vocabulary.
+
+        Parameters
+        ----------
+        nodes : list of 2-tuples of strs
+            Sorted node vocabulary.
+        src : np.array of ints
+            Source node ID of every edge.
+        dst : np.array of ints
+            Target node ID of every edge.
+        weights : np.array of floats
+            Weight of every edge.
+        is_directed : bool
+            Whether the network is directed or not.
+        node_layer_names : list of strs
+            Layer name of every node. If None, the second entry of every node tuple is
+            used. Default is None.
+
+        Returns
+        -------
+        MultilayerGraph
+            Multilayer network with the passed in edges.
+        """
+        num_nodes = len(nodes)
+        if node_layer_names is None:
+            node_layer_names = [node[1] for node in nodes]
+        layers = sorted(set(node_layer_names))
+        layer_ids = {layer: i for i, layer in enumerate(layers)}
+        node_layers = np.fromiter(
+            (layer_ids[layer] for layer in node_layer_names), np.int32, num_nodes
+        )
+
+        src = np.asarray(src, dtype=np.int64)
+        dst = np.asarray(dst, dtype=np.int64)
+        weights = np.asarray(weights, dtype=np.float64)
+        if not is_directed:
+            # (u, v) and (v, u) are the same undirected edge
+            src, dst = np.minimum(src, dst), np.maximum(src, dst)
+
+        # Deduplicate edges, keeping the weight of the last occurrence
+        keys = src * num_nodes + dst
+        order = np.argsort(keys, kind="stable")
+        keys = keys[order]
+        last = np.ones(len(keys), dtype=bool)
+        last[:-1] = keys[1:] != keys[:-1]
+        order = order[last]
+        src, dst, weights = src[order], dst[order], weights[order]
+
+        if not is_directed:
+            # Store undirected edges as arcs in both directions (self-loops once)
+            mirror = src != dst
+            src, dst = (
+                np.concatenate([src, dst[mirror]]),
+                np.concatenate([dst, src[mirror]]),
+            )
+            weights = np.concatenate([weights, weights[mirror]])
+
+        # Sort arcs by source and then by target
+        order = np.lexsort((dst, src))
+        src, dst, weights = src[order], dst[order], weights[order]
+        indptr = np.zeros(num_nodes + 1, dtype=np.int64)
+        np.cumsum(np.bincount(src, minlength=num_nodes), out=indptr[1:])
+
+        return cls(nodes, layers, node_layers, indptr, dst, weights, is_directed)
+
+    def fingerprint(self):
+        """
+        Fingerprint of the structure of the graph: its CSR arrays, node layers, layer
+        vocabulary and directedness. Node names do not contribute. The fingerprint is
+        computed on first call and kept, since the arrays are never changed in place
+        (`with_edge_updates` returns a new graph).
+
+        Returns
+        -------
+        str
+            Hex digest of the graph.
+        """
+        if self._fingerprint is None:
+            self._fingerprint = fingerprint(
+                {
+                    "arrays": hash_arrays(
+                        self.node_layers, self.indptr, self.indices, self.weights
+                    ),
+                    "layers": self.layers,
+                    "is_directed": self.is_directed,
+                }
+            )
+        return self._fingerprint
+
+    def save(self, directory):
+        """
+        Save the graph as a binary artifact directory (see `artifacts.save_artifact`)
+        which can be memory-mapped by `load`. Node names and layers must be strs. They
+        are stored as a `NodeVocabulary`, i.e., as concatenated UTF-8 bytes and their
+        offsets.
+
+        Parameters
+        ----------
+        directory : str or pathlib.Path object
+            Path of the artifact directory.
+        """
+        vocabulary = NodeVocabulary.from_nodes(self.nodes)
+        save_artifact(
+            directory,
+            {
+                "node_bytes": vocabulary.data,
+                "node_offsets": vocabulary.offsets,
+                "node_layers": self.node_layers,
+                "indptr": self.indptr,
+                "indices": self.indices,
+                "weights": self.weights,
+            },
+            {"layers": self.layers, "is_directed": self.is_directed},
+        )
+
+    @classmethod
+    def load(cls, directory, mmap=True):
+        """
+        Load a graph saved by `save`.
+
+        Parameters
+        ----------
+        directory : str or pathlib.Path object
+            Path of the artifact directory.
+        mmap : bool
+            Whether to memory-map the (read-only) CSR arrays. Default is True.
+
+        Returns
+        -------
+        MultilayerGraph
+            The loaded graph.
+
+        Raises
+        ------
+        FileNotFoundError
+            If there is no saved graph at `directory`.
+        """
+        arrays, meta = load_artifact(directory, mmap)
+
+        return cls(
+            NodeVocabulary(arrays["node_bytes"], arrays["node_offsets"]),
+            meta["layers"],
+            arrays["node_layers"],
+            arrays["indptr"],
+            arrays["indices"],
+            arrays["weights"],
+            meta["is_directed"],
+        )
+
+    def to_networkx(self):
+        """
+        Convert the MultilayerGraph into a NetworkX graph.
+
+        Returns
+        -------
+        NetworkX (Di)Graph
+            Multilayer network in the format returned by
+            `utils.parse_multilayer_edgelist`.
+        """
+        G = nx.DiGraph() if self.is_directed else nx.Graph()
+        for node, layer in zip(self.nodes, self.node_layers):
+            G.add_node(node, layer=self.layers[layer])
+        src = self.arc_sources()
+        G.add_weighted_edges_from(
+            (self.nodes[u], self.nodes[v], w)
+            for u, v, w in zip(src.tolist(), self.indices.tolist(), self.weights)
+        )
+
+        return G
+
+    # ----------------------------------------------------------------------------------
+    # UPDATES
+    # ----------------------------------------------------------------------------------
+    def with_edge_updates(self, insert=(), delete=(), reweight=()):
+        """
+        Build a copy of the graph with a batch of edge changes applied. The graph
+        itself is not modified (its arrays may be memory-mapped read-only).
+
+        Node IDs are stable: existing nodes keep their IDs and nodes which only occur
+        in `insert` are appended with new IDs (and new layers with new layer IDs), so
+        node IDs of updated graphs are no longer in sorted order of the node tuples.
+        Neighbors remain sorted by ID. For undirected networks, (u, v) and (v, u) are
+        the same edge.
+
+        Parameters
+        ----------
+        insert : list of 3-tuples
+            Edges (u, v, weight) to insert, with u and v node tuples. Inserting an
+            existing edge sets its weight.
+        delete : list of 2-tuples
+            Existing edges (u, v) to delete.
+        reweight : list of 3-tuples
+            Existing edges (u, v, weight) to set a new weight for.
+
+        Returns
+        -------
+        MultilayerGraph
+            The updated graph.
+        """
+        nodes = list(self.nodes)
+        node_ids = dict(self.node_ids)
+        layers = list(self.layers)
+        layer_ids = {layer: i for i, layer in enumerate(layers)}
+        node_layers = [self.node_layers]
+        for u, v, _ in insert:
+            for node in (u, v):
+                if node not in node_ids:
+                    node_ids[node] = len(nodes)
+                    nodes.append(node)
+                    if node[1] not in layer_ids:
+                        layer_ids[node[1]] = len(layers)
+                        layers.append(node[1])
+                    node_layers.append(np.array([layer_ids[node[1]]], dtype=np.int32))
+        node_layers = np.concatenate(node_layers)
+        num_nodes = len(nodes)
+
+        def edge_arrays(edges, action):
+            try:
+                u = np.array([node_ids[edge[0]] for edge in edges], dtype=np.int64)
+                v = np.array([node_ids[edge[1]] for edge in edges], dtype=np.int64)
+            except KeyError as e:
+                raise ValueError(
+                    f"[ERROR] Cannot {action} edges of node {e.args[0]} which is not in"
+                    f" the network."
+                ) from e
+            w = np.array([edge[2] for edge in edges] if action != "delete" else [])
+            if not self.is_directed:
+                # Apply the change to the arcs in both directions
+                u, v = np.concatenate([u, v]), np.concatenate([v, u])
+                w = np.concatenate([w, w])
+            return u, v, w.astype(np.float64)
+
+        # Arcs of the current graph with keys over the new number of nodes
+        src = self.arc_sources().astype(np.int64)
+        dst = self.indices.astype(np.int64)
+        weights = np.array(self.weights, dtype=np.float64)
+        keys = src * num_nodes + dst
+
+        del_u, del_v, _ = edge_arrays(delete, "delete")
+        rew_u, rew_v, rew_w = edge_arrays(reweight, "reweight")
+        ins_u, ins_v, ins_w = edge_arrays(insert, "insert")
+
+        def positions(u, v, action):
+            pos = np.searchsorted(keys, u * num_nodes + v)
+            found = pos < len(keys)
+            found[found] = keys[pos[found]] == (u * num_nodes + v)[found]
+            if action != "insert" and not found.all():
+                i = np.flatnonzero(~found)[0]
+                raise ValueError(
+                    f"[ERROR] Cannot {action} edge ({nodes[u[i]]}, {nodes[v[i]]}) which"
+                    f" is not in the network."
+                )
+            return pos, found
+
+        keep = np.ones(len(keys), dtype=bool)
+        keep[positions(del_u, del_v, "delete")[0]] = False
+        weights[positions(rew_u, rew_v, "reweight")[0]] = rew_w
+        pos, found = positions(ins_u, ins_v, "insert")
+        weights[pos[found]] = ins_w[found]
+        keep[pos[found]] = True
+
+        # New arcs, deduplicated keeping the weight of the last occurrence
+        new_keys = (ins_u * num_nodes + ins_v)[~found]
+        new_keys, last = np.unique(new_keys[::-1], return_index=True)
+        new_w = ins_w[~found][::-1][last]
+        keys = np.concatenate([keys[keep], new_keys])
+        weights = np.concatenate([weights[keep], new_w])
+        order = np.argsort(keys, kind="stable")
+        keys, weights = keys[order], weights[order]
+
+        src, dst = keys // num_nodes, keys % num_nodes
+        indptr = np.zeros(num_nodes + 1, dtype=np.int64)
+        np.cumsum(np.bincount(src, minlength=num_nodes), out=indptr[1:])
+
+        return type(self)(
+            nodes, layers, node_layers, indptr, dst, weights, self.is_directed
+        )
+
+    # ----------------------------------------------------------------------------------
+    # QUERIES
+    # ----------------------------------------------------------------------------------
+    def number_of_nodes(self):
+        """
+        Returns
+        -------
+        int
+            Number of nodes in the network.
+        """
+        return len(self.indptr) - 1
+
+    def number_of_arcs(self):
+        """
+        Returns
+        -------
+        int
+            Number of stored arcs. Undirected edges count twice (self-loops once).
+        """
+        return len(self.indices)
+
+    def node_index(self, node):
+        """
+        Parameters
+        ----------
+        node : 2-tuple of strs
+            Node tuple, e.g., ('n1','l1').
+
+        Returns
+        -------
+        int
+            ID of `node`.
+        """
+        return self.node_ids[node]
+
+    def degree(self, node=None):
+        """
+        Parameters
+        ----------
+        node : int
+            Node ID. If None, the degrees of all nodes are returned. Default is None.
+
+        Returns
+        -------
+        int or np.array of ints
+            (Out-)degree of `node` or of all nodes.
+        """
+        if node is None:
+            return np.diff(self.indptr)
+        return int(self.indptr[node + 1] - self.indptr[node])
+
+    def neighbors(self, node):
+        """
+        Parameters
+        ----------
+        node : int
+            Node ID.
+
+        Returns
+        -------
+        np.array of ints
+            Sorted IDs of the (out-)neighbors of `node` (a view, do not modify).
+        """
+        return self.indices[self.indptr[node] : self.indptr[node + 1]]
+
+    def neighbor_weights(self, node):
+        """
+        Parameters
+        ----------
+        node : int
+            Node ID.
+
+        Returns
+        -------
+        np.array of floats
+            Weights of the edges to the neighbors of `node`, aligned with
+            `neighbors(node)` (a view, do not modify).
+        """
+        return self.weights[self.indptr[node] : self.indptr[node + 1]]
+
+    def arc_sources(self):
+        """
+        Returns
+        -------
+        np.array of ints
+            Source node ID of every arc, aligned with `indices`.
+        """
+        return np.repeat(
+            np.arange(self.number_of_nodes(), dtype=np.int32), np.diff(self.indptr)
+        )
+
+    def k_hop_neighborhood(self, nodes, k, reverse=False):
+        """
+        Nodes within `k` hops of `nodes`, including `nodes` themselves.
+
+        Parameters
+        ----------
+        nodes : np.array of ints
+            IDs of the nodes to start from.
+        k : int
+            Maximum number of hops.
+        reverse : bool
+            Whether to follow the arcs backwards, i.e., to find the nodes from which
+            `nodes` can be reached within `k` hops. Only differs from the forward
+            neighborhood for directed networks. Default is False.
+
+        Returns
+        -------
+        np.array of ints
+            Sorted IDs of the nodes in the neighborhood.
+        """
+        reached = np.zeros(self.number_of_nodes(), dtype=bool)
+        reached[np.asarray(nodes, dtype=np.int64)] = True
+        frontier = reached.copy()
+        src = self.arc_sources()
+        for _ in range(k):
+            if reverse:
+                nbrs = src[frontier[self.indices]]
+            else:
+                nbrs = self.indices[frontier[src]]
+            frontier = np.zeros_like(reached)
+            frontier[nbrs] = True
+            frontier &= ~reached
+            if not frontier.any():
+                break
+            reached |= frontier
+
+        return np.flatnonzero(reached)
+
+    def arc_source(self, arc):
+        """
+        Parameters
+        ----------
+        arc : int
+            Position of an arc in `indices`.
+
+        Returns
+        -------
+        int
+            Source node ID of `arc`.
+        """
+        return int(np.searchsorted(self.indptr, arc, side="right") - 1)
+
+    def arc_index(self, u, v):
+        """
+        Parameters
+        ----------
+        u : int
+            Source node ID.
+        v : int
+            Target node ID.
+
+        Returns
+        -------
+        int
+            Position of the arc (u, v) in `indices`, or -1 if there is no such arc.
+        """
+        start = self.indptr[u]
+        stop = self.indptr[u + 1]
+        pos = start + np.searchsorted(self.indices[start:stop], v)
+        if pos < stop and self.indices[pos] == v:
+            return int(pos)
+        return -1
+
+    def arc_indices(self, u, v):
+        """
+        Vectorized version of `arc_index`.
+
+        Parameters
+        ----------
+        u : np.array of ints
+            Source node IDs.
+        v : np.array of ints
+            Target node IDs.
+
+        Returns
+        -------
+        np.array of ints
+            Position of every arc (u, v) in `indices`, or -1 if there is no such arc.
+        """
+        num_nodes = self.number_of_nodes()
+        if self._arc_keys is None:
+            # Arcs are sorted by source and then by target, so the keys are sorted
+            self._arc_keys = (
+                self.arc_sources().astype(np.int64) * num_nodes + self.indices
+            )
+        keys = np.asarray(u, dtype=np.int64) * num_nodes + np.asarray(v)
+        pos = np.searchsorted(self._arc_keys, keys)
+        found = pos < len(self._arc_keys)
+        found[found] = self._arc_keys[pos[found]] == keys[found]
+        return np.where(found, pos, -1)
+
+    def has_edge(self, u, v):
+        """
+        Parameters
+        ----------
+        u : int
+            Source node ID.
+        v : int
+            Target node ID.
+
+        Returns
+        -------
+        bool
+            Whether there is an edge from `u` to `v`.
+        """
+        return self.arc_index(u, v) >= 0
+
+
+class NodeVocabulary(Sequence):
+    """
+    Read-only node vocabulary stored as two numpy arrays, which can be memory-mapped
+    instead of holding one tuple of two strs per node in memory.
+
+    The name and the layer tag of every node are concatenated as UTF-8 bytes into
+    `data`: the name of node `i` is `data[offsets[2 * i]:offsets[2 * i + 1]]` and its
+    tag is `data[offsets[2 * i + 1]:offsets[2 * i + 2]]`. The node tuples are only
+    decoded when they are accessed.
+
+    Attributes
+    ----------
+    data : np.array of uint8s
+        Concatenated UTF-8 bytes of the node names and tags.
+    offsets : np.array of ints
+        Start offset of every name and tag in `data`, followed by `len(data)`.
+    """
+
+    def __init__(self, data, offsets):
+        """
+        Constructor for the NodeVocabulary class. Use `from_nodes` to encode a list of
+        node tuples.
+
+        Parameters
+        ----------
+        data : np.array of uint8s
+            Concatenated UTF-8 bytes of the node names and tags.
+        offsets : np.array of ints
+            Start offset of every name and tag in `data`, followed by `len(data)`.
+        """
+        self.data = data
+        self.offsets = offsets
+
+    @classmethod
+    def from_nodes(cls, nodes):
+        """
+        Encode node tuples into a NodeVocabulary.
+
+        Parameters
+        ----------
+        nodes : iterable of 2-tuples of strs
+            Node vocabulary.
+
+        Returns
+        -------
+        NodeVocabulary
+            The encoded vocabulary.
+        """
+        if isinstance(nodes, NodeVocabulary):
+            return nodes
+        encoded = [part.encode("utf-8") for node in nodes for part in node]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(part) for part in encoded], out=offsets[1:])
+        data = np.frombuffer(b"".join(encoded), dtype=np.uint8)
+
+        return cls(data, offsets)
+
+    def __len__(self):
+        return (len(self.offsets) - 1) // 2
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError("[ERROR] Node ID out of range.")
+        start, middle, end = self.offsets[2 * i : 2 * i + 3].tolist()
+
+        return (
+            self.data[start:middle].tobytes().decode("utf-8"),
+            self.data[middle:end].tobytes().decode("utf-8"),
+        )
+
+    def __iter__(self):
+        # Decode the whole vocabulary at once instead of node by node
+        text = self.data.tobytes()
+        offsets = self.offsets.tolist()
+        for i in range(0, len(offsets) - 1, 2):
+            yield (
+                text[offsets[i] : offsets[i + 1]].decode("utf-8"),
+                text[offsets[i + 1] : offsets[i + 2]].decode("utf-8"),
+            )
+
+    def __eq__(self, other):
+        if not isinstance(other, Sequence) or isinstance(other, str):
+            return NotImplemented
+        return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+
+    __hash__ = None
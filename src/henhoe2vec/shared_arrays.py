@@ -0,0 +1,116 @@
+import sys
+from multiprocessing import shared_memory
+import numpy as np
+
+
+class SharedArrays:
+    """
+    A set of numpy arrays copied into `multiprocessing.shared_memory` blocks so that
+    worker processes can attach to them without pickling their contents.
+
+    The creating process owns the blocks and must call `close()` (or use the object as
+    a context manager) to release them. Worker processes attach with
+    `attach_shared_arrays(shared.spec)`. Arrays of the creating process stay valid
+    after `close()` as long as they are referenced, e.g., as the backing arrays of
+    alias tables built by worker processes; the memory of a block is released together
+    with the last of them.
+
+    Attributes
+    ----------
+    arrays : dict
+        The shared arrays, keyed by name. Writes are visible to all processes.
+    spec : dict
+        Picklable description of the shared blocks, keyed by array name.
+    """
+
+    def __init__(self, arrays):
+        """
+        Constructor for the SharedArrays class.
+
+        Parameters
+        ----------
+        arrays : dict
+            Numpy arrays to share, keyed by name.
+        """
+        self.arrays = {}
+        self.spec = {}
+        self._blocks = []
+        try:
+            for name, array in arrays.items():
+                array = np.ascontiguousarray(array)
+                # Shared memory blocks must not be empty
+                block = _SharedMemory(create=True, size=max(array.nbytes, 1))
+                self._blocks.append(block)
+                # Arrays from `np.frombuffer` hold a reference to the mapping of the
+                # block, so it is not unmapped while they are in use
+                shared = np.frombuffer(
+                    block.buf, dtype=array.dtype, count=array.size
+                ).reshape(array.shape)
+                shared[...] = array
+                self.arrays[name] = shared
+                self.spec[name] = (block.name, array.shape, array.dtype.str)
+        except Exception:
+            self.close()
+            raise
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        """
+        Release and remove all shared memory blocks. Arrays over the blocks which are
+        still referenced keep their memory until they are garbage collected.
+        """
+        self.arrays = {}
+        for block in self._blocks:
+            block.close()
+            block.unlink()
+        self._blocks = []
+
+
+class _SharedMemory(shared_memory.SharedMemory):
+    """
+    Shared memory block which can be closed while arrays over it are still in use.
+    """
+
+    def close(self):
+        try:
+            super().close()
+        except BufferError:
+            # Leave the mapping to the arrays which still use it. It is unmapped once
+            # they are garbage collected.
+            self._mmap = None
+            super().close()
+
+
+def attach_shared_arrays(spec):
+    """
+    Attach to shared arrays created by a SharedArrays object in another process.
+
+    Parameters
+    ----------
+    spec : dict
+        `SharedArrays.spec` of the shared arrays.
+
+    Returns
+    -------
+    arrays : dict
+        The shared arrays, keyed by name.
+    blocks : list of shared_memory.SharedMemory objects
+        The attached blocks. Keep a reference as long as the arrays are used.
+    """
+    arrays = {}
+    blocks = []
+    for name, (block_name, shape, dtype) in spec.items():
+        if sys.version_info >= (3, 13):
+            # Only the creating process may track (and unlink) the block
+            block = shared_memory.SharedMemory(name=block_name, track=False)
+        else:
+            block = shared_memory.SharedMemory(name=block_name)
+        blocks.append(block)
+        arrays[name] = np.ndarray(shape, dtype=np.dtype(dtype), buffer=block.buf)
+
+    return arrays, blocks
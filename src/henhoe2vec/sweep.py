@@ -0,0 +1,524 @@
+import argparse
+import json
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import product
+from pathlib import Path
+import numpy as np
+from . import utils
+from . import embeddings
+from .henhoe2vec import parse_switching_param
+from .henhoe2vec_walks import HenHoe2vec, SAMPLING_STRATEGIES
+from .multilayer_graph import MultilayerGraph
+from .walk_file import WalkFile
+from .instrumentation import Instrumentation, JsonLinesSink, NULL_INSTRUMENTATION
+
+# Sweep parameters by the artifact they determine, with the defaults of `run`
+TABLE_PARAMS = {"p": 1.0, "q": 0.5, "s": 1.0, "s_dict": []}
+WALK_PARAMS = {"walk_length": 20, "num_walks": 10}
+EMBEDDING_PARAMS = {"dims": 128, "window_size": 10, "epochs": 1}
+
+
+def plan_sweep(grid):
+    """
+    Expand a parameter grid into the execution plan of a sweep: a DAG in which every
+    set of alias tables depends on the (shared) graph, every set of walks on one set of
+    tables and every embedding configuration on one set of walks. Configurations which
+    share p, q and s share their tables, and configurations which additionally share
+    the walk parameters share their walks.
+
+    Parameters
+    ----------
+    grid : dict
+        Lists of values to sweep, keyed by parameter: "p", "q", "s" (floats or dicts,
+        see `henhoe2vec.run`), "s_dict" (layer-pair overrides of s in the form of the
+        --s_dict script argument, e.g., ["l1", "l2", 0.5]), "walk_length", "num_walks",
+        "dims", "window_size" and "epochs". Missing parameters take the defaults of
+        `henhoe2vec.run`. Scalars are treated as lists with one value.
+
+    Returns
+    -------
+    dict
+        The plan with the nodes of the DAG under "tables" (keyed by "tables_<i>", with
+        "p", "q" and "s"), "walks" (keyed by "walks_<i>", with their "tables",
+        "walk_length" and "num_walks") and "configs" (keyed by "config_<i>", with their
+        "walks", "dims", "window_size", "epochs" and all swept "params").
+    """
+    defaults = {**TABLE_PARAMS, **WALK_PARAMS, **EMBEDDING_PARAMS}
+    unknown = set(grid) - set(defaults)
+    if unknown:
+        raise ValueError(
+            f"[ERROR] Unknown sweep parameters {sorted(unknown)}. Should be any of"
+            f" {list(defaults)}."
+        )
+    values = {}
+    for name, default in defaults.items():
+        value = grid.get(name, [default])
+        # s_dict values are lists themselves
+        if name == "s_dict":
+            value = [value] if value and not isinstance(value[0], list) else value
+        elif not isinstance(value, list):
+            value = [value]
+        values[name] = value or [default]
+
+    plan = {"tables": {}, "walks": {}, "configs": {}}
+    table_ids = {}
+    walk_ids = {}
+    for combination in product(*values.values()):
+        params = dict(zip(values, combination))
+        s = _switching(params["s"], params["s_dict"])
+
+        table_key = json.dumps([params["p"], params["q"], _switching_key(s)])
+        if table_key not in table_ids:
+            table_ids[table_key] = f"tables_{len(table_ids)}"
+            plan["tables"][table_ids[table_key]] = {
+                "p": params["p"],
+                "q": params["q"],
+                "s": s,
+            }
+
+        walk_key = json.dumps([table_key, params["walk_length"], params["num_walks"]])
+        if walk_key not in walk_ids:
+            walk_ids[walk_key] = f"walks_{len(walk_ids)}"
+            plan["walks"][walk_ids[walk_key]] = {
+                "tables": table_ids[table_key],
+                **{name: params[name] for name in WALK_PARAMS},
+            }
+
+        plan["configs"][f"config_{len(plan['configs']):03d}"] = {
+            "walks": walk_ids[walk_key],
+            **{name: params[name] for name in EMBEDDING_PARAMS},
+            "params": params,
+        }
+
+    return plan
+
+
+def sweep(
+    input_csv,
+    output_dir,
+    grid,
+    sep="\t",
+    header=False,
+    is_directed=False,
+    edges_are_distance=False,
+    workers=8,
+    verbose=True,
+    sampling="alias",
+    degree_threshold=None,
+    max_table_bytes=None,
+    seed=None,
+    cache_dir=None,
+    output_format="csv",
+    instrumentation=None,
+):
+    """
+    Embed a network for every configuration of a parameter grid, sharing artifacts
+    between the configurations instead of calling `henhoe2vec.run` once per
+    configuration (see `plan_sweep`).
+
+    The graph is parsed once and cached, the alias tables are built once per (p, q, s)
+    and the walks are generated once per (p, q, s, walk parameters) into walk files
+    which all configurations with these parameters train on. Independent tasks run in
+    parallel processes within a budget of `workers` cores: every level of the plan
+    runs min(tasks, `workers`) tasks at a time and splits the cores evenly among them
+    (as worker processes for the walks and threads for word2vec).
+
+    For a given seed, the walks of every configuration are the same as the walks of
+    `henhoe2vec.run` with that seed.
+
+    Parameters
+    ----------
+    input_csv : str
+        Path to the multilayer edge list of the network to be embedded (csv file with
+        no index).
+    output_dir : str
+        Path of the output directory. The embeddings of every configuration are saved
+        to `output_dir`/config_<i>/, the walk files to `output_dir`/walks/ and the plan
+        and the parameters of every configuration to `output_dir`/sweep.json.
+    grid : dict
+        Lists of values to sweep, keyed by parameter (see `plan_sweep`).
+    sep : str
+        Delimiter of the input csv edge list. Default is "\\t".
+    header : bool
+        Whether the input csv edge list has a header. Default is False.
+    is_directed : bool
+        Whether the network is directed. Default is False.
+    edges_are_distance : bool
+        Whether edge weights indicate distance between nodes (opposed to
+        weight/similarity). Default is False.
+    workers : int
+        Number of cores shared by all tasks. Default is 8.
+    verbose : bool
+        Whether to print status messages. Default is True.
+    sampling : str
+        Strategy for sampling the steps of the random walks (see `henhoe2vec.run`).
+        Default is "alias".
+    degree_threshold : int
+        Maximum degree of the nodes whose transition tables are precomputed in "hybrid"
+        sampling (see `henhoe2vec.run`). Default is None.
+    max_table_bytes : int
+        Maximum total size of the transition tables in bytes in "hybrid" sampling (see
+        `henhoe2vec.run`). Default is None.
+    seed : int
+        Seed for the random walks. If None, a random seed is used. Default is None.
+    cache_dir : str
+        Directory of the binary cache of the parsed network and the transition tables,
+        through which the tasks share them. If None, `output_dir`/cache is used.
+        Default is None.
+    output_format : str
+        Format of the saved embeddings, "csv" or "npy" (see `henhoe2vec.run`).
+        Default is "csv".
+    instrumentation : Instrumentation
+        Receiver of a "stage" event per level of the plan and a "sweep_task" event per
+        task. If None, no events are emitted. Default is None.
+
+    Returns
+    -------
+    list of dicts
+        For every configuration: its "name", "params", "output_dir" and "walks_file".
+    """
+    if instrumentation is None:
+        instrumentation = NULL_INSTRUMENTATION
+    start = time.time()
+    output_dir = utils.clean_output_directory(output_dir)
+    cache_dir = output_dir.joinpath("cache") if cache_dir is None else Path(cache_dir)
+    walks_dir = output_dir.joinpath("walks")
+    walks_dir.mkdir(exist_ok=True)
+
+    plan = plan_sweep(grid)
+    if verbose:
+        print(
+            f"[STATUS] Sweep plan: 1 graph, {len(plan['tables'])} sets of transition"
+            f" tables, {len(plan['walks'])} sets of walks, {len(plan['configs'])}"
+            f" embedding configurations."
+        )
+    parse_args = {
+        "input_csv": str(input_csv),
+        "is_directed": is_directed,
+        "edges_are_distance": edges_are_distance,
+        "sep": sep,
+        "header": header,
+        "cache_dir": str(cache_dir),
+    }
+
+    # Parse the graph once into the cache, from which the tasks load it memory-mapped
+    with instrumentation.stage("parse_edgelist"):
+        _load_graph(parse_args)
+
+    # Build the tables of every (p, q, s) once and generate all walks which use them
+    walk_tasks = [
+        {
+            "graph": parse_args,
+            "tables": tables,
+            "sampling": sampling,
+            "degree_threshold": degree_threshold,
+            "max_table_bytes": max_table_bytes,
+            "seed": seed,
+            "walks": [
+                {**walks, "path": str(walks_dir.joinpath(f"{walks_id}.walks"))}
+                for walks_id, walks in plan["walks"].items()
+                if walks["tables"] == tables_id
+            ],
+        }
+        for tables_id, tables in plan["tables"].items()
+    ]
+    with instrumentation.stage("walks", tasks=len(walk_tasks)):
+        _run_tasks(
+            _walks_task, walk_tasks, workers, instrumentation, verbose, "walk set"
+        )
+
+    # Train every embedding configuration on its walks
+    results = []
+    train_tasks = []
+    for name, config in plan["configs"].items():
+        walks_file = walks_dir.joinpath(f"{config['walks']}.walks")
+        config_dir = output_dir.joinpath(name)
+        results.append(
+            {
+                "name": name,
+                "params": config["params"],
+                "output_dir": str(config_dir),
+                "walks_file": str(walks_file),
+            }
+        )
+        train_tasks.append(
+            {
+                "walks_file": str(walks_file),
+                "output_dir": str(config_dir),
+                "output_format": output_format,
+                **{param: config[param] for param in EMBEDDING_PARAMS},
+            }
+        )
+    with instrumentation.stage("train", tasks=len(train_tasks)):
+        _run_tasks(
+            _train_task, train_tasks, workers, instrumentation, verbose, "embedding"
+        )
+
+    with open(output_dir.joinpath("sweep.json"), "w") as f:
+        json.dump(
+            _jsonable({"grid": grid, "plan": plan, "configs": results}), f, indent=2
+        )
+
+    instrumentation.emit("sweep", seconds=time.time() - start, configs=len(results))
+    if verbose:
+        print(
+            f"[STATUS] Completed sweep of {len(results)} configurations in"
+            f" {round(time.time() - start, 1)} seconds. See results in {output_dir}."
+        )
+
+    return results
+
+
+def _run_tasks(task, specs, workers, instrumentation, verbose, task_desc):
+    """
+    Run tasks in min(tasks, `workers`) processes which split the `workers` cores
+    evenly, or in this process if only one task runs at a time.
+    """
+    concurrency = max(1, min(len(specs), workers))
+    for spec in specs:
+        spec["workers"] = max(1, workers // concurrency)
+
+    if concurrency == 1:
+        outcomes = map(task, specs)
+        pool = None
+    else:
+        pool = ProcessPoolExecutor(max_workers=concurrency)
+        outcomes = pool.map(task, specs)
+    try:
+        for i, seconds in enumerate(outcomes):
+            instrumentation.emit("sweep_task", task=task_desc, index=i, seconds=seconds)
+            if verbose:
+                print(
+                    f"[STATUS] Finished {task_desc} {i + 1}/{len(specs)} in"
+                    f" {round(seconds, 1)} seconds"
+                )
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+
+def _load_graph(graph):
+    return MultilayerGraph.from_edgelist(
+        graph["input_csv"],
+        graph["is_directed"],
+        graph["edges_are_distance"],
+        sep=graph["sep"],
+        header=graph["header"],
+        cache_dir=graph["cache_dir"],
+    )
+
+
+def _walks_task(spec):
+    """
+    Build (or load) the transition tables of one (p, q, s) and generate all walk sets
+    which use them into walk files.
+    """
+    start = time.perf_counter()
+    graph = spec["graph"]
+    tables = spec["tables"]
+    hh2v = HenHoe2vec(
+        _load_graph(graph),
+        graph["is_directed"],
+        tables["p"],
+        tables["q"],
+        tables["s"],
+        sampling=spec["sampling"],
+        degree_threshold=spec["degree_threshold"],
+        max_table_bytes=spec["max_table_bytes"],
+    )
+    hh2v.preprocess_transition_probs(spec["workers"], graph["cache_dir"])
+    for walks in spec["walks"]:
+        # The same seed as the walks of `run` with the seed
+        walk_seed = int(np.random.default_rng(spec["seed"]).integers(2**63))
+        hh2v.simulate_walks(
+            walks["num_walks"],
+            walks["walk_length"],
+            spec["workers"],
+            seed=walk_seed,
+            output_path=walks["path"],
+        )
+    hh2v.close()
+
+    return time.perf_counter() - start
+
+
+def _train_task(spec):
+    """
+    Learn and save the embeddings of one configuration from its walk file.
+    """
+    start = time.perf_counter()
+    embeddings.generate_embeddings(
+        WalkFile(spec["walks_file"]),
+        spec["output_dir"],
+        dimensions=spec["dims"],
+        window_size=spec["window_size"],
+        epochs=spec["epochs"],
+        workers=spec["workers"],
+        verbose=False,
+        output_format=spec["output_format"],
+    )
+
+    return time.perf_counter() - start
+
+
+def _switching(s, s_dict):
+    """
+    Switching parameters of a configuration as accepted by HenHoe2vec: a float `s`
+    with optional --s_dict style layer-pair overrides, or a dict as passed to `run`.
+    """
+    if isinstance(s, dict):
+        switching = dict(s)
+        overrides = (
+            parse_switching_param(None, list(map(str, s_dict))) if s_dict else {}
+        )
+        switching.update(overrides)
+        return switching
+    return parse_switching_param(s, list(map(str, s_dict)))
+
+
+def _switching_key(s):
+    """
+    JSON-serializable, order-independent key of switching parameters.
+    """
+    return sorted([str(pair), value] for pair, value in s.items())
+
+
+def _jsonable(value):
+    """
+    JSON-serializable copy of a plan or parameters, with the layer pairs of switching
+    parameter dicts as "layer1 layer2" keys.
+    """
+    if isinstance(value, dict):
+        return {
+            key if isinstance(key, str) else " ".join(map(str, key)): _jsonable(v)
+            for key, v in value.items()
+        }
+    if isinstance(value, (list, tuple)):
+        return [_jsonable(v) for v in value]
+    return value
+
+
+def parse_sweep_args(argv=None):
+    """
+    Parse arguments of the sweep subcommand.
+    """
+    parser = argparse.ArgumentParser(
+        prog="henhoe2vec sweep",
+        description=(
+            "Run HeNHoE-2vec for every combination of the given parameter values,"
+            " sharing the parsed network, transition tables and walks between them."
+        ),
+    )
+    parser.add_argument("--input", type=str, help="Path to the multilayer edge list.")
+    parser.add_argument("--output_dir", type=str, help="Path of the output directory.")
+    parser.add_argument("--sep", type=str, default="\t")
+    parser.add_argument("--header", action="store_true")
+    parser.add_argument("--is_directed", action="store_true")
+    parser.add_argument("--edges_are_distance", action="store_true")
+    parser.add_argument(
+        "--grid",
+        type=str,
+        default=None,
+        help=(
+            "Path of a JSON file with lists of values keyed by parameter (p, q, s,"
+            " s_dict, walk_length, num_walks, dimensions, window_size, epochs), e.g.,"
+            ' {"p": [0.5, 1], "s_dict": [[], ["l1", "l2", 0.5]]}. Values given'
+            " as arguments take precedence."
+        ),
+    )
+    for name, value_type in [
+        ("p", float),
+        ("q", float),
+        ("s", float),
+        ("walk_length", int),
+        ("num_walks", int),
+        ("dimensions", int),
+        ("window_size", int),
+        ("epochs", int),
+    ]:
+        parser.add_argument(
+            f"--{name}",
+            type=value_type,
+            nargs="+",
+            default=None,
+            help=f"Values of {name} to sweep.",
+        )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=8,
+        help="Number of cores shared by all tasks of the sweep. Default is 8.",
+    )
+    parser.add_argument(
+        "--sampling",
+        type=str,
+        choices=SAMPLING_STRATEGIES,
+        default="alias",
+    )
+    parser.add_argument("--degree_threshold", type=int, default=None)
+    parser.add_argument("--max_table_bytes", type=int, default=None)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--cache_dir", type=str, default=None)
+    parser.add_argument(
+        "--output_format", type=str, choices=embeddings.OUTPUT_FORMATS, default="csv"
+    )
+    parser.add_argument(
+        "--events_file",
+        type=str,
+        default=None,
+        help="Path of a JSON-lines file to which structured events are appended.",
+    )
+    parser.add_argument(
+        "--dry_run",
+        action="store_true",
+        help="Pass this argument to only print the execution plan.",
+    )
+
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_sweep_args(argv)
+    grid = {}
+    if args.grid is not None:
+        with open(args.grid) as f:
+            grid = json.load(f)
+    # The script argument --dimensions is the parameter dims
+    if "dimensions" in grid:
+        grid["dims"] = grid.pop("dimensions")
+    for name, param in [
+        ("p", "p"),
+        ("q", "q"),
+        ("s", "s"),
+        ("walk_length", "walk_length"),
+        ("num_walks", "num_walks"),
+        ("dimensions", "dims"),
+        ("window_size", "window_size"),
+        ("epochs", "epochs"),
+    ]:
+        if getattr(args, name) is not None:
+            grid[param] = getattr(args, name)
+
+    if args.dry_run:
+        print(json.dumps(_jsonable(plan_sweep(grid)), indent=2))
+        return
+
+    sinks = [] if args.events_file is None else [JsonLinesSink(args.events_file)]
+    sweep(
+        args.input,
+        args.output_dir,
+        grid,
+        sep=args.sep,
+        header=args.header,
+        is_directed=args.is_directed,
+        edges_are_distance=args.edges_are_distance,
+        workers=args.workers,
+        sampling=args.sampling,
+        degree_threshold=args.degree_threshold,
+        max_table_bytes=args.max_table_bytes,
+        seed=args.seed,
+        cache_dir=args.cache_dir,
+        output_format=args.output_format,
+        instrumentation=Instrumentation(sinks),
+    )
@@ -1,4 +1,6 @@
+import csv
 import networkx as nx
+import numpy as np
 import time
 import pandas as pd
 from pathlib import Path
@@ -37,41 +39,182 @@ def parse_multilayer_edgelist(
         Edges have an attribute 'weight'. If the edge attribute of the input graph is
         'distance', distances are converted to 'weights' through distance/1.
     """
+    nodes, src, dst, weights = read_multilayer_edgelist(
+        multiedgelist, edges_are_distance, sep=sep, header=header
+    )
+
     if directed:
         G = nx.DiGraph()
     else:
         G = nx.Graph()
+    G.add_nodes_from((node, {"layer": node[1]}) for node in nodes)
+    G.add_weighted_edges_from(
+        zip(
+            (nodes[i] for i in src.tolist()),
+            (nodes[i] for i in dst.tolist()),
+            weights.tolist(),
+        )
+    )
+
+    return G
+
+
+def read_multilayer_edgelist(
+    multiedgelist, edges_are_distance=False, sep="\t", header=False, chunksize=1 << 20
+):
+    """
+    Read a multilayer edge list into integer edge arrays over a sorted node vocabulary.
+
+    The file is read in chunks of `chunksize` lines with pandas. Node names and layer
+    names are factorized into integer codes chunk by chunk, so no Python objects are
+    created per edge.
+
+    Parameters
+    ----------
+    multiedgelist : str
+        Path to the multilayer edge list (csv file , no index). Consists of the columns
+        'source', 'source_layer', 'target', 'target_layer' and optionally 'weight'
+        (1 if missing).
+    edges_are_distance : bool
+        Whether edge weights indicate distance between nodes (opposed to
+        weight/similarity). If network is unweighted, set to False. Default is False.
+    sep : str
+        Delimiter used in the multilayer edge list .csv file. Default is '\\t'.
+    header : bool
+        Whether the multilayer edge list .csv file has a header row. Default is False.
+    chunksize : int
+        Number of lines read at once. Default is 1048576.
 
+    Returns
+    -------
+    nodes : list of 2-tuples of strs
+        Sorted node vocabulary. Nodes are tuples of the form ('n','l') where 'n' is the
+        name of the node and 'l' is the layer it belongs to.
+    src : np.array of ints
+        Source node ID (index in `nodes`) of every edge, in file order.
+    dst : np.array of ints
+        Target node ID of every edge.
+    weights : np.array of floats
+        Weight of every edge. Distances are converted to weights through 1/distance.
+    """
+    names = _Vocabulary()
+    layers = _Vocabulary()
+    columns = [[], [], [], []]
+    weights = []
+
+    # Lines with too many columns would be silently truncated by pandas, so check the
+    # first line like the line-based parser
     with open(multiedgelist) as IN:
-        for i, line in enumerate(IN):
-            # Skip header row
-            if header and i == 0:
-                continue
-
-            parts = line.strip().split(sep=sep)
-            if len(parts) == 5:
-                source, source_layer, target, target_layer, weight = parts
-            elif len(parts) == 4:
-                source, source_layer, target, target_layer = parts
-                weight = 1
-            else:
-                raise ValueError(
-                    f"[ERROR] mutliedgelist has too many columns: {len(parts)}. The"
-                    f" columns should be 'source', 'source_layer', 'target',"
-                    f" 'target_layer', 'weight'. Check that the multilayer edge list"
-                    f" does not have an index column."
-                )
-
-            if edges_are_distance:
-                weight = 1 / float(weight)
-            else:
-                weight = float(weight)
-
-            G.add_node((source, source_layer), layer=source_layer)
-            G.add_node((target, target_layer), layer=target_layer)
-            G.add_edge((source, source_layer), (target, target_layer), weight=weight)
+        first_line = IN.readline()
+    num_columns = len(first_line.strip().split(sep=sep))
+    if num_columns > 5:
+        raise ValueError(
+            f"[ERROR] mutliedgelist has too many columns: {num_columns}. The"
+            f" columns should be 'source', 'source_layer', 'target',"
+            f" 'target_layer', 'weight'. Check that the multilayer edge list"
+            f" does not have an index column."
+        )
 
-    return G
+    try:
+        reader = pd.read_csv(
+            multiedgelist,
+            sep=sep,
+            header=None,
+            skiprows=1 if header else 0,
+            names=range(5),
+            index_col=False,
+            dtype={0: str, 1: str, 2: str, 3: str, 4: np.float64},
+            keep_default_na=False,
+            # Lines with too few columns leave the target layer empty
+            na_values={3: [""], 4: [""]},
+            quoting=csv.QUOTE_NONE,
+            chunksize=chunksize,
+        )
+        with reader:
+            for chunk in reader:
+                if chunk[3].isna().any():
+                    raise ValueError(
+                        "[ERROR] mutliedgelist has too few columns. The columns should"
+                        " be 'source', 'source_layer', 'target', 'target_layer',"
+                        " 'weight'."
+                    )
+                columns[0].append(names.encode(chunk[0].to_numpy()))
+                columns[1].append(layers.encode(chunk[1].to_numpy()))
+                columns[2].append(names.encode(chunk[2].to_numpy()))
+                columns[3].append(layers.encode(chunk[3].to_numpy()))
+                weights.append(chunk[4].fillna(1.0).to_numpy(dtype=np.float64))
+    except pd.errors.EmptyDataError:
+        pass
+    except pd.errors.ParserError as e:
+        raise ValueError(
+            f"[ERROR] mutliedgelist has lines with too many columns. The columns should"
+            f" be 'source', 'source_layer', 'target', 'target_layer', 'weight'. ({e})"
+        ) from e
+
+    columns = [
+        np.concatenate(column) if column else np.empty(0, dtype=np.int64)
+        for column in columns
+    ]
+    weights = np.concatenate(weights) if weights else np.empty(0, dtype=np.float64)
+    if edges_are_distance:
+        weights = 1 / weights
+
+    # Nodes are (name, layer) pairs. Keys over the ranks of the names and layers sort
+    # like the node tuples.
+    name_ranks, sorted_names = names.sorted()
+    layer_ranks, sorted_layers = layers.sorted()
+    num_layers = max(len(sorted_layers), 1)
+    src = name_ranks[columns[0]] * num_layers + layer_ranks[columns[1]]
+    dst = name_ranks[columns[2]] * num_layers + layer_ranks[columns[3]]
+    keys, ids = np.unique(np.concatenate([src, dst]), return_inverse=True)
+    nodes = list(
+        zip(
+            sorted_names[keys // num_layers].tolist(),
+            sorted_layers[keys % num_layers].tolist(),
+        )
+    )
+
+    return nodes, ids[: len(src)], ids[len(src) :], weights
+
+
+class _Vocabulary:
+    """
+    Incrementally built mapping of strings to integer codes in order of first
+    occurrence.
+    """
+
+    def __init__(self):
+        self._index = pd.Index([], dtype=object)
+
+    def __len__(self):
+        return len(self._index)
+
+    def encode(self, values):
+        """
+        Codes of `values`, adding unseen values to the vocabulary.
+        """
+        codes, uniques = pd.factorize(values)
+        ids = self._index.get_indexer(uniques)
+        new = ids < 0
+        if new.any():
+            ids[new] = np.arange(len(self._index), len(self._index) + new.sum())
+            self._index = self._index.append(pd.Index(uniques[new], dtype=object))
+        return ids[codes].astype(np.int64)
+
+    def sorted(self):
+        """
+        Returns
+        -------
+        ranks : np.array of ints
+            Rank of every code in the sorted vocabulary.
+        values : np.array of strs
+            Sorted vocabulary.
+        """
+        values = self._index.to_numpy(dtype=object)
+        order = np.argsort(values, kind="stable")
+        ranks = np.empty(len(values), dtype=np.int64)
+        ranks[order] = np.arange(len(values))
+        return ranks, values[order]
 
 
 # --------------------------------------------------------------------------------------
@@ -0,0 +1,100 @@
+from .henhoe2vec_walks import WALK_CHUNK_SIZE
+
+
+class WalkCorpus:
+    """
+    A restartable corpus of random walks which generates the walks chunk by chunk
+    whenever it is iterated instead of keeping them in memory.
+
+    Every iteration regenerates the same walks from the same seed, so gensim's
+    `Word2Vec` can consume the corpus over multiple passes (`build_vocab` and every
+    training epoch) while peak memory only depends on the chunk size.
+
+    Attributes
+    ----------
+    hh2v : HenHoe2vec
+        HenHoe2vec object with preprocessed transition probabilities.
+    num_walks : int
+        Number of random walks to simulate for each node.
+    walk_length : int
+        Length of each random walk.
+    workers : int
+        Number of worker processes for generating the walks.
+    chunk_size : int
+        Number of walks per chunk.
+    seed : int
+        Seed of the walks, fixed for all iterations.
+    """
+
+    def __init__(
+        self,
+        hh2v,
+        num_walks,
+        walk_length,
+        workers=1,
+        chunk_size=WALK_CHUNK_SIZE,
+        seed=None,
+    ):
+        """
+        Constructor for the WalkCorpus class.
+
+        Parameters
+        ----------
+        hh2v : HenHoe2vec
+            HenHoe2vec object with preprocessed transition probabilities.
+        num_walks : int
+            Number of random walks to simulate for each node.
+        walk_length : int
+            Length of each random walk.
+        workers : int
+            Number of worker processes for generating the walks. Default is 1.
+        chunk_size : int
+            Number of walks per chunk. Default is 16384.
+        seed : int
+            Seed of the walks. If None, a seed is drawn from the generator of `hh2v`.
+            Default is None.
+        """
+        self.hh2v = hh2v
+        self.num_walks = num_walks
+        self.walk_length = walk_length
+        self.workers = workers
+        self.chunk_size = chunk_size
+        if seed is None:
+            seed = int(hh2v.rng.integers(2**63))
+        self.seed = seed
+        self._tokens = [str(node) for node in hh2v.N.nodes]
+
+    def __len__(self):
+        return self.num_walks * self.hh2v.N.number_of_nodes()
+
+    def __iter__(self):
+        """
+        Generate the walks.
+
+        Yields
+        ------
+        list of strs
+            A random walk as the names of its nodes (`str` of the node tuples), as
+            expected by gensim.
+        """
+        tokens = self._tokens
+        for walks in self.iter_chunks():
+            for walk in walks.tolist():
+                yield [tokens[node] for node in walk if node >= 0]
+
+    def iter_chunks(self):
+        """
+        Generate the walks as int32 matrices over node IDs, one per chunk.
+
+        Yields
+        ------
+        np.array of ints
+            Random walks of one chunk, padded with -1 after dead ends.
+        """
+        return self.hh2v.iter_walks(
+            self.num_walks,
+            self.walk_length,
+            self.workers,
+            self.chunk_size,
+            self.seed,
+        )
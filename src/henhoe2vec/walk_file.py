@@ -0,0 +1,163 @@
+import json
+import struct
+from pathlib import Path
+import numpy as np
+
+# Layout of a walk file:
+#   magic (8 bytes) | version (uint32) | header size (uint64) | JSON header | padding |
+#   int32 walk matrix (C order)
+# The JSON header holds the walk length, the node vocabulary and the parameters of the
+# walks. The walk matrix starts at a multiple of WALK_FILE_ALIGNMENT so that it can be
+# memory-mapped, and its number of rows follows from the file size.
+WALK_FILE_MAGIC = b"HH2VWALK"
+WALK_FILE_VERSION = 1
+WALK_FILE_ALIGNMENT = 64
+_PREFIX = struct.Struct("<8sIQ")
+
+
+def write_walk_file(path, chunks, walk_length, nodes, params=None):
+    """
+    Write random walks into a binary walk file, chunk by chunk.
+
+    Parameters
+    ----------
+    path : str or pathlib.Path object
+        Path of the walk file. An existing file is overwritten.
+    chunks : iterable of np.array of ints
+        Walk matrices over node IDs with `walk_length` columns, e.g., from
+        `HenHoe2vec.iter_walks`. Walks are padded with -1 after dead ends.
+    walk_length : int
+        Length of each random walk.
+    nodes : list of 2-tuples of strs
+        Node vocabulary which translates node IDs into (node, layer) tuples.
+    params : dict
+        JSON-serializable parameters of the walks. Default is None.
+
+    Returns
+    -------
+    int
+        Number of written walks.
+    """
+    header = json.dumps(
+        {
+            "walk_length": walk_length,
+            "nodes": [list(node) for node in nodes],
+            "params": params or {},
+        }
+    ).encode("utf-8")
+    data_offset = _PREFIX.size + len(header)
+    padding = -data_offset % WALK_FILE_ALIGNMENT
+
+    num_walks = 0
+    with open(path, "wb") as f:
+        f.write(_PREFIX.pack(WALK_FILE_MAGIC, WALK_FILE_VERSION, len(header)))
+        f.write(header)
+        f.write(b"\0" * padding)
+        for walks in chunks:
+            walks = np.ascontiguousarray(walks, dtype="<i4")
+            if walks.ndim != 2 or walks.shape[1] != walk_length:
+                raise ValueError(
+                    f"[ERROR] Walk chunks must have {walk_length} columns but have"
+                    f" shape {walks.shape}."
+                )
+            f.write(walks.tobytes())
+            num_walks += len(walks)
+
+    return num_walks
+
+
+class WalkFile:
+    """
+    Read-only view of a binary walk file written by `write_walk_file`. The walk matrix
+    is memory-mapped, so separate processes can read the same file without copies.
+
+    Iterating over a WalkFile yields the walks as lists of node names (`str` of the
+    node tuples), so it can be passed to gensim's `Word2Vec` (or
+    `embeddings.generate_embeddings`) directly and be iterated once per pass.
+
+    Attributes
+    ----------
+    path : pathlib.Path object
+        Path of the walk file.
+    walks : np.memmap of ints
+        Read-only int32 walk matrix over node IDs, padded with -1 after dead ends.
+    walk_length : int
+        Length of each random walk.
+    nodes : list of 2-tuples of strs
+        Node vocabulary which translates node IDs into (node, layer) tuples.
+    params : dict
+        Parameters of the walks.
+    """
+
+    def __init__(self, path):
+        """
+        Constructor for the WalkFile class.
+
+        Parameters
+        ----------
+        path : str or pathlib.Path object
+            Path of the walk file.
+        """
+        self.path = Path(path)
+        with open(self.path, "rb") as f:
+            prefix = f.read(_PREFIX.size)
+            if len(prefix) < _PREFIX.size:
+                raise ValueError(f"[ERROR] {self.path} is not a walk file.")
+            magic, version, header_size = _PREFIX.unpack(prefix)
+            if magic != WALK_FILE_MAGIC:
+                raise ValueError(f"[ERROR] {self.path} is not a walk file.")
+            if version != WALK_FILE_VERSION:
+                raise ValueError(
+                    f"[ERROR] Unsupported walk file version {version} in {self.path}."
+                )
+            header = json.loads(f.read(header_size).decode("utf-8"))
+
+        self.walk_length = header["walk_length"]
+        self.nodes = [tuple(node) for node in header["nodes"]]
+        self.params = header["params"]
+
+        data_offset = _PREFIX.size + header_size
+        data_offset += -data_offset % WALK_FILE_ALIGNMENT
+        row_size = 4 * self.walk_length
+        data_size = self.path.stat().st_size - data_offset
+        num_walks = data_size // row_size if row_size > 0 else 0
+        if num_walks == 0:
+            self.walks = np.empty((0, self.walk_length), dtype=np.int32)
+        else:
+            self.walks = np.memmap(
+                self.path,
+                dtype="<i4",
+                mode="r",
+                offset=data_offset,
+                shape=(num_walks, self.walk_length),
+            )
+        self._tokens = [str(node) for node in self.nodes]
+
+    def __len__(self):
+        return len(self.walks)
+
+    def __iter__(self):
+        """
+        Read the walks.
+
+        Yields
+        ------
+        list of strs
+            A random walk as the names of its nodes.
+        """
+        tokens = self._tokens
+        for walks in self.iter_chunks():
+            for walk in walks.tolist():
+                yield [tokens[node] for node in walk if node >= 0]
+
+    def iter_chunks(self, chunk_size=1 << 14):
+        """
+        Read the walk matrix in chunks of `chunk_size` walks.
+
+        Yields
+        ------
+        np.array of ints
+            Memory-mapped walks of one chunk.
+        """
+        for start in range(0, len(self.walks), chunk_size):
+            yield self.walks[start : start + chunk_size]
@@ -37,3 +37,126 @@ class TestAliasSampling:
 
         with pytest.raises(ValueError):
             J, q = alias_sampling.alias_setup(probs)
+
+    def test_alias_setup_batch_matches_alias_setup(self):
+        rng = np.random.default_rng(0)
+        sizes = rng.integers(0, 12, size=200)
+        offsets = np.concatenate([[0], np.cumsum(sizes)])
+        distributions = []
+        for size in sizes:
+            # Some zero probabilities and some uniform distributions
+            probs = rng.random(size) * (rng.random(size) < 0.8)
+            if size > 0 and probs.sum() == 0:
+                probs[0] = 1
+            if rng.random() < 0.1:
+                probs = np.ones(size)
+            distributions.append(probs / probs.sum() if size > 0 else probs)
+
+        J, q = alias_sampling.alias_setup_batch(
+            np.concatenate(distributions), offsets, use_numba=False
+        )
+
+        for r, probs in enumerate(distributions):
+            J_target, q_target = alias_sampling.alias_setup(probs)
+            start, stop = offsets[r], offsets[r + 1]
+            assert np.array_equal(J[start:stop], J_target)
+            assert np.allclose(q[start:stop], q_target)
+
+    def test_alias_setup_batch_ties(self):
+        # Integer weights make large outcomes end with q == 1 and tie with the
+        # deficits of the small outcomes
+        weights = np.array([4, 1, 3, 4, 2, 4], dtype=float)
+        J, q = alias_sampling.alias_setup_batch(
+            weights / weights.sum(), [0, 6], use_numba=False
+        )
+        J_target, q_target = alias_sampling.alias_setup(weights / weights.sum())
+        assert np.array_equal(J, J_target)
+        assert np.allclose(q, q_target)
+
+        rng = np.random.default_rng(0)
+        sizes = rng.integers(0, 15, size=500)
+        offsets = np.concatenate([[0], np.cumsum(sizes)])
+        distributions = []
+        for size in sizes:
+            weights = rng.integers(0, 5, size=size).astype(float)
+            if size > 0 and weights.sum() == 0:
+                weights[0] = 1
+            distributions.append(weights / weights.sum() if size > 0 else weights)
+
+        J, q = alias_sampling.alias_setup_batch(
+            np.concatenate(distributions), offsets, use_numba=False
+        )
+
+        for r, probs in enumerate(distributions):
+            J_target, q_target = alias_sampling.alias_setup(probs)
+            start, stop = offsets[r], offsets[r + 1]
+            assert np.array_equal(J[start:stop], J_target)
+            assert np.allclose(q[start:stop], q_target)
+            # The tables encode the distribution
+            if stop > start:
+                encoded = q[start:stop].copy()
+                np.add.at(encoded, J[start:stop], 1 - q[start:stop])
+                assert np.allclose(encoded / (stop - start), probs)
+
+    def test_alias_setup_rows_kernel(self):
+        probs = np.array([0.25, 0.3, 0.05, 0.4, 1.0, 0.5, 0.5])
+        offsets = np.array([0, 4, 4, 5, 7])
+        J = np.zeros(len(probs), dtype=int)
+        q = np.zeros(len(probs))
+
+        # Pure Python version of the (optionally Numba-compiled) kernel
+        alias_sampling._alias_setup_rows(probs, offsets, J, q)
+
+        assert np.array_equal(J, [0, 0, 3, 1, 0, 0, 0])
+        assert np.allclose(q, [1.0, 1.0, 0.2, 0.8, 1.0, 1.0, 1.0])
+
+    def test_alias_tables(self):
+        probs = [0.25, 0.3, 0.05, 0.4, 1.0]
+        offsets = [0, 4, 5]
+        J, q = alias_sampling.alias_setup_batch(probs, offsets)
+        tables = alias_sampling.AliasTables(J, q, offsets)
+
+        assert len(tables) == 2
+        J_0, q_0 = tables[0]
+        assert np.array_equal(J_0, [0, 0, 3, 1])
+        assert alias_sampling.alias_draw(*tables[1]) == 0
+
+    def test_alias_setup_batch_negative_prob_exception(self):
+        with pytest.raises(ValueError):
+            alias_sampling.alias_setup_batch([0.5, 0.7, -0.2], [0, 1, 3])
+
+    def test_alias_draw_batch_distribution(self):
+        probs = np.array([0.25, 0.3, 0.05, 0.4, 0.9, 0.1])
+        offsets = np.array([0, 4, 6])
+        J, q = alias_sampling.alias_setup_batch(probs, offsets)
+        rows = np.repeat([0, 1], 20000)
+
+        samples = alias_sampling.alias_draw_batch(
+            J, q, offsets, rows, np.random.default_rng(0)
+        )
+
+        freqs_0 = np.bincount(samples[rows == 0], minlength=4) / 20000
+        freqs_1 = np.bincount(samples[rows == 1], minlength=2) / 20000
+        assert np.allclose(freqs_0, probs[:4], atol=0.015)
+        assert np.allclose(freqs_1, probs[4:], atol=0.015)
+
+    def test_alias_draw_batch_reproducible(self):
+        J, q = alias_sampling.alias_setup_batch([0.2, 0.8, 0.5, 0.5], [0, 2, 4])
+        rows = np.array([0, 1, 1, 0, 1])
+
+        samples = [
+            alias_sampling.alias_draw_batch(
+                J, q, np.array([0, 2, 4]), rows, alias_sampling.RandomBuffer(42)
+            )
+            for _ in range(2)
+        ]
+
+        assert np.array_equal(samples[0], samples[1])
+
+    def test_random_buffer_stream(self):
+        # Refilling the buffer in blocks yields the same stream as the generator
+        buffer = alias_sampling.RandomBuffer(np.random.default_rng(7), buffer_size=5)
+        numbers = np.concatenate([buffer.random(3), buffer.random(4), buffer.random(9)])
+
+        assert np.array_equal(numbers, np.random.default_rng(7).random(16))
+        assert 0 <= buffer.random() < 1
@@ -0,0 +1,95 @@
+import os
+import numpy as np
+import pytest
+from henhoe2vec import embeddings
+from henhoe2vec.ann_index import IVFIndex, build_index, index_path
+from henhoe2vec.embedding_store import EmbeddingStore
+
+
+def prepare_embeddings(num_nodes=400, dims=16, num_clusters=10, seed=0):
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((num_clusters, dims))
+    vectors = centers[rng.integers(num_clusters, size=num_nodes)]
+    vectors = (vectors + 0.3 * rng.standard_normal((num_nodes, dims))).astype(
+        np.float32
+    )
+    nodes = [(f"n{i}", f"l{i % 3}") for i in range(num_nodes)]
+    return nodes, vectors
+
+
+def test_build():
+    nodes, vectors = prepare_embeddings()
+    index = IVFIndex.build(vectors, nodes, num_lists=8, seed=0)
+
+    assert index.num_lists == 8
+    assert index.layers == ["l0", "l1", "l2"]
+    # Every row is in exactly one bucket
+    assert (np.sort(index.rows) == np.arange(len(nodes))).all()
+    assert index.offsets[-1] == len(nodes)
+    # Buckets only hold rows of their layer
+    for bucket in range(len(index.offsets) - 1):
+        rows = index.rows[index.offsets[bucket] : index.offsets[bucket + 1]]
+        layer = index.layers[bucket % 3]
+        assert all(nodes[row][1] == layer for row in rows)
+
+
+def test_build_empty(tmp_path):
+    index = IVFIndex.build(np.empty((0, 16), dtype=np.float32), [], seed=0)
+
+    assert index.num_lists == 0
+    assert len(index.candidates(np.ones(16, dtype=np.float32))) == 0
+    index.save(tmp_path.joinpath("index"))
+    assert IVFIndex.load(tmp_path.joinpath("index")).num_lists == 0
+
+
+def test_candidates_n_probe():
+    nodes, vectors = prepare_embeddings()
+    index = IVFIndex.build(vectors, nodes, num_lists=8, seed=0)
+
+    with pytest.raises(ValueError):
+        index.candidates(vectors[0], n_probe=0)
+    # Probing more lists than there are searches all rows
+    assert len(index.candidates(vectors[0], n_probe=100)) == len(nodes)
+
+
+def test_search():
+    nodes, vectors = prepare_embeddings()
+    index = IVFIndex.build(vectors, nodes, num_lists=8, seed=0)
+    store = EmbeddingStore(vectors, nodes, index=index)
+    queries = vectors[:20]
+
+    exact, _ = store.top_k(queries, k=5)
+    # Probing all lists is exact
+    rows, _ = store.top_k(queries, k=5, n_probe=8)
+    assert (rows == exact).all()
+
+    rows, _ = store.top_k(queries, k=5, n_probe=2)
+    recall = np.mean([len(np.intersect1d(a, b)) / 5 for a, b in zip(rows, exact)])
+    assert recall > 0.8
+
+    similar = store.most_similar([("n1", "l1")], k=5, layer="l2", n_probe=3)[0]
+    assert len(similar) == 5
+    assert all(node[1] == "l2" for node, _ in similar)
+
+
+def test_build_index(tmp_path):
+    nodes = [("n1", "l1"), ("n2", "l1"), ("n3", "l2"), ("n4", "l2")]
+    walks = [[0, 1, 2, 3], [3, 2, 1, 0], [1, 3, 0, 2]]
+    embeddings.generate_embeddings(
+        walks, tmp_path, dimensions=8, window_size=3, nodes=nodes, output_format="npy"
+    )
+    build_index(tmp_path, num_lists=2, seed=0)
+    assert index_path(tmp_path).is_dir()
+
+    store = EmbeddingStore.open(tmp_path)
+    assert store.index is not None
+    assert store.index.num_lists == 2
+    assert len(store.most_similar([("n1", "l1")], k=3, n_probe=2)[0]) == 3
+
+    # An index of outdated embeddings is not used
+    embeddings.generate_embeddings(
+        walks, tmp_path, dimensions=8, window_size=3, nodes=nodes, output_format="npy"
+    )
+    mtime_ns = tmp_path.joinpath("embeddings.npy").stat().st_mtime_ns
+    os.utime(tmp_path.joinpath("embeddings.npy"), ns=(mtime_ns, mtime_ns + 10**9))
+    assert EmbeddingStore.open(tmp_path).index is None
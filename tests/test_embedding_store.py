@@ -0,0 +1,73 @@
+import numpy as np
+import pytest
+from henhoe2vec import embeddings
+from henhoe2vec.embedding_store import EmbeddingStore
+
+
+def prepare_store(num_nodes=50, dims=8, seed=0):
+    rng = np.random.default_rng(seed)
+    nodes = [(f"n{i}", f"l{i % 3}") for i in range(num_nodes)]
+    vectors = rng.standard_normal((num_nodes, dims)).astype(np.float32)
+    return EmbeddingStore(vectors, nodes), nodes, vectors
+
+
+def brute_force(vectors, query, candidates, k):
+    normalized = vectors / np.linalg.norm(vectors, axis=1)[:, None]
+    scores = normalized[candidates] @ (query / np.linalg.norm(query))
+    return candidates[np.argsort(-scores, kind="stable")[:k]]
+
+
+def test_lookup():
+    store, nodes, vectors = prepare_store()
+    assert len(store) == len(nodes)
+    assert store.row(("n7", "l1")) == 7
+    assert ("n7", "l1") in store
+    assert ("n7", "l2") not in store
+    assert (store.vector(("n7", "l1")) == vectors[7]).all()
+    assert (store.get_vectors([("n3", "l0"), ("n1", "l1")]) == vectors[[3, 1]]).all()
+    with pytest.raises(KeyError):
+        store.row(("n7", "l2"))
+
+
+def test_top_k():
+    store, nodes, vectors = prepare_store(num_nodes=200)
+    # Several chunks per query
+    store.QUERY_CHUNK_SIZE = 16
+    queries = vectors[[0, 5, 42]]
+    rows, scores = store.top_k(queries, k=5)
+    for query, query_rows in zip(queries, rows):
+        expected = brute_force(vectors, query, np.arange(len(nodes)), 5)
+        assert (query_rows == expected).all()
+    assert (np.diff(scores, axis=1) <= 0).all()
+
+    rows, _ = store.top_k(queries, k=5, layer="l2")
+    layer_rows = store.layer_rows("l2")
+    for query, query_rows in zip(queries, rows):
+        assert (query_rows == brute_force(vectors, query, layer_rows, 5)).all()
+
+
+def test_most_similar():
+    store, nodes, vectors = prepare_store()
+    (similar,) = store.most_similar([("n4", "l1")], k=3)
+    expected = brute_force(vectors, vectors[4], np.delete(np.arange(len(nodes)), 4), 3)
+    assert [node for node, _ in similar] == [nodes[row] for row in expected]
+
+    # Fewer candidates than k
+    (similar,) = store.most_similar([("n4", "l1")], k=100, layer="l0")
+    assert len(similar) == len(store.layer_rows("l0"))
+    assert all(node[1] == "l0" for node, _ in similar)
+
+
+def test_open(tmp_path):
+    nodes = [("n1", "l1"), ("n2", "l1"), ("n3", "l2"), ("n4", "l2")]
+    walks = [[0, 1, 2, 3], [3, 2, 1, 0], [1, 3, 0, 2]]
+    model = embeddings.generate_embeddings(
+        walks, tmp_path, dimensions=8, window_size=3, nodes=nodes, output_format="npy"
+    )
+
+    store = EmbeddingStore.open(tmp_path)
+    assert not store.vectors.flags.writeable
+    assert np.allclose(store.norms, np.linalg.norm(store.vectors, axis=1))
+    assert set(store.nodes) == set(nodes)
+    assert np.allclose(store.vector(("n3", "l2")), model.wv[str(("n3", "l2"))])
+    assert store.layers == ["l1", "l2"]
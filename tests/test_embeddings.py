@@ -1,3 +1,4 @@
+import numpy as np
 import pandas as pd
 from henhoe2vec import embeddings
 
@@ -25,3 +26,48 @@ def test_generate_embeddings(tmp_path):
         print(df)
         # NUM_NODES rows and DIMS+1 columns
         assert df.shape == (NUM_NODES, DIMS + 1)
+
+
+def test_update_embeddings(tmp_path):
+    walks = [[2, 4, 5, 6, 7], [5, 6, 2, 4, 5], [1, 9, 8, 5, 3]]
+    DIMS = 16
+    model = embeddings.generate_embeddings(
+        walks, tmp_path, dimensions=DIMS, window_size=3, save_model=True
+    )
+    vector = model.wv["9"].copy()
+
+    # Walks with a new node 10
+    new_walks = [[10, 9, 8, 5], [10, 2, 4]] * 100
+    updated_model = embeddings.update_embeddings(
+        tmp_path.joinpath("embeddings.model"), new_walks, tmp_path, epochs=5
+    )
+
+    assert "10" in updated_model.wv
+    assert not (updated_model.wv["9"] == vector).all()
+    df = pd.read_csv(tmp_path.joinpath("embeddings.csv"), sep="\t", header=None)
+    assert df.shape == (10, DIMS + 1)
+
+
+def test_generate_embeddings_npy(tmp_path):
+    nodes = [("n1", "l1"), ("n2", "l1"), ("n3", "l2"), ("n4", "l2")]
+    walks = [[0, 1, 2, 3], [3, 2, 1, 0], [1, 3, 0, 2]]
+    DIMS = 16
+    model = embeddings.generate_embeddings(
+        walks,
+        tmp_path,
+        dimensions=DIMS,
+        window_size=3,
+        nodes=nodes,
+        output_format="npy",
+    )
+
+    # No text files are written
+    assert len(list(tmp_path.glob("*.csv"))) == 0
+    assert len(list(tmp_path.glob("*.emb"))) == 0
+
+    loaded_nodes, vectors = embeddings.load_embeddings(tmp_path)
+    assert isinstance(vectors, np.memmap)
+    assert vectors.shape == (4, DIMS)
+    assert sorted(loaded_nodes) == nodes
+    for node, vector in zip(loaded_nodes, vectors):
+        assert np.array_equal(vector, model.wv[str(node)])
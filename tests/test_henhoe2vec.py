@@ -65,3 +65,125 @@ class TestHenHoe2vec:
             print(df)
             # NUM_NODES rows and DIMS+1 columns
             assert df.shape == (NUM_NODES, DIMS + 1)
+
+    def test_henhoe2vec_walks_file(self, tmp_path, capsys):
+        test_data = {
+            "source": ["n1", "n2", "n3", "n1"],
+            "source_layer": ["l1", "l1", "l2", "l2"],
+            "target": ["n2", "n3", "n1", "n2"],
+            "target_layer": ["l1", "l2", "l1", "l2"],
+            "weight": [1, 0.5, 0.2, 1.1],
+        }
+        df = pd.DataFrame.from_dict(test_data)
+        edgelist_path = helpers_testing.save_test_edgelist(
+            df, tmp_path, sep="\t", header=False
+        )
+        walks_file = tmp_path.joinpath("walks.bin")
+
+        for dims in [8, 16]:
+            henhoe2vec.run(
+                edgelist_path,
+                tmp_path.joinpath(f"output_{dims}/"),
+                dims=dims,
+                walk_length=10,
+                num_walks=5,
+                workers=1,
+                seed=1,
+                walks_file=walks_file,
+            )
+        # The walks of the first run are reused by the second run
+        assert capsys.readouterr().out.count("Reusing random walks") == 1
+
+        df = pd.read_csv(
+            tmp_path.joinpath("output_16/embeddings.csv"), sep="\t", header=None
+        )
+        assert df.shape == (5, 16 + 1)
+
+        # A changed edge weight on the same nodes invalidates the walks
+        df = pd.DataFrame.from_dict(test_data)
+        df.loc[0, "weight"] = 3
+        edgelist_path = helpers_testing.save_test_edgelist(
+            df, tmp_path, sep="\t", header=False
+        )
+        henhoe2vec.run(
+            edgelist_path,
+            tmp_path.joinpath("output_changed/"),
+            dims=8,
+            walk_length=10,
+            num_walks=5,
+            workers=1,
+            seed=1,
+            walks_file=walks_file,
+        )
+        assert "Reusing random walks" not in capsys.readouterr().out
+
+    def test_henhoe2vec_lazy_cache_stats(self, tmp_path, capsys):
+        test_data = {
+            "source": ["n1", "n2", "n3", "n1"],
+            "source_layer": ["l1", "l1", "l2", "l2"],
+            "target": ["n2", "n3", "n1", "n2"],
+            "target_layer": ["l1", "l2", "l1", "l2"],
+            "weight": [1, 0.5, 0.2, 1.1],
+        }
+        edgelist_path = helpers_testing.save_test_edgelist(
+            pd.DataFrame.from_dict(test_data), tmp_path, sep="\t", header=False
+        )
+
+        for workers in [1, 2]:
+            henhoe2vec.run(
+                edgelist_path,
+                tmp_path.joinpath(f"output_{workers}/"),
+                dims=8,
+                walk_length=10,
+                num_walks=5,
+                workers=workers,
+                sampling="lazy",
+            )
+            out = capsys.readouterr().out
+            # The caches of worker processes are not visible to the parent process
+            assert ("Transition table cache" in out) == (workers == 1)
+
+    def test_refresh(self, tmp_path):
+        test_data = {
+            "source": ["n1", "n2", "n3", "n4", "n5", "n6"],
+            "source_layer": ["l1", "l1", "l1", "l1", "l2", "l2"],
+            "target": ["n2", "n3", "n4", "n5", "n6", "n7"],
+            "target_layer": ["l1", "l1", "l1", "l2", "l2", "l2"],
+            "weight": [1, 1, 1, 1, 1, 1],
+        }
+        df = pd.DataFrame.from_dict(test_data)
+        edgelist_path = helpers_testing.save_test_edgelist(
+            df, tmp_path, sep="\t", header=False
+        )
+        output_path = tmp_path.joinpath("output/")
+        henhoe2vec.run(
+            edgelist_path,
+            output_path,
+            dims=8,
+            walk_length=5,
+            num_walks=2,
+            workers=1,
+            save_model=True,
+        )
+
+        N = henhoe2vec.MultilayerGraph.from_edgelist(edgelist_path, False)
+        hh2v = henhoe2vec.henhoe2vec_walks.HenHoe2vec(N, False, 1, 0.5, 1)
+        hh2v.preprocess_transition_probs()
+        changes = hh2v.update_edges(insert=[(("n7", "l2"), ("n8", "l2"), 1)])
+        report = henhoe2vec.refresh(
+            hh2v,
+            changes,
+            output_path.joinpath("embeddings.model"),
+            output_path,
+            hops=1,
+            walk_length=5,
+            num_walks=2,
+            workers=1,
+        )
+
+        # Walks only start from n6, n7 and the new node n8
+        assert report["start_nodes"] == 3
+        assert report["walks"] == 2 * 3
+        assert report["full_walks"] == 2 * 8
+        df = pd.read_csv(output_path.joinpath("embeddings.csv"), sep="\t", header=None)
+        assert df.shape == (8, 8 + 1)
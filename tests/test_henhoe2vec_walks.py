@@ -1,5 +1,6 @@
 import networkx as nx
 import numpy as np
+import pytest
 from henhoe2vec import henhoe2vec_walks, alias_sampling
 
 
@@ -20,6 +21,26 @@ def prepare_test_network():
     return N
 
 
+def alias_to_probs(J, q):
+    """
+    Recover the discrete probability distribution encoded by an alias table.
+    """
+    K = len(J)
+    probs = np.array(q, dtype=float)
+    np.add.at(probs, J, 1 - probs)
+    return probs / K
+
+
+def assert_frequencies(observed, probs):
+    """
+    Assert that the observed counts of a sample match the probabilities `probs` up to
+    five binomial standard deviations per outcome.
+    """
+    n = observed.sum()
+    tolerance = 5 * np.sqrt(probs * (1 - probs) / n) + 1e-9
+    assert np.all(np.abs(observed / n - probs) <= tolerance)
+
+
 class TestHenHoe2vecWalks:
     def test_preprocess_transition_probabilities(self):
         # Test network
@@ -51,17 +72,23 @@ class TestHenHoe2vecWalks:
             (("n4", "l2"), ("n3", "l2")): [5 / 9, 2 / 9, 2 / 9],
         }
 
-        # Get alias and probability tables
+        # Get alias and probability tables (keyed by node IDs and arcs)
+        node_ids = hh2v.N.node_ids
         target_node_trans_alias = {}
         for node, probs in target_node_trans_probs.items():
-            target_node_trans_alias[node] = alias_sampling.alias_setup(probs)
+            target_node_trans_alias[node_ids[node]] = alias_sampling.alias_setup(probs)
         target_edge_trans_alias = {}
         for edge, probs in target_edge_trans_probs.items():
+            edge = hh2v.N.arc_index(node_ids[edge[0]], node_ids[edge[1]])
             target_edge_trans_alias[edge] = alias_sampling.alias_setup(probs)
 
         # Assetions
-        assert target_node_trans_alias.keys() == hh2v.transition_probs_nodes.keys()
-        assert target_edge_trans_alias.keys() == hh2v.transition_probs_edges.keys()
+        assert target_node_trans_alias.keys() == set(
+            range(len(hh2v.transition_probs_nodes))
+        )
+        assert target_edge_trans_alias.keys() == set(
+            range(len(hh2v.transition_probs_edges))
+        )
 
         # Assert that alias and probability tables are correct
         for key in target_node_trans_alias.keys():
@@ -95,3 +122,528 @@ class TestHenHoe2vecWalks:
 
         assert len(walks) == 5 * N.number_of_nodes()
         assert len(walks[0]) == 10
+
+    def test_lazy_transition_probabilities(self):
+        N = prepare_test_network()
+        p = 1
+        q = 0.5
+        s = {("l1", "l2"): 0.5, ("l2", "l1"): 1}
+        hh2v_alias = henhoe2vec_walks.HenHoe2vec(N, is_directed=False, p=p, q=q, s=s)
+        hh2v_alias.preprocess_transition_probs()
+        # Cache can hold at most 3 of the 8 edge transition tables
+        hh2v_lazy = henhoe2vec_walks.HenHoe2vec(
+            N, is_directed=False, p=p, q=q, s=s, sampling="lazy", cache_max_entries=3
+        )
+        hh2v_lazy.preprocess_transition_probs()
+
+        assert len(hh2v_lazy.transition_probs_edges) == 0
+
+        walks = hh2v_lazy.simulate_walks(num_walks=5, walk_length=10)
+        assert len(walks) == 5 * N.number_of_nodes()
+
+        # Lazily computed tables equal the precomputed ones
+        for arc in range(len(hh2v_alias.transition_probs_edges)):
+            J_target, q_target = hh2v_alias.transition_probs_edges[arc]
+            J, q = hh2v_lazy.transition_probs_edges[arc]
+            assert np.array_equal(J, J_target)
+            assert np.array_equal(q, q_target)
+
+        stats = hh2v_lazy.transition_probs_edges.stats()
+        assert stats["entries"] == 3
+        assert stats["evictions"] > 0
+        assert stats["hits"] + stats["misses"] == 5 * 4 * 8 + 8
+
+    def test_rejection_sampling_distribution(self):
+        N = prepare_test_network()
+        p = 2
+        q = 0.5
+        s = {("l1", "l2"): 0.5, ("l2", "l1"): 1}
+        hh2v_alias = henhoe2vec_walks.HenHoe2vec(N, is_directed=False, p=p, q=q, s=s)
+        hh2v_alias.preprocess_transition_probs()
+        hh2v = henhoe2vec_walks.HenHoe2vec(
+            N, is_directed=False, p=p, q=q, s=s, sampling="rejection", seed=0
+        )
+        hh2v.preprocess_transition_probs()
+
+        assert len(hh2v.transition_probs_edges) == 0
+
+        # Frequencies of rejection samples against the exact second-order transition
+        # probabilities of every (previous, current) pair
+        num_samples = 5000
+        for arc, previous in enumerate(hh2v.N.arc_sources()):
+            current = hh2v.N.indices[arc]
+            J, q = hh2v_alias.transition_probs_edges[arc]
+            expected = alias_to_probs(J, q)
+            samples = [
+                hh2v.rejection_draw(previous, current) for _ in range(num_samples)
+            ]
+            observed = np.bincount(samples, minlength=len(J))
+            if len(J) > 1:
+                assert_frequencies(observed, expected)
+
+        walks = hh2v.simulate_walks(num_walks=5, walk_length=10)
+        assert len(walks) == 5 * N.number_of_nodes()
+        assert len(walks[0]) == 10
+
+    def test_vectorized_walks_distribution(self):
+        N = prepare_test_network()
+        p = 2
+        q = 0.5
+        s = {("l1", "l2"): 0.5, ("l2", "l1"): 1}
+        hh2v_alias = henhoe2vec_walks.HenHoe2vec(N, is_directed=False, p=p, q=q, s=s)
+        hh2v_alias.preprocess_transition_probs()
+        arc_sources = hh2v_alias.N.arc_sources()
+
+        for sampling in ["alias", "rejection", "hybrid"]:
+            # n3 is a hub in "hybrid" sampling
+            hh2v = henhoe2vec_walks.HenHoe2vec(
+                N,
+                is_directed=False,
+                p=p,
+                q=q,
+                s=s,
+                sampling=sampling,
+                degree_threshold=2,
+                seed=1,
+            )
+            hh2v.preprocess_transition_probs()
+            walks = hh2v.simulate_walks_from(np.repeat(np.arange(4), 5000), 3)
+
+            # Frequencies of the third step of the walks against the exact second-order
+            # transition probabilities
+            for arc, previous in enumerate(arc_sources):
+                current = hh2v.N.indices[arc]
+                J, q_table = hh2v_alias.transition_probs_edges[arc]
+                if len(J) < 2:
+                    continue
+                steps = walks[(walks[:, 0] == previous) & (walks[:, 1] == current), 2]
+                observed = np.bincount(
+                    np.searchsorted(hh2v.N.neighbors(current), steps),
+                    minlength=len(J),
+                )
+                assert_frequencies(observed, alias_to_probs(J, q_table))
+
+    def test_vectorized_walks_dead_ends(self):
+        # n1 -> n2 -> n3, n3 has no outgoing edges
+        N = nx.DiGraph()
+        N.add_nodes_from([("n1", "l1"), ("n2", "l1"), ("n3", "l1")], layer="l1")
+        N.add_edge(("n1", "l1"), ("n2", "l1"), weight=1)
+        N.add_edge(("n2", "l1"), ("n3", "l1"), weight=1)
+        hh2v = henhoe2vec_walks.HenHoe2vec(N, is_directed=True, p=1, q=1, s=1)
+        hh2v.preprocess_transition_probs()
+
+        walks = hh2v.simulate_walks(num_walks=2, walk_length=5)
+
+        assert walks.shape == (6, 5)
+        assert walks.dtype == np.int32
+        for walk in walks.tolist():
+            start = walk[0]
+            assert walk == list(range(start, 3)) + [-1] * (2 + start)
+
+    def test_walks_reproducible(self):
+        N = prepare_test_network()
+        walks = []
+        for _ in range(2):
+            hh2v = henhoe2vec_walks.HenHoe2vec(
+                N, is_directed=False, p=1, q=0.5, s=1, seed=3
+            )
+            hh2v.preprocess_transition_probs()
+            walks.append(hh2v.simulate_walks(num_walks=3, walk_length=6))
+
+        assert np.array_equal(walks[0], walks[1])
+
+    def test_walks_independent_of_workers(self):
+        N = prepare_test_network()
+        s = {("l1", "l2"): 0.5, ("l2", "l1"): 1}
+        for sampling in ["alias", "lazy", "rejection", "hybrid"]:
+            walks = []
+            for workers in [1, 2]:
+                hh2v = henhoe2vec_walks.HenHoe2vec(
+                    N,
+                    is_directed=False,
+                    p=2,
+                    q=0.5,
+                    s=s,
+                    sampling=sampling,
+                    degree_threshold=2,
+                    seed=5,
+                )
+                hh2v.preprocess_transition_probs()
+                walks.append(
+                    hh2v.simulate_walks(
+                        num_walks=10, walk_length=8, workers=workers, chunk_size=7
+                    )
+                )
+
+            assert walks[0].shape == (10 * N.number_of_nodes(), 8)
+            assert np.array_equal(walks[0], walks[1])
+
+    def test_worker_pool_reuse(self):
+        N = prepare_test_network()
+        hh2v = henhoe2vec_walks.HenHoe2vec(N, is_directed=False, p=2, q=0.5, s=1)
+        hh2v.preprocess_transition_probs()
+
+        def simulate(workers):
+            return hh2v.simulate_walks(10, 8, workers, chunk_size=7, seed=3)
+
+        walks = simulate(2)
+        pool, shared = hh2v._pool, hh2v._shared
+        # Later walks reuse the worker processes and the shared memory
+        assert np.array_equal(simulate(2), walks)
+        assert hh2v._pool is pool and hh2v._shared is shared
+
+        # Changed tables are shared again
+        hh2v.set_switching_params(0.5)
+        assert hh2v._pool is None
+        assert np.array_equal(simulate(2), simulate(1))
+        assert hh2v._pool is not pool
+
+        hh2v.close()
+        assert hh2v._pool is None and hh2v._shared is None
+
+    def test_preprocess_independent_of_workers(self):
+        N = prepare_test_network()
+        s = {("l1", "l2"): 0.5, ("l2", "l1"): 1}
+        tables = []
+        for workers in [1, 2]:
+            hh2v = henhoe2vec_walks.HenHoe2vec(N, is_directed=True, p=2, q=0.5, s=s)
+            hh2v.preprocess_transition_probs(workers=workers)
+            tables.append((hh2v.transition_probs_nodes, hh2v.transition_probs_edges))
+
+        for serial, parallel in zip(*tables):
+            assert np.array_equal(serial.offsets, parallel.offsets)
+            assert np.array_equal(serial.J, parallel.J)
+            assert np.allclose(serial.q, parallel.q)
+
+    def test_parallel_tables_in_shared_memory(self):
+        N = prepare_test_network()
+        hh2v = henhoe2vec_walks.HenHoe2vec(N, is_directed=False, p=2, q=0.5, s=1)
+        hh2v.preprocess_transition_probs(workers=2)
+        shared, pool = hh2v._shared, hh2v._pool
+
+        # The tables are the shared flat tables which the workers wrote into, and the
+        # walks reuse them and the workers
+        assert hh2v.transition_probs_edges.J is shared.arrays["edges_J"]
+        walks = hh2v.simulate_walks(10, 8, 2, chunk_size=7, seed=3)
+        assert hh2v._shared is shared and hh2v._pool is pool
+        assert np.array_equal(
+            walks, hh2v.simulate_walks(10, 8, 1, chunk_size=7, seed=3)
+        )
+
+        # The tables stay usable after the shared memory is released
+        J = hh2v.transition_probs_edges.J.copy()
+        hh2v.close()
+        assert np.array_equal(hh2v.transition_probs_edges.J, J)
+        assert np.array_equal(
+            walks, hh2v.simulate_walks(10, 8, 2, chunk_size=7, seed=3)
+        )
+
+    def test_transition_probs_cache(self, tmp_path):
+        N = prepare_test_network()
+        s = {("l1", "l2"): 0.5, ("l2", "l1"): 1}
+        hh2v = henhoe2vec_walks.HenHoe2vec(N, is_directed=False, p=2, q=0.5, s=s)
+        hh2v.preprocess_transition_probs(cache_dir=tmp_path)
+        assert len(list(tmp_path.joinpath("transition_probs").iterdir())) == 1
+
+        hh2v_cached = henhoe2vec_walks.HenHoe2vec(N, is_directed=False, p=2, q=0.5, s=s)
+        hh2v_cached.preprocess_transition_probs(cache_dir=tmp_path)
+        # Memory-mapped from the cache
+        assert not hh2v_cached.transition_probs_edges.J.flags.writeable
+        for kind in ["nodes", "edges"]:
+            tables = getattr(hh2v, f"transition_probs_{kind}")
+            tables_cached = getattr(hh2v_cached, f"transition_probs_{kind}")
+            assert np.array_equal(tables.J, tables_cached.J)
+            assert np.array_equal(tables.q, tables_cached.q)
+
+        # Other parameters are cached separately
+        hh2v_other = henhoe2vec_walks.HenHoe2vec(N, is_directed=False, p=1, q=0.5, s=s)
+        hh2v_other.preprocess_transition_probs(cache_dir=tmp_path)
+        assert len(list(tmp_path.joinpath("transition_probs").iterdir())) == 2
+
+        with pytest.raises(ValueError):
+            hh2v_other.load_transition_probs(
+                tmp_path.joinpath("transition_probs", hh2v.transition_probs_key())
+            )
+
+    def test_update_edges(self):
+        N = prepare_test_network()
+        N.add_edge(("n2", "l1"), ("n4", "l2"), weight=0.3)
+        s = {("l1", "l2"): 0.5, ("l2", "l1"): 2, "default": 1}
+        insert = [(("n4", "l2"), ("n5", "l3"), 0.7), (("n1", "l1"), ("n4", "l2"), 0.1)]
+        delete = [(("n3", "l2"), ("n2", "l1"))]
+        reweight = [(("n3", "l2"), ("n4", "l2"), 0.9)]
+        for sampling in ["alias", "lazy", "rejection", "hybrid"]:
+            hh2v = henhoe2vec_walks.HenHoe2vec(
+                N,
+                is_directed=False,
+                p=2,
+                q=0.5,
+                s=s,
+                sampling=sampling,
+                degree_threshold=2,
+            )
+            hh2v.preprocess_transition_probs()
+            if sampling == "lazy":
+                for arc in range(hh2v.N.number_of_arcs()):
+                    hh2v.transition_probs_edges[arc]
+
+            report = hh2v.update_edges(insert, delete, reweight)
+
+            # New nodes are appended
+            assert hh2v.N.nodes[-1] == ("n5", "l3")
+            assert report["new_nodes"].tolist() == [4]
+            assert report["changed_nodes"].tolist() == [0, 1, 2, 3]
+            # Tables equal those of a full preprocessing of the updated network
+            hh2v_full = henhoe2vec_walks.HenHoe2vec(
+                hh2v.N,
+                is_directed=False,
+                p=2,
+                q=0.5,
+                s=s,
+                sampling=sampling,
+                degree_threshold=2,
+            )
+            hh2v_full.preprocess_transition_probs()
+            for node in range(5):
+                J, q = hh2v.transition_probs_nodes[node]
+                J_full, q_full = hh2v_full.transition_probs_nodes[node]
+                assert np.array_equal(J, J_full)
+                assert np.allclose(q, q_full)
+            if sampling == "rejection":
+                continue
+            for arc in range(hh2v.N.number_of_arcs()):
+                J, q = hh2v.transition_probs_edges[arc]
+                J_full, q_full = hh2v_full.transition_probs_edges[arc]
+                assert np.array_equal(J, J_full)
+                assert np.allclose(q, q_full)
+
+    def test_update_edges_unknown_edge(self):
+        hh2v = henhoe2vec_walks.HenHoe2vec(
+            prepare_test_network(), is_directed=False, p=1, q=1, s=1
+        )
+        hh2v.preprocess_transition_probs()
+
+        with pytest.raises(ValueError):
+            hh2v.update_edges(delete=[(("n1", "l1"), ("n4", "l2"))])
+        with pytest.raises(ValueError):
+            hh2v.update_edges(reweight=[(("n1", "l1"), ("n9", "l2"), 1)])
+
+    def test_set_switching_params(self):
+        N = prepare_test_network()
+        N.add_edge(("n2", "l1"), ("n5", "l3"), weight=0.3)
+        N.add_edge(("n4", "l2"), ("n5", "l3"), weight=0.6)
+        s = {("l1", "l2"): 0.5, ("l2", "l1"): 2, "default": 1}
+        s_new = {("l1", "l3"): 4, ("l2", "l1"): 0.25, "default": 3}
+        for sampling in ["alias", "lazy", "rejection"]:
+            hh2v = henhoe2vec_walks.HenHoe2vec(
+                N, is_directed=False, p=2, q=0.5, s=s, sampling=sampling
+            )
+            hh2v.preprocess_transition_probs()
+            hh2v.set_switching_params(s_new)
+            # A second change reuses the kept factors
+            hh2v.set_switching_params(s)
+            hh2v.set_switching_params(s_new)
+            assert hh2v.s == s_new
+
+            hh2v_full = henhoe2vec_walks.HenHoe2vec(
+                N, is_directed=False, p=2, q=0.5, s=s_new, sampling=sampling
+            )
+            hh2v_full.preprocess_transition_probs()
+            kinds = ["nodes"] if sampling == "rejection" else ["nodes", "edges"]
+            for kind in kinds:
+                tables = getattr(hh2v, f"transition_probs_{kind}")
+                tables_full = getattr(hh2v_full, f"transition_probs_{kind}")
+                num_tables = (
+                    hh2v.N.number_of_nodes()
+                    if kind == "nodes"
+                    else hh2v.N.number_of_arcs()
+                )
+                for i in range(num_tables):
+                    assert np.allclose(
+                        alias_to_probs(*tables[i]), alias_to_probs(*tables_full[i])
+                    )
+
+    def test_set_switching_params_without_default(self):
+        hh2v = henhoe2vec_walks.HenHoe2vec(
+            prepare_test_network(), is_directed=False, p=1, q=1, s=1
+        )
+        hh2v.preprocess_transition_probs()
+        J, q = hh2v.transition_probs_nodes.J, hh2v.transition_probs_nodes.q
+
+        with pytest.raises(ValueError):
+            hh2v.set_switching_params({("l1", "l2"): 0.5})
+        # The tables and parameters are unchanged
+        assert hh2v.s == {"default": 1}
+        assert hh2v.transition_probs_nodes.J is J
+        assert hh2v.transition_probs_nodes.q is q
+
+    def test_switching_matrix(self):
+        N = prepare_test_network()
+        N.add_edge(("n2", "l1"), ("n5", "l3"), weight=0.3)
+        s = {("l1", "l2"): 0.5, ("l3", "l1"): 4, ("l9", "l1"): 7, "default": 2}
+        hh2v = henhoe2vec_walks.HenHoe2vec(N, is_directed=False, p=1, q=1, s=s)
+
+        # Layer IDs follow the layer vocabulary of the graph
+        assert hh2v.N.layers == ["l1", "l2", "l3"]
+        assert np.array_equal(
+            hh2v.switching_matrix, [[1, 0.5, 2], [2, 1, 2], [4, 2, 1]]
+        )
+        # Steps from n2 (l1) to n1 (l1), n3 (l2) and n5 (l3)
+        assert np.allclose(
+            hh2v._node_unnormalized_probs(hh2v.N.node_index(("n2", "l1"))),
+            [0.5, 0.2 / 0.5, 0.3 / 2],
+        )
+
+    def test_switching_matrix_without_default(self):
+        N = prepare_test_network()
+        s = {("l1", "l2"): 0.5}
+        hh2v = henhoe2vec_walks.HenHoe2vec(N, is_directed=False, p=1, q=1, s=s)
+        assert np.isnan(hh2v.switching_matrix[1, 0])
+
+        # Steps within a layer and between covered layer pairs need no default
+        n1 = hh2v.N.node_index(("n1", "l1"))
+        n4 = hh2v.N.node_index(("n4", "l2"))
+        assert np.allclose(hh2v._node_unnormalized_probs(n1), [0.5, 1.0])
+        assert np.allclose(hh2v._node_unnormalized_probs(n4), [0.4])
+        with pytest.raises(ValueError):
+            hh2v.preprocess_transition_probs()
+
+    def test_wedge_classification(self):
+        # Random network with many closed and open wedges within and across layers
+        rng = np.random.default_rng(0)
+        G = nx.gnm_random_graph(40, 150, seed=0)
+        N = nx.relabel_nodes(G, {i: (f"n{i}", f"l{i % 3}") for i in G.nodes})
+        for u, v in N.edges:
+            N.edges[u, v]["weight"] = rng.uniform(0.1, 1)
+        s = {("l0", "l1"): 0.5, ("l2", "l0"): 2, "default": 3}
+        hh2v = henhoe2vec_walks.HenHoe2vec(N, is_directed=False, p=2, q=0.5, s=s)
+        hh2v.preprocess_transition_probs()
+        N = hh2v.N
+
+        for arc in range(N.number_of_arcs()):
+            previous, current = N.arc_source(arc), int(N.indices[arc])
+            # Classification of every step with one `has_edge` call
+            target_probs = []
+            for nbr, weight in zip(N.neighbors(current), N.neighbor_weights(current)):
+                if nbr == previous:
+                    bias = 2
+                elif N.has_edge(previous, nbr):
+                    bias = 1
+                else:
+                    bias = 0.5
+                switch_param = hh2v.switching_matrix[
+                    N.node_layers[current], N.node_layers[nbr]
+                ]
+                target_probs.append(weight / (bias * switch_param))
+            target_probs = np.array(target_probs) / np.sum(target_probs)
+
+            assert np.allclose(
+                hh2v._edge_unnormalized_probs(previous, current)
+                / np.sum(hh2v._edge_unnormalized_probs(previous, current)),
+                target_probs,
+            )
+            assert np.allclose(
+                alias_to_probs(*hh2v.transition_probs_edges[arc]), target_probs
+            )
+
+    def test_hybrid_sampling(self):
+        N = prepare_test_network()
+        s = {("l1", "l2"): 0.5, ("l2", "l1"): 1}
+        hh2v_alias = henhoe2vec_walks.HenHoe2vec(N, is_directed=False, p=2, q=0.5, s=s)
+        hh2v_alias.preprocess_transition_probs()
+        hh2v = henhoe2vec_walks.HenHoe2vec(
+            N, is_directed=False, p=2, q=0.5, s=s, sampling="hybrid", degree_threshold=2
+        )
+        hh2v.preprocess_transition_probs()
+        N = hh2v.N
+        n3 = N.node_index(("n3", "l2"))
+
+        # Arcs into the hub n3 have no tables, all other tables are the full ones
+        for arc in range(N.number_of_arcs()):
+            J, q = hh2v.transition_probs_edges[arc]
+            if N.indices[arc] == n3:
+                assert len(J) == 0
+            else:
+                J_alias, q_alias = hh2v_alias.transition_probs_edges[arc]
+                assert np.array_equal(J, J_alias)
+                assert np.allclose(q, q_alias)
+
+        report = hh2v.sampling_report()
+        assert report["hub_degree"] == 2
+        assert report["hub_nodes"].tolist() == [n3]
+        assert report["hub_arcs"] == 3
+        # Three arcs into n3 with three entries of 16 bytes each
+        assert report["saved_bytes"] == 3 * 3 * 16
+        assert report["table_bytes"] == (
+            hh2v_alias.transition_probs_nodes.J.nbytes
+            + hh2v_alias.transition_probs_nodes.q.nbytes
+            + hh2v_alias.transition_probs_edges.J.nbytes
+            + hh2v_alias.transition_probs_edges.q.nbytes
+            + hh2v_alias.transition_probs_edges.offsets.nbytes
+            - report["saved_bytes"]
+        )
+
+    def test_hybrid_sampling_budget(self):
+        N = prepare_test_network()
+        full = henhoe2vec_walks.HenHoe2vec(
+            N, is_directed=False, p=1, q=1, s=1, sampling="hybrid", degree_threshold=3
+        )
+        full.preprocess_transition_probs()
+        full_bytes = full.sampling_report()["table_bytes"]
+        assert full.sampling_report()["hub_nodes"].tolist() == []
+
+        # The largest degree threshold within the budget is chosen
+        for max_table_bytes, hub_degree in [
+            (full_bytes, 3),
+            (full_bytes - 1, 2),
+            (full_bytes - 3 * 3 * 16, 2),
+            (full_bytes - 3 * 3 * 16 - 1, 1),
+            (0, 0),
+        ]:
+            hh2v = henhoe2vec_walks.HenHoe2vec(
+                N,
+                is_directed=False,
+                p=1,
+                q=1,
+                s=1,
+                sampling="hybrid",
+                max_table_bytes=max_table_bytes,
+            )
+            hh2v.preprocess_transition_probs()
+            report = hh2v.sampling_report()
+            assert report["hub_degree"] == hub_degree
+            if hub_degree > 0:
+                assert report["table_bytes"] <= max_table_bytes
+            walks = hh2v.simulate_walks(num_walks=2, walk_length=5)
+            assert (walks >= 0).all()
+
+        # A degree threshold below the budget is kept
+        hh2v = henhoe2vec_walks.HenHoe2vec(
+            N,
+            is_directed=False,
+            p=1,
+            q=1,
+            s=1,
+            sampling="hybrid",
+            degree_threshold=1,
+            max_table_bytes=full_bytes,
+        )
+        hh2v.preprocess_transition_probs()
+        assert hh2v.hub_degree == 1
+
+    def test_hybrid_sampling_needs_threshold(self):
+        with pytest.raises(ValueError):
+            henhoe2vec_walks.HenHoe2vec(
+                prepare_test_network(),
+                is_directed=False,
+                p=1,
+                q=1,
+                s=1,
+                sampling="hybrid",
+            )
+        hh2v = henhoe2vec_walks.HenHoe2vec(
+            prepare_test_network(), is_directed=False, p=1, q=1, s=1
+        )
+        hh2v.preprocess_transition_probs()
+        with pytest.raises(ValueError):
+            hh2v.sampling_report()
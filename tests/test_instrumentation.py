@@ -0,0 +1,98 @@
+import json
+import pandas as pd
+import networkx as nx
+from henhoe2vec import henhoe2vec, henhoe2vec_walks
+from henhoe2vec.instrumentation import Instrumentation, JsonLinesSink
+
+import helpers_testing
+
+
+class TestInstrumentation:
+    def test_stage(self, tmp_path):
+        events = []
+        instrumentation = Instrumentation(
+            [events.append], profile_dir=tmp_path, trace_memory=True
+        )
+        with instrumentation.stage("outer", size=3) as fields:
+            with instrumentation.stage("inner"):
+                instrumentation.emit("custom", value=1)
+            fields["count"] = 5
+
+        assert [event["event"] for event in events] == ["custom", "stage", "stage"]
+        inner, outer = events[1], events[2]
+        assert inner["stage"] == "inner"
+        assert outer["stage"] == "outer"
+        assert outer["size"] == 3 and outer["count"] == 5
+        assert outer["seconds"] >= inner["seconds"]
+        # Only the outermost stage is profiled and traced
+        assert "profile" not in inner and "tracemalloc_peak_bytes" not in inner
+        assert tmp_path.joinpath("outer.prof").is_file()
+        assert outer["tracemalloc_peak_bytes"] >= 0
+
+    def test_walk_events(self):
+        N = nx.Graph()
+        N.add_nodes_from([("n1", "l1"), ("n2", "l1")], layer="l1")
+        N.add_nodes_from([("n3", "l2"), ("n4", "l2")], layer="l2")
+        N.add_edge(("n1", "l1"), ("n2", "l1"), weight=0.5)
+        N.add_edge(("n3", "l2"), ("n4", "l2"), weight=0.4)
+        # Dead end
+        N.add_node(("n5", "l2"), layer="l2")
+        events = []
+        hh2v = henhoe2vec_walks.HenHoe2vec(
+            N,
+            False,
+            1,
+            0.5,
+            1,
+            sampling="lazy",
+            instrumentation=Instrumentation([events.append]),
+        )
+        hh2v.preprocess_transition_probs()
+        walks = hh2v.simulate_walks(3, 4, seed=0)
+
+        by_type = {event["event"]: event for event in events}
+        assert by_type["transition_tables"]["node_tables"] == 5
+        assert "edge_tables" not in by_type["transition_tables"]
+        assert by_type["walks"]["walks"] == len(walks) == 15
+        assert by_type["walks"]["dead_end_walks"] == 3
+        assert by_type["walks"]["steps"] == 12 * 3
+        assert by_type["edge_table_cache"]["hit_rate"] > 0
+
+    def test_run_events(self, tmp_path):
+        test_data = {
+            "source": ["n1", "n2", "n3", "n1"],
+            "source_layer": ["l1", "l1", "l2", "l2"],
+            "target": ["n2", "n3", "n1", "n2"],
+            "target_layer": ["l1", "l2", "l1", "l2"],
+            "weight": [1, 0.5, 0.2, 1.1],
+        }
+        edgelist_path = helpers_testing.save_test_edgelist(
+            pd.DataFrame.from_dict(test_data), tmp_path, sep="\t", header=False
+        )
+        events_path = tmp_path.joinpath("events.jsonl")
+        henhoe2vec.run(
+            edgelist_path,
+            tmp_path.joinpath("output/"),
+            dims=8,
+            walk_length=5,
+            num_walks=2,
+            workers=1,
+            verbose=False,
+            instrumentation=Instrumentation([JsonLinesSink(events_path)]),
+        )
+
+        with open(events_path) as f:
+            events = [json.loads(line) for line in f]
+        stages = [event["stage"] for event in events if event["event"] == "stage"]
+        assert stages == [
+            "parse_edgelist",
+            "preprocess_transition_probs",
+            "simulate_walks",
+            "build_vocab",
+            "train_word2vec",
+            "generate_embeddings",
+        ]
+        train = next(e for e in events if e.get("stage") == "train_word2vec")
+        assert train["words"] == 5 * 5 * 2
+        assert train["words_per_second"] > 0
+        assert events[-1]["event"] == "run"
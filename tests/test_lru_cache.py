@@ -0,0 +1,60 @@
+import numpy as np
+import pytest
+from henhoe2vec.lru_cache import LRUCache
+
+
+class TestLRUCache:
+    def test_hits_and_misses(self):
+        calls = []
+
+        def compute(key):
+            calls.append(key)
+            return np.zeros(key)
+
+        cache = LRUCache(compute)
+        cache[2]
+        cache[2]
+        cache[3]
+
+        assert calls == [2, 3]
+        stats = cache.stats()
+        assert stats["hits"] == 1
+        assert stats["misses"] == 2
+        assert stats["entries"] == 2
+        assert stats["nbytes"] == 5 * 8
+
+    def test_max_entries_evicts_least_recently_used(self):
+        cache = LRUCache(lambda key: np.zeros(1), max_entries=2)
+        cache[1]
+        cache[2]
+        cache[1]  # 2 is now the least recently used entry
+        cache[3]
+
+        assert 1 in cache
+        assert 2 not in cache
+        assert 3 in cache
+        assert cache.evictions == 1
+
+    def test_max_bytes(self):
+        # Values are tuples of arrays like alias tables (J, q)
+        cache = LRUCache(
+            lambda key: (np.zeros(key, dtype=int), np.zeros(key)), max_bytes=64
+        )
+        cache[2]  # 32 bytes
+        cache[2]
+        cache[1]  # 16 bytes
+        cache[2]
+        cache[3]  # 48 bytes, evicts 1 and 2
+
+        assert len(cache) == 1
+        assert cache.nbytes == 48
+        assert cache.evictions == 2
+
+        # Values larger than max_bytes are returned but not cached
+        J, q = cache[5]
+        assert len(J) == 5
+        assert 5 not in cache
+
+    def test_invalid_bounds(self):
+        with pytest.raises(ValueError):
+            LRUCache(lambda key: key, max_entries=0)
@@ -0,0 +1,197 @@
+import networkx as nx
+import numpy as np
+import pandas as pd
+import pytest
+from henhoe2vec import utils
+from henhoe2vec.multilayer_graph import MultilayerGraph, NodeVocabulary
+
+import helpers_testing
+
+
+def prepare_test_edgelist():
+    """
+    Prepare a small weighted multilayer edge list and return it as a DataFrame.
+    """
+    test_data = {
+        "source": ["n1", "n2", "n3", "n1", "n4", "n5", "n1"],
+        "source_layer": ["l1", "l1", "l2", "l2", "l2", "l1", "l1"],
+        "target": ["n2", "n3", "n1", "n2", "n5", "n1", "n5"],
+        "target_layer": ["l1", "l2", "l1", "l2", "l2", "l1", "l1"],
+        "weight": [1, 0.5, 0.2, 1.1, 0.1, 0.3, 0.4],
+    }
+    return pd.DataFrame.from_dict(test_data)
+
+
+class TestMultilayerGraph:
+    def test_from_edgelist_matches_networkx(self, tmp_path):
+        edgelist_path = helpers_testing.save_test_edgelist(
+            prepare_test_edgelist(), tmp_path, sep="\t", header=False
+        )
+        for directed in [False, True]:
+            N_nx = utils.parse_multilayer_edgelist(edgelist_path, directed)
+            N = MultilayerGraph.from_edgelist(edgelist_path, directed)
+
+            assert N.nodes == sorted(N_nx.nodes)
+            for node in N_nx.nodes:
+                i = N.node_index(node)
+                nbrs = [N.nodes[nbr] for nbr in N.neighbors(i)]
+                assert nbrs == sorted(N_nx.neighbors(node))
+                for nbr, weight in zip(nbrs, N.neighbor_weights(i)):
+                    assert N_nx[node][nbr]["weight"] == weight
+                assert N.layers[N.node_layers[i]] == N_nx.nodes[node]["layer"]
+
+    def test_undirected_duplicate_edges(self):
+        # (n2, n1) overrides the weight of (n1, n2) in undirected networks
+        sources = [("n1", "l1"), ("n2", "l1"), ("n1", "l1")]
+        targets = [("n2", "l1"), ("n1", "l1"), ("n1", "l1")]
+        N = MultilayerGraph.from_edges(sources, targets, [1.0, 2.0, 3.0], False)
+
+        assert N.number_of_nodes() == 2
+        # Arcs (n1, n1), (n1, n2) and (n2, n1)
+        assert N.number_of_arcs() == 3
+        assert np.array_equal(N.neighbors(0), [0, 1])
+        assert np.array_equal(N.neighbor_weights(0), [3.0, 2.0])
+        assert np.array_equal(N.neighbor_weights(1), [2.0])
+
+    def test_has_edge(self):
+        sources = [("n1", "l1"), ("n2", "l1")]
+        targets = [("n2", "l1"), ("n3", "l2")]
+        N = MultilayerGraph.from_edges(sources, targets, [1.0, 1.0], True)
+
+        assert N.has_edge(0, 1)
+        assert not N.has_edge(1, 0)
+        assert N.arc_index(1, 2) == 1
+        assert N.arc_index(2, 1) == -1
+        assert N.degree(2) == 0
+        assert N.layers == ["l1", "l2"]
+
+    def test_networkx_round_trip(self):
+        G = nx.Graph()
+        G.add_node(("n1", "l1"), layer="l1")
+        G.add_node(("n2", "l2"), layer="l2")
+        G.add_edge(("n1", "l1"), ("n2", "l2"), weight=0.5)
+
+        G_round_trip = MultilayerGraph.from_networkx(G).to_networkx()
+
+        assert nx.utils.graphs_equal(G, G_round_trip)
+
+    def test_save_load(self, tmp_path):
+        edgelist_path = helpers_testing.save_test_edgelist(
+            prepare_test_edgelist(), tmp_path, sep="\t", header=False
+        )
+        N = MultilayerGraph.from_edgelist(edgelist_path, directed=False)
+
+        N.save(tmp_path.joinpath("graph"))
+        N_loaded = MultilayerGraph.load(tmp_path.joinpath("graph"))
+
+        assert N_loaded.nodes == N.nodes
+        assert N_loaded.layers == N.layers
+        assert not N_loaded.is_directed
+        # Memory-mapped read-only
+        assert not N_loaded.indices.flags.writeable
+        for name in ["node_layers", "indptr", "indices", "weights"]:
+            assert np.array_equal(getattr(N_loaded, name), getattr(N, name))
+
+    def test_edgelist_cache(self, tmp_path):
+        edgelist_path = helpers_testing.save_test_edgelist(
+            prepare_test_edgelist(), tmp_path, sep="\t", header=False
+        )
+        cache_dir = tmp_path.joinpath("cache")
+
+        N = MultilayerGraph.from_edgelist(edgelist_path, False, cache_dir=cache_dir)
+        N_cached = MultilayerGraph.from_edgelist(
+            edgelist_path, False, cache_dir=cache_dir
+        )
+        assert len(list(cache_dir.joinpath("graphs").iterdir())) == 1
+        assert not N_cached.indices.flags.writeable
+        assert N_cached.nodes == N.nodes
+        assert np.array_equal(N_cached.weights, N.weights)
+
+        # Other parsing options are cached separately
+        N_directed = MultilayerGraph.from_edgelist(
+            edgelist_path, True, cache_dir=cache_dir
+        )
+        assert N_directed.is_directed
+        assert len(list(cache_dir.joinpath("graphs").iterdir())) == 2
+
+        # Changing the edge list invalidates its cache entries
+        df = prepare_test_edgelist()
+        df.loc[0, "weight"] = 100
+        helpers_testing.save_test_edgelist(df, tmp_path, sep="\t", header=False)
+        N_changed = MultilayerGraph.from_edgelist(
+            edgelist_path, False, cache_dir=cache_dir
+        )
+        assert N_changed.weights.max() == 100
+        # and replaces the graph of its earlier version
+        source_dirs = list(cache_dir.joinpath("graphs").iterdir())
+        assert len(source_dirs) == 2
+        assert all(len(list(path.iterdir())) == 1 for path in source_dirs)
+
+    def test_node_vocabulary(self, tmp_path):
+        nodes = [("n1", "l1"), ("nœud", "ébène"), ("", "l2")]
+        vocabulary = NodeVocabulary.from_nodes(nodes)
+
+        assert len(vocabulary) == 3
+        assert vocabulary[1] == ("nœud", "ébène")
+        assert vocabulary[-1] == ("", "l2")
+        assert vocabulary[:2] == nodes[:2]
+        assert list(vocabulary) == nodes
+        assert vocabulary == nodes and nodes == vocabulary
+        with pytest.raises(IndexError):
+            vocabulary[3]
+
+        # Loaded graphs decode their nodes from the memory-mapped vocabulary
+        N = MultilayerGraph._from_arrays(
+            nodes, np.array([0, 1]), np.array([1, 2]), np.array([1.0, 2.0]), False
+        )
+        N.save(tmp_path.joinpath("graph"))
+        N_loaded = MultilayerGraph.load(tmp_path.joinpath("graph"))
+        assert isinstance(N_loaded.nodes, NodeVocabulary)
+        assert N_loaded.nodes == nodes
+        assert N_loaded.node_ids[("nœud", "ébène")] == 1
+
+    def test_with_edge_updates(self):
+        G = nx.DiGraph()
+        G.add_node(("n1", "l1"), layer="l1")
+        G.add_node(("n2", "l2"), layer="l2")
+        G.add_node(("n3", "l1"), layer="l1")
+        G.add_edge(("n1", "l1"), ("n2", "l2"), weight=0.5)
+        G.add_edge(("n2", "l2"), ("n3", "l1"), weight=1.5)
+        G.add_edge(("n3", "l1"), ("n1", "l1"), weight=2.5)
+        N = MultilayerGraph.from_networkx(G)
+        fingerprint = N.fingerprint()
+
+        N_updated = N.with_edge_updates(
+            insert=[(("n0", "l3"), ("n1", "l1"), 4.0), (("n2", "l2"), ("n1", "l1"), 1)],
+            delete=[(("n3", "l1"), ("n1", "l1"))],
+            reweight=[(("n1", "l1"), ("n2", "l2"), 0.25)],
+        )
+        G.add_node(("n0", "l3"), layer="l3")
+        G.add_edge(("n0", "l3"), ("n1", "l1"), weight=4.0)
+        G.add_edge(("n2", "l2"), ("n1", "l1"), weight=1)
+        G.remove_edge(("n3", "l1"), ("n1", "l1"))
+        G[("n1", "l1")][("n2", "l2")]["weight"] = 0.25
+
+        # The original graph is unchanged and node IDs are stable
+        assert N.number_of_arcs() == 3
+        assert N_updated.nodes == N.nodes + [("n0", "l3")]
+        assert N_updated.layers == ["l1", "l2", "l3"]
+        assert nx.utils.graphs_equal(N_updated.to_networkx(), G)
+        # The updated graph has its own fingerprint, the kept one of the original graph
+        # is still valid
+        assert N_updated.fingerprint() != fingerprint
+        assert (
+            N.fingerprint()
+            == MultilayerGraph.from_networkx(N.to_networkx()).fingerprint()
+        )
+
+    def test_k_hop_neighborhood(self):
+        # Directed path n0 -> n1 -> n2 -> n3
+        nodes = [(f"n{i}", "l1") for i in range(4)]
+        N = MultilayerGraph.from_edges(nodes[:-1], nodes[1:], [1, 1, 1], True)
+
+        assert N.k_hop_neighborhood([1], 0).tolist() == [1]
+        assert N.k_hop_neighborhood([1], 1).tolist() == [1, 2]
+        assert N.k_hop_neighborhood([1], 5).tolist() == [1, 2, 3]
+        assert N.k_hop_neighborhood([2], 1, reverse=True).tolist() == [1, 2]
+        assert N.k_hop_neighborhood([2], 2, reverse=True).tolist() == [0, 1, 2]
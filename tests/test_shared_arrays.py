@@ -0,0 +1,41 @@
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from henhoe2vec.shared_arrays import SharedArrays, attach_shared_arrays
+
+
+def double_in_place(spec):
+    """
+    Attach to shared arrays in a worker process and modify them in place.
+    """
+    arrays, blocks = attach_shared_arrays(spec)
+    arrays["values"] *= 2
+    total = float(arrays["values"].sum())
+    del arrays
+    for block in blocks:
+        block.close()
+    return total
+
+
+class TestSharedArrays:
+    def test_shared_arrays_across_processes(self):
+        values = np.arange(10, dtype=np.float64)
+        with SharedArrays({"values": values, "empty": np.zeros(0)}) as shared:
+            with ProcessPoolExecutor(max_workers=1) as pool:
+                total = pool.submit(double_in_place, shared.spec).result()
+
+            assert total == 90.0
+            assert np.array_equal(shared.arrays["values"], 2 * values)
+            assert shared.arrays["empty"].shape == (0,)
+        # The original array is not modified
+        assert values[1] == 1
+
+    def test_arrays_usable_after_close(self):
+        shared = SharedArrays({"values": np.arange(10, dtype=np.int64)})
+        values = shared.arrays["values"]
+        view = values[2:5]
+        shared.close()
+        del shared
+
+        values[0] = 7
+        assert values.sum() == 52
+        assert view.tolist() == [2, 3, 4]
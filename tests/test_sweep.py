@@ -0,0 +1,115 @@
+import json
+import numpy as np
+import pandas as pd
+import pytest
+from henhoe2vec import henhoe2vec, sweep
+from henhoe2vec.walk_file import WalkFile
+
+import helpers_testing
+
+
+def prepare_edgelist(tmp_path):
+    test_data = {
+        "source": ["n1", "n2", "n3", "n1", "n4"],
+        "source_layer": ["l1", "l1", "l2", "l2", "l2"],
+        "target": ["n2", "n3", "n1", "n2", "n3"],
+        "target_layer": ["l1", "l2", "l1", "l2", "l2"],
+        "weight": [1, 0.5, 0.2, 1.1, 0.7],
+    }
+    return helpers_testing.save_test_edgelist(
+        pd.DataFrame.from_dict(test_data), tmp_path, sep="\t", header=False
+    )
+
+
+class TestSweep:
+    def test_plan_sweep(self):
+        plan = sweep.plan_sweep(
+            {"p": [1, 2], "q": 0.5, "walk_length": [5, 6], "dims": [8, 16]}
+        )
+        assert len(plan["tables"]) == 2
+        assert len(plan["walks"]) == 4
+        assert len(plan["configs"]) == 8
+        # Every set of walks is used by both embedding dimensions
+        for walks_id in plan["walks"]:
+            dims = [
+                c["dims"] for c in plan["configs"].values() if c["walks"] == walks_id
+            ]
+            assert sorted(dims) == [8, 16]
+
+    def test_plan_sweep_s_dict(self):
+        plan = sweep.plan_sweep({"s": [1.0], "s_dict": [[], ["l1", "l2", 0.5]]})
+        switching = [tables["s"] for tables in plan["tables"].values()]
+        assert switching == [{"default": 1.0}, {"default": 1.0, ("l1", "l2"): 0.5}]
+
+        # The same switching parameters given in two ways share their tables
+        plan = sweep.plan_sweep(
+            {"s": [0.5, {"default": 0.5}], "s_dict": [["l1", "l2", 0.3]]}
+        )
+        assert len(plan["tables"]) == 1
+        assert len(plan["configs"]) == 2
+
+        with pytest.raises(ValueError):
+            sweep.plan_sweep({"r": [1]})
+
+    def test_sweep(self, tmp_path):
+        edgelist_path = prepare_edgelist(tmp_path)
+        output_dir = tmp_path.joinpath("sweep")
+        grid = {"q": [0.5, 2], "walk_length": 6, "num_walks": 3, "dims": [4, 8]}
+        results = sweep.sweep(
+            edgelist_path, output_dir, grid, workers=2, seed=3, verbose=False
+        )
+
+        assert len(results) == 4
+        assert len(list(output_dir.joinpath("walks").glob("*.walks"))) == 2
+        for result in results:
+            df = pd.read_csv(
+                f"{result['output_dir']}/embeddings.csv", sep="\t", header=None
+            )
+            assert df.shape == (6, result["params"]["dims"] + 1)
+        with open(output_dir.joinpath("sweep.json")) as f:
+            assert len(json.load(f)["configs"]) == 4
+
+        # The walks are the same as the walks of run with the same seed
+        walks_file = tmp_path.joinpath("walks.bin")
+        henhoe2vec.run(
+            edgelist_path,
+            tmp_path.joinpath("run"),
+            dims=4,
+            walk_length=6,
+            num_walks=3,
+            q=2,
+            workers=1,
+            verbose=False,
+            seed=3,
+            walks_file=walks_file,
+        )
+        result = next(r for r in results if r["params"]["q"] == 2)
+        assert np.array_equal(
+            WalkFile(result["walks_file"]).walks, WalkFile(walks_file).walks
+        )
+
+    def test_sweep_hybrid(self, tmp_path):
+        edgelist_path = prepare_edgelist(tmp_path)
+        grid = {"walk_length": 6, "num_walks": 3, "dims": 4}
+        results = sweep.sweep(
+            edgelist_path,
+            tmp_path.joinpath("sweep"),
+            grid,
+            workers=1,
+            verbose=False,
+            sampling="hybrid",
+            degree_threshold=1,
+            seed=3,
+        )
+
+        assert len(results) == 1
+        assert len(WalkFile(results[0]["walks_file"]).walks) == 18
+
+    def test_parse_sweep_args_sampling(self):
+        args = sweep.parse_sweep_args(
+            ["--sampling", "hybrid", "--max_table_bytes", "1024"]
+        )
+        assert args.sampling == "hybrid"
+        assert args.max_table_bytes == 1024
+        with pytest.raises(SystemExit):
+            sweep.parse_sweep_args(["--sampling", "unknown"])
@@ -1,4 +1,6 @@
+import numpy as np
 import pandas as pd
+import pytest
 from henhoe2vec import utils
 from pathlib import Path
 
@@ -77,6 +79,55 @@ class TestUtils:
             == 1 + 1 / 0.2 + 1 / 0.3 + 1 / 0.4
         )
 
+    def test_read_edgelist_chunks(self, tmp_path):
+        edgelist_path = tmp_path.joinpath("test_edgelist.edg")
+        edgelist_path.write_text(
+            "n2\tl1\tNA\tl2\t0.5\n"
+            "n1\tl1\tn2\tl1\t2\n"
+            "NA\tl2\tn1\tl1\t4\n"
+            "n1\tl2\tn1\tl1\t0.25\n"
+            "n2\tl1\tn1\tl2\t1\n"
+        )
+
+        nodes, src, dst, weights = utils.read_multilayer_edgelist(
+            edgelist_path, edges_are_distance=True, chunksize=2
+        )
+
+        # Sorted nodes, "NA" is a node name and not a missing value
+        assert nodes == [("NA", "l2"), ("n1", "l1"), ("n1", "l2"), ("n2", "l1")]
+        assert [(nodes[u], nodes[v]) for u, v in zip(src, dst)][:2] == [
+            (("n2", "l1"), ("NA", "l2")),
+            (("n1", "l1"), ("n2", "l1")),
+        ]
+        assert np.allclose(weights, [2, 0.5, 0.25, 4, 1])
+
+    def test_read_edgelist_unweighted(self, tmp_path):
+        edgelist_path = tmp_path.joinpath("test_edgelist.edg")
+        edgelist_path.write_text("source,sl,target,tl\nn1,l1,n2,l1\nn2,l1,n3,l2\n")
+
+        nodes, src, dst, weights = utils.read_multilayer_edgelist(
+            edgelist_path, sep=",", header=True
+        )
+
+        assert nodes == [("n1", "l1"), ("n2", "l1"), ("n3", "l2")]
+        assert src.tolist() == [0, 1]
+        assert dst.tolist() == [1, 2]
+        assert weights.tolist() == [1, 1]
+
+    def test_read_edgelist_too_many_columns(self, tmp_path):
+        edgelist_path = tmp_path.joinpath("test_edgelist.edg")
+        edgelist_path.write_text("0\tn1\tl1\tn2\tl1\t1\n1\tn2\tl1\tn3\tl2\t1\n")
+
+        with pytest.raises(ValueError):
+            utils.read_multilayer_edgelist(edgelist_path)
+
+    def test_read_edgelist_too_few_columns(self, tmp_path):
+        edgelist_path = tmp_path.joinpath("test_edgelist.edg")
+        edgelist_path.write_text("n1\tl1\tn2\tl1\t1\nn2\tl1\tn3\n")
+
+        with pytest.raises(ValueError):
+            utils.read_multilayer_edgelist(edgelist_path)
+
     def test_timed_invoke(self):
         result = utils.timed_invoke("test", lambda: 3 + 5)
         assert result == 8
@@ -0,0 +1,61 @@
+import networkx as nx
+import numpy as np
+import pandas as pd
+from henhoe2vec import henhoe2vec_walks, embeddings
+from henhoe2vec.walk_corpus import WalkCorpus
+from henhoe2vec.walk_file import WalkFile
+
+
+def prepare_hh2v(seed=0):
+    """
+    Prepare a HenHoe2vec object with preprocessed transition probabilities over a small
+    test network.
+    """
+    N = nx.Graph()
+    N.add_nodes_from([("n1", "l1"), ("n2", "l1")], layer="l1")
+    N.add_nodes_from([("n3", "l2"), ("n4", "l2")], layer="l2")
+    N.add_edge(("n1", "l1"), ("n2", "l1"), weight=0.5)
+    N.add_edge(("n2", "l1"), ("n3", "l2"), weight=0.2)
+    N.add_edge(("n1", "l1"), ("n3", "l2"), weight=0.5)
+    N.add_edge(("n3", "l2"), ("n4", "l2"), weight=0.4)
+    hh2v = henhoe2vec_walks.HenHoe2vec(N, is_directed=False, p=1, q=0.5, s=1, seed=seed)
+    hh2v.preprocess_transition_probs()
+
+    return hh2v
+
+
+class TestWalkCorpus:
+    def test_corpus_restartable(self):
+        corpus = WalkCorpus(prepare_hh2v(), num_walks=5, walk_length=6, chunk_size=3)
+
+        first = list(corpus)
+        assert len(first) == len(corpus) == 5 * 4
+        assert list(corpus) == first
+
+    def test_corpus_matches_simulate_walks(self):
+        hh2v = prepare_hh2v()
+        corpus = WalkCorpus(hh2v, num_walks=5, walk_length=6, chunk_size=3, seed=7)
+        walks = hh2v.simulate_walks(5, 6, chunk_size=3, seed=7)
+
+        assert np.array_equal(np.concatenate(list(corpus.iter_chunks())), walks)
+        tokens = [str(node) for node in hh2v.N.nodes]
+        assert list(corpus) == [[tokens[node] for node in walk] for walk in walks]
+
+    def test_generate_embeddings_from_corpus(self, tmp_path):
+        corpus = WalkCorpus(prepare_hh2v(), num_walks=5, walk_length=6, chunk_size=3)
+        embeddings.generate_embeddings(
+            corpus, tmp_path, dimensions=8, window_size=3, epochs=2, workers=1
+        )
+
+        df = pd.read_csv(tmp_path.joinpath("embeddings.csv"), sep="\t", header=None)
+        assert df.shape == (4, 8 + 1)
+
+    def test_simulate_walks_to_file(self, tmp_path):
+        hh2v = prepare_hh2v()
+        path = tmp_path.joinpath("walks.bin")
+        walks = hh2v.simulate_walks(5, 6, chunk_size=3, seed=7, output_path=path)
+
+        assert np.array_equal(walks, hh2v.simulate_walks(5, 6, chunk_size=3, seed=7))
+        walk_file = WalkFile(path)
+        assert walk_file.nodes == hh2v.N.nodes
+        assert walk_file.params == hh2v.walk_params(5, 6, 7)
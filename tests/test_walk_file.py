@@ -0,0 +1,40 @@
+import numpy as np
+import pytest
+from henhoe2vec.walk_file import write_walk_file, WalkFile
+
+
+class TestWalkFile:
+    def test_round_trip(self, tmp_path):
+        path = tmp_path.joinpath("walks.bin")
+        walks = np.array([[0, 1, 2], [2, 1, -1], [1, 0, 1], [1, 2, 0]], dtype=np.int32)
+        nodes = [("n1", "l1"), ("n2", "l1"), ("n3", "l2")]
+        params = {"p": 1.0, "q": 0.5, "seed": 3}
+
+        num_walks = write_walk_file(path, [walks[:3], walks[3:]], 3, nodes, params)
+        walk_file = WalkFile(path)
+
+        assert num_walks == len(walk_file) == 4
+        assert isinstance(walk_file.walks, np.memmap)
+        assert np.array_equal(walk_file.walks, walks)
+        assert walk_file.nodes == nodes
+        assert walk_file.params == params
+        assert list(walk_file)[1] == [str(("n3", "l2")), str(("n2", "l1"))]
+
+    def test_empty(self, tmp_path):
+        path = tmp_path.joinpath("walks.bin")
+        write_walk_file(path, [], 5, [])
+
+        assert WalkFile(path).walks.shape == (0, 5)
+
+    def test_wrong_walk_length(self, tmp_path):
+        with pytest.raises(ValueError):
+            write_walk_file(
+                tmp_path.joinpath("walks.bin"), [np.zeros((2, 4))], 3, [("n1", "l1")]
+            )
+
+    def test_not_a_walk_file(self, tmp_path):
+        path = tmp_path.joinpath("walks.bin")
+        path.write_bytes(b"node1\tlayer1\tnode2\tlayer1\t1.0\n" * 4)
+
+        with pytest.raises(ValueError):
+            WalkFile(path)